@@ -0,0 +1,5 @@
+"""
+Shared engine behind the Dart fix scripts
+
+Run `python3 -m codemod --help` from the project root for the commands.
+"""
@@ -0,0 +1,9 @@
+import sys
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['filter']:
+        # skips argparse and the rule classes: see codemod.filter
+        from codemod.filter import main
+        sys.exit(main(sys.argv[2:]))
+    from codemod.cli import main
+    sys.exit(main())
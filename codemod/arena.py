@@ -0,0 +1,149 @@
+"""
+One shared-memory block holding the files a worker pool transforms
+
+Without it every worker reads its files from disk and pickles each new
+file back whole, and pieces of split files (see codemod.chunks) go out
+and come back pickled too. The parent reads the pooled files once, straight
+into a multiprocessing.shared_memory block, and hands out (offset, length)
+spans; workers decode their span in place and return only the edits their
+output makes to it, which the parent applies before writing. Pieces of a
+stage of a split file go through a second, reused block the same way.
+The parent's memory stays about the size of the files being transformed.
+
+An edit is (start, end, replacement): bytes start:end of the original are
+replaced by the replacement bytes. Edits are found a line at a time.
+"""
+
+import difflib
+import os
+from multiprocessing import shared_memory
+
+
+def edits(old, new):
+    """Edits turning bytes `old` into bytes `new`, in order"""
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    head = 0
+    while head < len(a) and head < len(b) and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < len(a) - head and tail < len(b) - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+    starts = [sum(map(len, a[:head]))]
+    a = a[head:len(a) - tail]
+    b = b[head:len(b) - tail]
+    for line in a:
+        starts.append(starts[-1] + len(line))
+    out = []
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            out.append((starts[i1], starts[i2], b''.join(b[j1:j2])))
+    return out
+
+
+def patch(old, changes):
+    """`old` (any bytes-like object) with the edits applied"""
+    parts = []
+    last = 0
+    for start, end, replacement in changes:
+        parts.append(old[last:start])
+        parts.append(replacement)
+        last = end
+    parts.append(old[last:])
+    return b''.join(parts)
+
+
+class Arena:
+    """The pooled files of a run, read once into shared memory"""
+
+    def __init__(self, tasks):
+        sizes = {}
+        for root, relpath in tasks:
+            try:
+                sizes[root, relpath] = os.stat(os.path.join(root, relpath)).st_size
+            except OSError:
+                pass
+        self.block = shared_memory.SharedMemory(create=True, size=max(1, sum(sizes.values())))
+        self.name = self.block.name
+        self.spans = {}
+        self.scratch = None
+        offset = 0
+        for task, size in sizes.items():
+            length = self._load(task, offset, size)
+            if length is not None:
+                self.spans[task] = (offset, length)
+            offset += size
+
+    def _load(self, task, offset, size):
+        """Read a file into its place; None if it is not `size` bytes any more"""
+        try:
+            with open(os.path.join(*task), 'rb') as f:
+                with self.block.buf[offset:offset + size] as view:
+                    length = f.readinto(view)
+                if f.read(1):
+                    return None
+        except OSError:
+            return None
+        return length
+
+    def span(self, task):
+        """(offset, length) of the file in the block, or None if it is read from disk"""
+        return self.spans.get(task)
+
+    def view(self, task):
+        offset, length = self.spans[task]
+        return self.block.buf[offset:offset + length]
+
+    def patch(self, task, changes):
+        with self.view(task) as original:
+            return patch(original, changes)
+
+    def stage(self, parts):
+        """Copy the texts into the scratch block: (block name, [(offset, length)])"""
+        encoded = [part.encode('utf-8') for part in parts]
+        total = sum(map(len, encoded))
+        if self.scratch is None or self.scratch.size < total:
+            self._drop_scratch()
+            self.scratch = shared_memory.SharedMemory(create=True, size=max(1, total * 3 // 2))
+        spans = []
+        offset = 0
+        for data in encoded:
+            self.scratch.buf[offset:offset + len(data)] = data
+            spans.append((offset, len(data)))
+            offset += len(data)
+        return self.scratch.name, spans
+
+    def unstage(self, span, changes):
+        """The text of a staged part with the edits applied"""
+        offset, length = span
+        with self.scratch.buf[offset:offset + length] as original:
+            return patch(original, changes).decode('utf-8')
+
+    def _drop_scratch(self):
+        if self.scratch is not None:
+            self.scratch.close()
+            self.scratch.unlink()
+            self.scratch = None
+
+    def close(self):
+        self._drop_scratch()
+        self.block.close()
+        self.block.unlink()
+
+
+_attached = {}
+
+
+def attach(name):
+    """A block created by the parent, opened once per worker"""
+    block = _attached.get(name)
+    if block is None:
+        block = _attached[name] = shared_memory.SharedMemory(name=name)
+    return block
+
+
+def detach(name):
+    block = _attached.pop(name, None)
+    if block is not None:
+        block.close()
@@ -0,0 +1,144 @@
+"""
+Pattern audit: static backtracking warnings and a fuzz benchmark of how
+each rule's worst-case time grows with input length
+"""
+
+import json
+import math
+import random
+import time
+
+from codemod import budget as rule_budget
+from codemod import rules as rule_table
+from codemod.patterns import backtracking_risks, literal_runs
+
+LENGTHS = (500, 1000, 2000, 4000, 8000)
+FILLER = ' \n\ta_Z0(){}[];,.=>:'
+
+
+def inputs(rule, length, rng):
+    """Candidate worst-case inputs of about `length` characters for one rule
+
+    Near misses are built from the literals the pattern requires, in order:
+    every proper prefix of the literal sequence repeated (so each start
+    position gets far into the pattern and then fails), the full sequence
+    minus its last literal followed by a long tail, and random soup over
+    the pattern's own characters.
+    """
+    runs = literal_runs(rule.pattern, rule.flags) or ['x']
+    alphabet = sorted(set(''.join(runs) + FILLER))
+    yield ''.join(rng.choice(alphabet) for _ in range(length))
+    for k in range(1, len(runs) + 1):
+        for sep in (' ', '', ' x '):
+            stem = sep.join(runs[:k]) + sep
+            if k == len(runs):
+                stem = sep.join(runs[:-1]) + sep if len(runs) > 1 else ''
+                for tail in (' ', 'a', '(', ' a'):
+                    yield (stem + tail * length)[:length]
+                continue
+            yield (stem * (length // max(len(stem), 1) + 1))[:length]
+
+
+def _time(rule, text, limit):
+    started = time.perf_counter()
+    rule_budget.call(limit, rule.apply, text)
+    return time.perf_counter() - started
+
+
+def measure(rule, lengths=LENGTHS, seed=0, limit=2.0):
+    """[(length, worst seconds)] over the generated inputs; stops at the first timeout"""
+    points = []
+    for length in lengths:
+        rng = random.Random(f"{seed}:{rule.key}:{length}")
+        worst = 0.0
+        for text in inputs(rule, length, rng):
+            try:
+                worst = max(worst, min(_time(rule, text, limit) for _ in range(2)))
+            except rule_budget.RuleTimeout:
+                points.append((length, None))
+                return points
+        points.append((length, worst))
+    return points
+
+
+def exponent(points):
+    """Least-squares slope of log(time) over log(length), or None without enough data"""
+    data = [(math.log(n), math.log(t)) for n, t in points if t is not None and t > 2e-5]
+    if any(t is None for _, t in points):
+        return math.inf
+    if len(data) < 2:
+        return None
+    mean_x = sum(x for x, _ in data) / len(data)
+    mean_y = sum(y for _, y in data) / len(data)
+    spread = sum((x - mean_x) ** 2 for x, _ in data)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in data) / spread
+
+
+def verdict(slope):
+    if slope is None:
+        return 'too fast to tell'
+    if slope == math.inf:
+        return 'timed out'
+    if slope < 1.4:
+        return 'linear'
+    if slope < 2.4:
+        return 'quadratic'
+    return 'super-quadratic'
+
+
+def audit(selected, bench=False, lengths=LENGTHS, seed=0, limit=2.0):
+    """One report entry per regex rule"""
+    report = []
+    for rule in selected:
+        if rule.kind != 'regex':
+            continue
+        entry = {'rule': rule.key, 'pattern': rule.pattern,
+                 'risks': backtracking_risks(rule.pattern, rule.flags)}
+        if bench:
+            points = measure(rule, lengths, seed, limit)
+            slope = exponent(points)
+            entry['timings'] = [[n, None if t is None else round(t, 6)] for n, t in points]
+            entry['exponent'] = None if slope in (None, math.inf) else round(slope, 2)
+            entry['scaling'] = verdict(slope)
+        report.append(entry)
+    return report
+
+
+def _flagged(entry):
+    return entry['risks'] or entry.get('scaling') in ('quadratic', 'super-quadratic',
+                                                      'timed out')
+
+
+def format_text(report, bench):
+    out = []
+    for entry in report:
+        if not _flagged(entry) and not bench:
+            continue
+        line = f"{entry['rule']}  {entry['pattern']}"
+        if bench:
+            length, seconds = entry['timings'][-1]
+            if seconds is None:
+                line += f"\n    scaling: {entry['scaling']} (over budget at {length} chars)"
+            else:
+                line += (f"\n    scaling: {entry['scaling']} (exponent {entry['exponent']}, "
+                         f"{seconds * 1000:.2f}ms at {length} chars)")
+        for risk in entry['risks']:
+            line += f"\n    {risk}"
+        out.append(line)
+    flagged = sum(1 for entry in report if _flagged(entry))
+    out.append(f"{flagged} of {len(report)} regex rules flagged.")
+    return '\n'.join(out)
+
+
+def run(scripts=None, funcs=None, fmt='text', bench=False, max_length=LENGTHS[-1], seed=0,
+        limit=2.0):
+    """Print the audit; returns 1 if any rule is flagged"""
+    lengths = tuple(n for n in LENGTHS if n < max_length) + (max_length,)
+    report = audit(rule_table.select(scripts, funcs), bench, lengths, seed, limit)
+    if fmt == 'json':
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_text(report, bench))
+    return 1 if any(_flagged(entry) for entry in report) else 0
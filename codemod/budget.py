@@ -0,0 +1,36 @@
+"""
+Wall-clock budgets for a single rule on a single file
+
+The re module checks for signals while it matches, so an interval timer
+whose handler raises interrupts even a catastrophically backtracking
+search. Budgets only work on the main thread of a process (each pool
+worker is its own process); elsewhere they are not enforced.
+"""
+
+import signal
+import threading
+
+
+class RuleTimeout(Exception):
+    """A rule ran past its per-file time budget"""
+
+
+def _alarm(signum, frame):
+    raise RuleTimeout()
+
+
+def enforceable():
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+def call(seconds, func, *args):
+    """func(*args), raising RuleTimeout once `seconds` have passed (0 = no limit)"""
+    if not seconds or not enforceable():
+        return func(*args)
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        return func(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
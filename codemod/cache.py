@@ -0,0 +1,130 @@
+"""
+Content-addressed transform cache shared by every checkout on the machine
+
+Entries are keyed by (input blob hash, rule-set hash) and hold either the
+transformed output or a "no change" marker, so a file that is byte-identical
+across branches or worktrees is only ever transformed once. Entries are
+written with an atomic rename, which makes concurrent runs safe, and with
+the process umask, like the state files.
+
+Keys say nothing about the rule set that made them, so entries of rule
+sets no checkout uses any more are only found by age: at most once a day,
+prune() drops entries older than MAX_AGE, then the oldest ones until the
+cache is under MAX_BYTES.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+NO_CHANGE = object()
+
+MAX_AGE = 30 * 24 * 3600
+MAX_BYTES = 256 * 1024 * 1024
+PRUNE_EVERY = 24 * 3600
+
+_UNCHANGED = b'='
+_CHANGED = b'+'
+
+
+def default_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.environ.get('CODEMOD_CACHE') or os.path.join(base, 'elythra-codemod')
+
+
+class TransformCache:
+    """Files under <dir>/transforms/<xx>/<key>, one per (blob, rule set)"""
+
+    def __init__(self, directory=None):
+        self.root = directory or default_dir()
+        self.directory = os.path.join(self.root, 'transforms')
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, blob, ruleset):
+        key = hashlib.sha1(f'{blob}:{ruleset}'.encode('ascii')).hexdigest()
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, blob, ruleset):
+        """NO_CHANGE, the transformed bytes, or None on a miss"""
+        try:
+            with open(self._path(blob, ruleset), 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        if data[:1] == _UNCHANGED:
+            self.hits += 1
+            return NO_CHANGE
+        if data[:1] == _CHANGED:
+            self.hits += 1
+            return data[1:]
+        self.misses += 1
+        return None
+
+    def put(self, blob, ruleset, output):
+        """Store `output` bytes, or NO_CHANGE"""
+        path = self._path(blob, ruleset)
+        directory = os.path.dirname(path)
+        # unique per writer; os.open applies the umask where mkstemp would give 0600
+        tmp = os.path.join(directory, f'.tmp-{os.getpid()}-{threading.get_ident()}')
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if output is NO_CHANGE:
+                    f.write(_UNCHANGED)
+                else:
+                    f.write(_CHANGED)
+                    f.write(output)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def prune(self, now=None):
+        """Drop old entries, then the oldest until under MAX_BYTES, if not done
+        in the last PRUNE_EVERY seconds; returns the number removed
+        """
+        now = time.time() if now is None else now
+        stamp = os.path.join(self.directory, '.pruned')
+        try:
+            if now - os.stat(stamp).st_mtime < PRUNE_EVERY:
+                return 0
+        except OSError:
+            if not os.path.isdir(self.directory):
+                return 0
+        try:
+            with open(stamp, 'wb'):
+                pass
+        except OSError:
+            return 0
+        entries = []
+        for current, _dirs, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(current, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if path != stamp:
+                    entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _mtime, size, _path in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime < MAX_AGE and total <= MAX_BYTES:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,170 @@
+"""
+Fast pre-count of the issues the fix scripts target
+
+Counts, per rule and file, the occurrences each script would still rewrite
+and reports them the way the analyzer does, without running Flutter.
+"""
+
+import bisect
+import json
+import os
+import time
+from collections import namedtuple
+
+from codemod import files, project
+from codemod import rules as rule_table
+
+Diagnostic = namedtuple('Diagnostic', 'rule path offset length line column')
+
+
+def line_starts(text):
+    starts = [0]
+    find = text.find
+    pos = find('\n')
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = find('\n', pos + 1)
+    return starts
+
+
+def scan_text(relpath, text, selected):
+    """Diagnostics for every effective match of the selected rules in one file"""
+    diagnostics = []
+    starts = None
+    for rule in selected:
+        if not rule.applies_to(relpath) or not rule.may_match(text):
+            continue
+        for start, end in rule.finditer(text):
+            if starts is None:
+                starts = line_starts(text)
+            line = bisect.bisect_right(starts, start)
+            diagnostics.append(Diagnostic(rule, relpath, start, end - start,
+                                          line, start - starts[line - 1] + 1))
+    return diagnostics
+
+
+def scan_tree(root, selected, renames=(), label='', index=True):
+    """Scan every Dart file under root/lib; returns (diagnostics, files_scanned)
+
+    Reported paths are relative to the root, prefixed with `label` if given.
+    With `index`, each file is only opened, and only checked against the
+    rules, that the trigram index says may match it.
+    """
+    diagnostics = []
+    paths = files.discover(root)
+    narrowed = None
+    if index:
+        from codemod.trigrams import TrigramIndex
+        trigram_index = TrigramIndex(root)
+        trigram_index.refresh(paths)
+        trigram_index.save()
+        narrowed = trigram_index.narrow(selected)
+    for relpath in paths:
+        rules = selected
+        if narrowed is not None:
+            rules = narrowed.get(relpath)
+            if not rules:
+                continue
+        try:
+            text = files.read_text(root, relpath)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error reading {os.path.join(label, relpath)}: {e}")
+            continue
+        found = scan_text(relpath, text, rules)
+        if label:
+            found = [d._replace(path=os.path.join(label, relpath)) for d in found]
+        diagnostics.extend(found)
+    for rule in renames:
+        if files.exists(root, rule.pattern):
+            diagnostics.append(Diagnostic(rule, os.path.join(label, rule.pattern), 0, 0, 1, 1))
+    diagnostics.sort(key=lambda d: (d.path, d.offset))
+    return diagnostics, len(paths)
+
+
+def counts(diagnostics):
+    """{script: {rule_key: {path: count}}}"""
+    table = {}
+    for d in diagnostics:
+        per_rule = table.setdefault(d.rule.script, {}).setdefault(d.rule.key, {})
+        per_rule[d.path] = per_rule.get(d.path, 0) + 1
+    return table
+
+
+def format_text(diagnostics, scripts, scanned, elapsed, show_counts=False):
+    out = []
+    if show_counts:
+        for script, per_rule in counts(diagnostics).items():
+            for key, per_file in per_rule.items():
+                for path, n in sorted(per_file.items()):
+                    out.append(f"{n:6d}  {key}  {path}")
+    else:
+        for d in diagnostics:
+            out.append(f"   info • {d.rule.message} • {d.path}:{d.line}:{d.column} • "
+                       f"{d.rule.name} ({d.rule.script}.{d.rule.func})")
+    if out:
+        out.append('')
+    table = counts(diagnostics)
+    for script in scripts:
+        per_rule = table.get(script, {})
+        total = sum(sum(per_file.values()) for per_file in per_rule.values())
+        touched = len({path for per_file in per_rule.values() for path in per_file})
+        status = f"{total} in {touched} files" if total else 'nothing to do'
+        out.append(f"  {script:<24} {status}")
+    found = f"{len(diagnostics)} issues found." if diagnostics else 'No issues found!'
+    out.append(f"{found} ({scanned} files, ran in {elapsed:.2f}s)")
+    return '\n'.join(out)
+
+
+def format_json(diagnostics, scanned, elapsed):
+    """Same shape as `dart analyze --format=json`, plus the per-rule counts"""
+    return json.dumps({
+        'version': 1,
+        'diagnostics': [{
+            'code': d.rule.name,
+            'severity': 'INFO',
+            'type': 'LINT',
+            'location': {
+                'file': d.path,
+                'range': {
+                    'start': {'offset': d.offset, 'line': d.line, 'column': d.column},
+                    'end': {'offset': d.offset + d.length},
+                },
+            },
+            'problemMessage': d.rule.message,
+            'rule': d.rule.key,
+            'script': d.rule.script,
+            'function': d.rule.func,
+        } for d in diagnostics],
+        'counts': counts(diagnostics),
+        'filesScanned': scanned,
+        'elapsed': round(elapsed, 4),
+    }, indent=2)
+
+
+def run(roots, scripts=None, funcs=None, fmt='text', show_counts=False, index=True):
+    """Scan the package(s) and print the report; returns the process exit code"""
+    if isinstance(roots, str):
+        roots = [roots]
+    started = time.perf_counter()
+    selected = rule_table.select(scripts, funcs)
+    renames = [r for r in rule_table.select_renames(scripts)
+               if not funcs or r.func in funcs or f"{r.script}.{r.func}" in funcs]
+    if renames:
+        from codemod.pipeline import moved_away
+        dead = moved_away(selected, renames)
+        selected = [rule for rule in selected if rule.key not in dead]
+    diagnostics = []
+    scanned = 0
+    for root in roots:
+        label = project.label(root) if len(roots) > 1 else ''
+        found, count = scan_tree(root, selected, renames, label, index)
+        diagnostics.extend(found)
+        scanned += count
+    diagnostics.sort(key=lambda d: (d.path, d.offset))
+    elapsed = time.perf_counter() - started
+    if fmt == 'json':
+        print(format_json(diagnostics, scanned, elapsed))
+    else:
+        print(format_text(diagnostics, scripts or list(rule_table.RULESETS), scanned,
+                          elapsed, show_counts))
+    return 1 if diagnostics else 0
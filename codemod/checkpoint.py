@@ -0,0 +1,144 @@
+"""
+Checkpoints that let an interrupted apply resume where it stopped
+
+The fused engine writes each file once with every rule applied, so a file
+is the unit of work: either all of its rules are in, or none are. Every
+finished file is appended to .dart_tool/codemod/checkpoint.log before its
+new text is written (the write itself is atomic), and the log is fsynced
+at most every SYNC_INTERVAL seconds. A resumed run skips every file whose
+recorded outcome is still on disk and redoes the rest, so the tree ends up
+as an uninterrupted run would have left it. Running the rules twice over a
+finished file would not be a no-op for all of them, which is why finished
+files must be skipped rather than redone.
+
+The log is line based:
+
+    codemod-checkpoint 1 <signature>     rules and renames of the run
+    C <path> <blob>                      path rewritten to this blob
+    U <path> <mtime_ns> <size>           path left unchanged
+    F                                    run finished
+
+Renames run last; a file found at a rename target is matched against the
+record of its source, whether or not the move made it into the log.
+"""
+
+import hashlib
+import os
+import time
+
+from codemod import files, state
+
+CHECKPOINT_FILE = 'checkpoint.log'
+CHECKPOINT_VERSION = 1
+SYNC_INTERVAL = 1.0
+MAGIC = 'codemod-checkpoint'
+
+
+class CheckpointError(Exception):
+    """A checkpoint cannot be resumed"""
+
+
+def signature(rules, renames=()):
+    """Identity of a run: the rules in the order they apply, and the moves"""
+    from codemod.engine import ENGINE_VERSION
+    keys = [ENGINE_VERSION] + [rule.key for rule in rules] + [rule.key for rule in renames]
+    return hashlib.sha1('\n'.join(keys).encode('utf-8')).hexdigest()
+
+
+def _parse(path):
+    """(signature, {path: record}, finished) from a log; torn last lines are ignored"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')
+    except (OSError, UnicodeDecodeError):
+        return None
+    header = lines[0].split(' ')
+    if len(header) != 3 or header[0] != MAGIC or header[1] != str(CHECKPOINT_VERSION):
+        return None
+    done = {}
+    finished = False
+    for line in lines[1:]:
+        fields = line.split('\t')
+        kind = fields[0]
+        if kind == 'C' and len(fields) == 3:
+            done[fields[1]] = ('C', fields[2])
+        elif kind == 'U' and len(fields) == 4 and fields[2].isdigit() and fields[3].isdigit():
+            done[fields[1]] = ('U', int(fields[2]), int(fields[3]))
+        elif kind == 'F':
+            finished = True
+    return header[2], done, finished
+
+
+class Checkpoint:
+    """The checkpoint log of one package root for one run"""
+
+    def __init__(self, root, run_signature, resume=False, renames=()):
+        self.root = root
+        self.path = os.path.join(state.state_dir(root), CHECKPOINT_FILE)
+        self.done = {}
+        self.finished = False
+        self.sources = {rule.replacement: rule.pattern for rule in renames}
+        self.synced = 0.0
+        if resume:
+            parsed = _parse(self.path)
+            if parsed is None:
+                raise CheckpointError(f"No checkpoint to resume in {root}")
+            recorded, self.done, self.finished = parsed
+            if recorded != run_signature:
+                raise CheckpointError(
+                    f"The checkpoint in {root} was made with a different rule selection or "
+                    f"order; rerun with the same options (and --no-adapt if the order changed)")
+            self.file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self.file = open(self.path, 'w', encoding='utf-8')
+            self._append(f"{MAGIC} {CHECKPOINT_VERSION} {run_signature}")
+            self.sync()
+
+    def completed(self, relpath):
+        """True if relpath was finished by the interrupted run and has not changed since"""
+        if self.finished:
+            return True
+        record = self.done.get(relpath)
+        if record is None and relpath in self.sources:
+            record = self.done.get(self.sources[relpath])
+        if record is None:
+            return False
+        try:
+            if record[0] == 'U':
+                st = os.stat(os.path.join(self.root, relpath))
+                return st.st_mtime_ns == record[1] and st.st_size == record[2]
+            return files.blob_hash(files.read_bytes(self.root, relpath)) == record[1]
+        except OSError:
+            return False
+
+    def changed(self, relpath, output):
+        """Record relpath as done; call before writing `output` to it"""
+        self._append(f"C\t{relpath}\t{files.blob_hash(output)}")
+
+    def unchanged(self, relpath):
+        try:
+            st = os.stat(os.path.join(self.root, relpath))
+        except OSError:
+            return
+        self._append(f"U\t{relpath}\t{st.st_mtime_ns}\t{st.st_size}")
+
+    def finish(self):
+        self._append('F')
+        self.sync()
+        self.file.close()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def _append(self, line):
+        # flushed every time, so a killed process loses nothing; fsynced now and then
+        self.file.write(line + '\n')
+        self.file.flush()
+        if time.monotonic() - self.synced >= SYNC_INTERVAL:
+            self.sync()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+        self.synced = time.monotonic()
@@ -0,0 +1,104 @@
+"""
+Splitting very large files at top-level declarations
+
+One generated file (lib/core/services/db/global_db.g.dart) holds about a
+third of the Dart source, so a per-file pool is bounded by it. Such files
+are cut just after the `}` lines closing top-level declarations, and the
+rules run on the pieces in parallel.
+
+A cut always falls right after a `}` that ends its line. A rule is
+splittable (Rule.splittable) when no match can start on that newline or
+hold `}` directly followed by it, so such a rule gives the same result on
+the pieces as on the whole, whatever the cut is inside. Rules that are not
+splittable run on the stitched text in between, in their place in the
+order. The brace balance only picks cuts that keep declarations whole;
+correctness does not depend on it.
+"""
+
+import re
+
+from codemod import engine, ordering
+
+SPLIT_ABOVE = 256 * 1024
+MIN_PIECE = 64 * 1024
+
+_CLOSING_LINE = re.compile(r'^}\n', re.M)
+
+
+def boundaries(text):
+    """Offsets just past each column-0 `}` line where the braces balance"""
+    cuts = []
+    depth = 0
+    last = 0
+    for match in _CLOSING_LINE.finditer(text):
+        end = match.end()
+        if end >= len(text):
+            break
+        depth += text.count('{', last, end) - text.count('}', last, end)
+        last = end
+        if depth == 0:
+            cuts.append(end)
+    return cuts
+
+
+def cut(text, pieces, cuts=None):
+    """`text` in at most `pieces` parts of similar size, cut at boundaries"""
+    if pieces < 2:
+        return [text]
+    if cuts is None:
+        cuts = boundaries(text)
+    chosen = []
+    i = 0
+    for n in range(1, pieces):
+        target = len(text) * n // pieces
+        while i < len(cuts) and cuts[i] < target:
+            i += 1
+        if i == len(cuts):
+            break
+        if not chosen or cuts[i] > chosen[-1]:
+            chosen.append(cuts[i])
+    edges = [0] + chosen + [len(text)]
+    return [text[a:b] for a, b in zip(edges, edges[1:])]
+
+
+def stages(rules, relpath):
+    """Consecutive runs of the rules for relpath: [(splittable, [rules])]"""
+    out = []
+    for rule in rules:
+        if not rule.applies_to(relpath):
+            continue
+        if out and out[-1][0] == rule.splittable:
+            out[-1][1].append(rule)
+        else:
+            out.append((rule.splittable, [rule]))
+    return out
+
+
+def transform(text, rules, relpath, on_rule=None, budget=0, timeouts=None, costs=None,
+              map_pieces=None, pieces=2):
+    """engine.transform, running the splittable stages on pieces through map_pieces
+
+    map_pieces(stage, parts, relpath) returns one (text, hits, timeouts,
+    costs) per part. A stage with a timeout in any piece is rerun on the
+    whole text, so a rule is skipped for all of a file or none of it.
+    """
+    hits = {}
+    for split, stage in stages(rules, relpath):
+        parts = cut(text, pieces) if split and map_pieces is not None else [text]
+        results = map_pieces(stage, parts, relpath) if len(parts) > 1 else None
+        if results is None or any(result[2] for result in results):
+            text, stage_hits = engine.transform(text, stage, relpath, on_rule, budget, timeouts,
+                                                costs)
+            results = [(text, stage_hits, (), {})]
+        else:
+            text = ''.join(result[0] for result in results)
+        for _text, part_hits, _timeouts, part_costs in results:
+            for key, count in part_hits.items():
+                hits[key] = hits.get(key, 0) + count
+            if costs is not None:
+                ordering.add_costs(costs, part_costs)
+    return text, hits
+
+
+def pieces_for(size, jobs):
+    return max(1, min(jobs, size // MIN_PIECE))
@@ -0,0 +1,461 @@
+"""
+Command line entry point: python3 -m codemod <command>
+"""
+
+import argparse
+import os
+import sys
+
+from codemod import rules
+
+
+def _add_selection(parser):
+    parser.add_argument('--script', action='append', dest='scripts', metavar='NAME',
+                        choices=list(rules.RULESETS),
+                        help='only rules lifted from this script (repeatable)')
+    parser.add_argument('--func', action='append', dest='funcs', metavar='NAME',
+                        help="only rules lifted from this function, e.g. "
+                             "'final_cleanup.fix_remaining_issues' (repeatable)")
+
+
+def _add_roots(parser):
+    parser.add_argument('roots', nargs='*', metavar='ROOT',
+                        help='package roots; each is resolved upwards to its pubspec.yaml '
+                             '(default: the package containing the current directory)')
+    parser.add_argument('--packages-under', action='append', default=[], metavar='DIR',
+                        help='also run on every package found below DIR (repeatable)')
+
+
+def _roots(args):
+    from codemod.project import resolve_roots
+    return resolve_roots(args.roots, args.packages_under)
+
+
+def cmd_check(args):
+    from codemod import check
+    return check.run(_roots(args), args.scripts, args.funcs, args.format, args.counts,
+                     index=not args.no_index)
+
+
+def _selected_renames(args):
+    return [rule for rule in rules.select_renames(args.scripts)
+            if not args.funcs or rule.func in args.funcs
+            or f"{rule.script}.{rule.func}" in args.funcs]
+
+
+def _add_telemetry(parser):
+    parser.add_argument('--progress', action=argparse.BooleanOptionalAction, default=None,
+                        help='live progress on stderr (default: when stderr is a terminal)')
+    parser.add_argument('--events', metavar='FILE', help='append JSONL run events to FILE')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='write an OpenMetrics textfile (e.g. for the node exporter) to FILE')
+
+
+def _add_index(parser):
+    parser.add_argument('--no-index', action='store_true',
+                        help='open every file instead of consulting the trigram index')
+
+
+def _telemetry(args, command):
+    from codemod.telemetry import Telemetry
+    return Telemetry(command, progress=args.progress, events_path=args.events,
+                     metrics_path=args.metrics)
+
+
+def cmd_apply(args):
+    from codemod import engine
+    from codemod.cache import TransformCache
+    cache = None if args.no_cache else TransformCache(args.cache_dir)
+    selected = rules.select(args.scripts, args.funcs)
+    roots = _roots(args)
+    check = args.check or args.exhaustive
+    if check and args.emit_patch:
+        print("error: --emit-patch cannot be combined with --check", file=sys.stderr)
+        return 2
+    if check:
+        summary = engine.run(roots, selected, _selected_renames(args), cache, write=False,
+                             telemetry=_telemetry(args, 'apply'),
+                             jobs=args.jobs or os.cpu_count() or 1, index=not args.no_index,
+                             budget=args.rule_budget,
+                             # large files are split up front, before any result comes back
+                             split_above=args.split_above if args.exhaustive else 0,
+                             dedupe=not args.no_dedupe, shared_memory=not args.no_shared_memory,
+                             fail_fast=not args.exhaustive)
+        return _report_check(summary, args.exhaustive)
+    adaptive = None
+    if not args.no_adapt:
+        from codemod.ordering import Adaptive
+        adaptive = Adaptive(roots, selected, args.idle_runs if args.adapt else 0,
+                            args.sweep_every, args.sweep)
+    from codemod.checkpoint import CheckpointError
+    patch = None
+    if args.emit_patch:
+        from codemod.patch import PatchWriter
+        patch = PatchWriter(args.emit_patch)
+    try:
+        summary = engine.run(roots, selected, _selected_renames(args), cache,
+                             write=not args.dry_run and patch is None,
+                             telemetry=_telemetry(args, 'apply'),
+                             jobs=args.jobs or os.cpu_count() or 1, index=not args.no_index,
+                             budget=args.rule_budget, adaptive=adaptive,
+                             split_above=args.split_above,
+                             checkpoints=not args.no_checkpoint, resume=args.resume,
+                             dedupe=not args.no_dedupe,
+                             shared_memory=not args.no_shared_memory, patch=patch)
+    except BaseException as e:
+        if patch is not None:
+            patch.abort()
+        if not isinstance(e, CheckpointError):
+            raise
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if patch is not None:
+        patch.close()
+    line = (f"{summary['files']} files scanned, {summary['changed']} changed "
+            f"in {summary['elapsed']:.2f}s")
+    if len(roots) > 1:
+        line = f"{len(roots)} packages, " + line
+    if summary['skipped']:
+        line += f" ({summary['skipped']} ruled out by the trigram index)"
+    if summary['resumed']:
+        line += f" ({summary['resumed']} already done before the interruption)"
+    if summary['duplicates']:
+        line += f" ({summary['duplicates']} duplicates of other files, transformed once)"
+    if summary['timeouts']:
+        line += f", {len(summary['timeouts'])} rule runs skipped over budget"
+    if cache is not None:
+        line += f" (cache: {summary['cached']} hits, {summary['misses']} misses)"
+    if summary['sweep']:
+        line += ", full sweep"
+    elif summary['deferred']:
+        line += f", {len(summary['deferred'])} idle rules deferred to the next sweep"
+    print(line)
+    if patch is not None:
+        print(f"Patch for {patch.files} files and {patch.renames} moves written to "
+              f"{args.emit_patch}; nothing under lib/ was touched")
+    return 1 if summary['errors'] or summary['timeouts'] else 0
+
+
+def _report_check(summary, exhaustive):
+    """Print the outcome of `apply --check`; returns the exit code"""
+    from codemod.project import label
+    for root, rule in summary['pending']:
+        # named like the files in "Would fix": under the package's label when there are several
+        prefix = label(root) if summary['packages'] > 1 else ''
+        print(f"Would rename {os.path.join(prefix, rule.pattern)} to "
+              f"{os.path.join(prefix, rule.replacement)}")
+    if exhaustive and summary['hits']:
+        print()
+        for key, hits in sorted(summary['hits'].items(), key=lambda item: (-item[1], item[0])):
+            print(f"{hits:6d} in {summary['hit_files'][key]:4d} files  {key}")
+        print()
+    elapsed = f"in {summary['elapsed']:.2f}s"
+    if summary['stopped'] is not None:
+        print(f"Check failed: {summary['stopped']} would change "
+              f"(stopped after {summary['files']} files {elapsed}; "
+              f"--exhaustive lists everything)")
+    elif summary['pending'] and not exhaustive:
+        print(f"Check failed: {len(summary['pending'])} file moves pending {elapsed}")
+    elif summary['changed'] or summary['pending']:
+        print(f"Check failed: {summary['changed']} of {summary['files']} files would change, "
+              f"{len(summary['pending'])} file moves pending {elapsed}")
+    else:
+        print(f"{summary['files']} files checked, nothing would change {elapsed}")
+    if summary['errors'] or summary['timeouts']:
+        print(f"{summary['errors']} files could not be checked, "
+              f"{len(summary['timeouts'])} rule runs skipped over budget")
+    failed = summary['changed'] or summary['pending'] or summary['errors'] or summary['timeouts']
+    return 1 if failed else 0
+
+
+def cmd_patterns(args):
+    from codemod import bench
+    return bench.run(args.scripts, args.funcs, args.format, args.bench, args.max_length,
+                     args.seed, args.rule_budget)
+
+
+def cmd_lsp(args):
+    from codemod import lsp
+    if args.probe:
+        argv = [sys.executable, '-m', 'codemod', 'lsp']
+        for script in args.scripts or ():
+            argv += ['--script', script]
+        for func in args.funcs or ():
+            argv += ['--func', func]
+        return lsp.probe(args.probe, argv)
+    return lsp.run(args.scripts, args.funcs)
+
+
+def cmd_filter(args):
+    from codemod import filter
+    argv = []
+    for script in args.scripts or ():
+        argv += ['--script', script]
+    for func in args.funcs or ():
+        argv += ['--func', func]
+    if args.path is not None:
+        argv += ['--path', args.path]
+    return filter.main(argv)
+
+
+def cmd_rename(args):
+    from codemod import identifiers, patterns
+    renames = []
+    if args.scripts or args.funcs:
+        renames += identifiers.from_rules(rules.select(args.scripts, args.funcs))
+    for old, new in args.names or ():
+        qualifier, _, name = old.rpartition('.')
+        renames.append(identifiers.Rename(name, new, qualifier + '.' if qualifier else ''))
+    for pattern, replacement in args.regexes or ():
+        if not patterns.word_only(pattern):
+            print(f"error: --regex {pattern!r} can match more than word characters",
+                  file=sys.stderr)
+            return 2
+        import re
+        renames.append(identifiers.Rename(pattern, replacement, regex=re.compile(pattern)))
+    if not renames:
+        print("error: nothing to rename; give --name, --regex or a rule selection",
+              file=sys.stderr)
+        return 2
+    status = 0
+    for root in _roots(args):
+        summary = identifiers.run(root, renames, write=not args.dry_run)
+        print(f"{summary['renamed']} identifiers renamed in {summary['changed']} of "
+              f"{summary['files']} candidate files in {summary['elapsed']:.2f}s "
+              f"({summary['lexed']} files lexed)")
+        status = status or (1 if args.dry_run and summary['renamed'] else 0)
+    return status
+
+
+def cmd_move(args):
+    from codemod import moves
+    pairs = [tuple(pair) for pair in args.moves or ()]
+    if args.scripts or args.funcs or not pairs:
+        pairs += [(rule.pattern, rule.replacement) for rule in _selected_renames(args)]
+    if not pairs:
+        print("error: nothing to move; give --move or a script with file moves", file=sys.stderr)
+        return 2
+    status = 0
+    for root in _roots(args):
+        try:
+            summary = moves.run(root, pairs, write=not args.dry_run)
+        except moves.MoveError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+        print(f"{summary['moved']} files moved, {summary['directives']} directives rewritten "
+              f"in {summary['edited']} files in {summary['elapsed']:.2f}s "
+              f"({summary['files']} files checked, {summary['scanned']} scanned)")
+        status = status or (1 if args.dry_run and (summary['moved'] or summary['edited']) else 0)
+    return status
+
+
+def cmd_replay(args):
+    from codemod import replay
+    from codemod.project import find_root
+    jobs = args.jobs or os.cpu_count() or 1
+    try:
+        return replay.main(find_root(args.root), args.revisions, args.scripts, args.funcs, jobs,
+                           args.format, args.cache_dir, keep=not args.clean)
+    except replay.ReplayError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+def cmd_pipeline(args):
+    from codemod import pipeline
+    from codemod.cache import TransformCache
+    cache = None if args.no_cache else TransformCache(args.cache_dir)
+    return pipeline.main(_roots(args), args.scripts, args.funcs, args.format,
+                         run=not args.plan_only, cache=cache,
+                         jobs=args.jobs or os.cpu_count() or 1, index=not args.no_index)
+
+
+def cmd_shadow(args):
+    from codemod import shadow
+    from codemod.project import find_root
+    return shadow.main(find_root(args.root), args.scripts, args.funcs, args.format)
+
+
+def cmd_unused_imports(args):
+    from codemod import imports
+    from codemod.project import find_root
+    return imports.run(find_root(args.root), args.format, args.fix)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python3 -m codemod',
+                                     description='Shared engine behind the Dart fix scripts')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser('check', help='count what the fix scripts would still change')
+    _add_roots(check)
+    _add_selection(check)
+    check.add_argument('--format', choices=['text', 'json'], default='text')
+    check.add_argument('--counts', action='store_true',
+                       help='print per-rule, per-file counts instead of each diagnostic')
+    _add_index(check)
+    check.set_defaults(handler=cmd_check)
+
+    apply = commands.add_parser('apply', help='apply the rules of the selected scripts in one pass')
+    _add_roots(apply)
+    _add_selection(apply)
+    apply.add_argument('--dry-run', action='store_true', help='report changes without writing')
+    apply.add_argument('--emit-patch', metavar='FILE',
+                       help='write nothing under lib/; stream the changes and file moves into '
+                            'FILE as a patch for `git apply`, run from the package root')
+    apply.add_argument('--check', action='store_true',
+                       help='write nothing and exit 1 at the first file the rules would change '
+                            '(for CI); rules run in script order')
+    apply.add_argument('--exhaustive', action='store_true',
+                       help='with --check, scan every file and print a per-rule summary')
+    apply.add_argument('--no-cache', action='store_true', help='bypass the shared transform cache')
+    apply.add_argument('--cache-dir', metavar='DIR',
+                       help='shared cache directory (default: $CODEMOD_CACHE or ~/.cache/elythra-codemod)')
+    apply.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                       help='worker processes shared by all packages; 0 for one per CPU '
+                            '(default: 1, in-process)')
+    apply.add_argument('--split-above', type=int, default=256 * 1024, metavar='BYTES',
+                       help='with -j, cut files this large at top-level declarations and share '
+                            'the pieces across the workers (default: 262144, 0 disables)')
+    apply.add_argument('--no-shared-memory', action='store_true',
+                       help='with -j, have workers read files from disk and send them back whole '
+                            'instead of sharing one memory arena')
+    _add_index(apply)
+    apply.add_argument('--no-dedupe', action='store_true',
+                       help='transform every file on its own, even if another has the same content')
+    apply.add_argument('--rule-budget', type=float, default=5.0, metavar='SECONDS',
+                       help='skip and report a rule that runs longer than this on one file '
+                            '(default: 5, 0 disables)')
+    apply.add_argument('--resume', action='store_true',
+                       help='continue an interrupted run, skipping the files it finished')
+    apply.add_argument('--no-checkpoint', action='store_true',
+                       help='do not log finished files to .dart_tool/codemod/checkpoint.log')
+    apply.add_argument('--no-adapt', action='store_true',
+                       help='run every selected rule in script order, ignoring rule statistics')
+    apply.add_argument('--sweep', action='store_true',
+                       help='run every rule in script order now and re-plan from the results')
+    apply.add_argument('--adapt', action='store_true',
+                       help='also defer rules that matched nothing in --idle-runs runs to the '
+                            'periodic sweep; until then a file they would now change is left as '
+                            'it is, unlike in the scripts')
+    apply.add_argument('--idle-runs', type=int, default=5, metavar='N',
+                       help='with --adapt, runs without a match before a rule is deferred '
+                            '(default: 5)')
+    apply.add_argument('--sweep-every', type=int, default=10, metavar='N',
+                       help='full sweep every N runs (default: 10)')
+    _add_telemetry(apply)
+    apply.set_defaults(handler=cmd_apply)
+
+    audit = commands.add_parser('patterns',
+                                help='flag rule regexes prone to catastrophic backtracking')
+    _add_selection(audit)
+    audit.add_argument('--format', choices=['text', 'json'], default='text')
+    audit.add_argument('--bench', action='store_true',
+                       help='also fuzz each pattern and measure how its worst case scales')
+    audit.add_argument('--max-length', type=int, default=8000, metavar='N',
+                       help='longest fuzz input in characters (default: 8000)')
+    audit.add_argument('--seed', type=int, default=0, help='fuzz seed (default: 0)')
+    audit.add_argument('--rule-budget', type=float, default=2.0, metavar='SECONDS',
+                       help='give up on a pattern at one length after this long (default: 2)')
+    audit.set_defaults(handler=cmd_patterns)
+
+    server = commands.add_parser('lsp', help='language server on stdio offering the fixes as '
+                                             'code actions')
+    _add_selection(server)
+    server.add_argument('--probe', nargs='+', metavar='FILE',
+                        help='instead of serving, start a server, open FILE in it and time '
+                             'the code action requests')
+    server.set_defaults(handler=cmd_lsp)
+
+    rename = commands.add_parser('rename', help='rename identifiers in code only, through the '
+                                                'persistent identifier index')
+    _add_roots(rename)
+    _add_selection(rename)
+    rename.add_argument('--name', nargs=2, action='append', dest='names', metavar=('OLD', 'NEW'),
+                        help="rename the identifier OLD, or OLD's last part when written after "
+                             "the rest, as in 'SourceEngine.eng_JIS' (repeatable)")
+    rename.add_argument('--regex', nargs=2, action='append', dest='regexes',
+                        metavar=('PATTERN', 'REPLACEMENT'),
+                        help='re.sub each identifier with a pattern that only matches word '
+                             'characters (repeatable)')
+    rename.add_argument('--dry-run', action='store_true',
+                        help='report the renames without writing; exit 1 if there are any')
+    rename.set_defaults(handler=cmd_rename)
+
+    relocate = commands.add_parser('move', help='move files and rewrite the directives naming '
+                                                'them, in one transaction')
+    _add_roots(relocate)
+    _add_selection(relocate)
+    relocate.add_argument('--move', nargs=2, action='append', dest='moves', metavar=('OLD', 'NEW'),
+                          help='move the file at OLD to NEW, both relative to the package root '
+                               '(repeatable; default: the moves of the selected scripts)')
+    relocate.add_argument('--dry-run', action='store_true',
+                          help='report the moves and edits without making them; exit 1 if there '
+                               'are any')
+    relocate.set_defaults(handler=cmd_move)
+
+    stream = commands.add_parser('filter', help='apply the rules to a source read from stdin and '
+                                                'write it to stdout (editor and git filter)')
+    _add_selection(stream)
+    stream.add_argument('--path', metavar='RELPATH',
+                        help="the file's path, relative to the package root or absolute, so "
+                             "rules limited to particular files can apply")
+    stream.set_defaults(handler=cmd_filter)
+
+    history = commands.add_parser('replay', help='run the rules over every commit of a range, '
+                                                 'in reused git worktrees, without writing')
+    history.add_argument('revisions', metavar='RANGE',
+                         help="commits to replay, e.g. 'v1.0..HEAD', or a single commit")
+    history.add_argument('--root', help='package root (default: the package containing the '
+                                        'current directory)')
+    _add_selection(history)
+    history.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                         help='worktrees replayed in parallel, each taking a contiguous run of '
+                              'commits; 0 for one per CPU (default: 1)')
+    history.add_argument('--format', choices=['text', 'json'], default='text')
+    history.add_argument('--cache-dir', metavar='DIR',
+                         help='shared cache directory, which also holds the worktrees (default: '
+                              '$CODEMOD_CACHE or ~/.cache/elythra-codemod)')
+    history.add_argument('--clean', action='store_true',
+                         help='remove the worktrees afterwards instead of keeping them for the '
+                              'next replay')
+    history.set_defaults(handler=cmd_replay)
+
+    chain = commands.add_parser('pipeline', help='plan the selected scripts, in the order given, '
+                                                 'as the fewest tree passes and run them')
+    _add_roots(chain)
+    _add_selection(chain)
+    chain.add_argument('--plan-only', action='store_true',
+                       help='print the plan and the estimated savings without running it')
+    chain.add_argument('--format', choices=['text', 'json'], default='text')
+    chain.add_argument('--no-cache', action='store_true', help='bypass the shared transform cache')
+    chain.add_argument('--cache-dir', metavar='DIR',
+                       help='shared cache directory (default: $CODEMOD_CACHE or '
+                            '~/.cache/elythra-codemod)')
+    chain.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                       help='worker processes per pass; 0 for one per CPU (default: 1)')
+    _add_index(chain)
+    chain.set_defaults(handler=cmd_pipeline)
+
+    compare = commands.add_parser('shadow', help='run the legacy fix functions and the engine side '
+                                                 'by side in memory and compare their output')
+    compare.add_argument('root', nargs='?', help='package root (default: the package '
+                                                 'containing the current directory)')
+    _add_selection(compare)
+    compare.add_argument('--format', choices=['text', 'json'], default='text')
+    compare.set_defaults(handler=cmd_shadow)
+
+    unused = commands.add_parser('unused-imports',
+                                 help='compute unused imports from per-file export tables')
+    unused.add_argument('root', nargs='?', help='package root (default: the package '
+                                                'containing the current directory)')
+    unused.add_argument('--format', choices=['text', 'json'], default='text')
+    unused.add_argument('--fix', action='store_true', help='remove the unused imports')
+    unused.set_defaults(handler=cmd_unused_imports)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
@@ -0,0 +1,677 @@
+"""
+Fused rule application: every selected rule is applied to a file in one
+read/transform/write, in the order the scripts would have applied them
+"""
+
+import functools
+import hashlib
+import os
+import stat
+import tempfile
+import time
+
+from codemod import budget as rule_budget
+from codemod import files, ordering, project
+from codemod.cache import NO_CHANGE
+from codemod.scopes import Matcher
+
+ENGINE_VERSION = '1'
+
+
+class FileResult:
+    """Outcome of running the rules over one file"""
+
+    __slots__ = ('relpath', 'blob', 'size', 'output', 'hits', 'cached', 'error', 'timeouts',
+                 'costs', 'conflicts', 'edits', 'patch', 'missed')
+
+    def __init__(self, relpath, blob=None, size=0, output=None, hits=None, cached=False, error=None,
+                 timeouts=None, costs=None, conflicts=None, edits=None, patch=None, missed=False):
+        self.relpath = relpath
+        self.blob = blob
+        self.size = size
+        self.output = output
+        self.hits = hits or {}
+        self.cached = cached
+        # the transform cache was asked for this file and had nothing
+        self.missed = missed
+        self.error = error
+        self.timeouts = timeouts or []
+        self.costs = costs or {}
+        self.conflicts = conflicts or []
+        # set instead of output by a worker reading from a shared arena (see codemod.arena)
+        self.edits = edits
+        # set instead of output by a worker diffing its files for a patch (see codemod.patch)
+        self.patch = patch
+
+    @property
+    def changed(self):
+        return self.output is not None or self.patch is not None
+
+
+def normalize_newlines(text):
+    """What reading in text mode does to the file, as the scripts did"""
+    if '\r' not in text:
+        return text
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def transform(text, rules, relpath, on_rule=None, budget=0, timeouts=None, costs=None,
+              allowed=None):
+    """Apply the rules that target relpath, in order; returns (text, hits)
+
+    A rule that runs longer than `budget` seconds on the file is abandoned,
+    leaving the text as it was, and its key is appended to `timeouts`.
+    With `costs`, each rule's [tried, ran, matched, hits, bytes, seconds]
+    for this file is added to costs[rule.key] (see codemod.ordering).
+    `allowed` holds the keys of the rules the trigram index says may match
+    the text as given; the others are passed over without looking at the
+    text until some rule has changed it.
+    """
+    hits = {}
+    for rule in rules:
+        if not rule.applies_to(relpath):
+            continue
+        entry = None
+        if costs is not None:
+            entry = costs.get(rule.key)
+            if entry is None:
+                entry = costs[rule.key] = [0, 0, 0, 0, 0, 0.0]
+            entry[0] += 1
+        if allowed is not None and rule.key not in allowed:
+            continue
+        if not rule.may_match(text):
+            continue
+        if on_rule is not None:
+            on_rule(rule)
+        started = time.perf_counter()
+        size = len(text)
+        try:
+            text, count = rule_budget.call(budget, rule.apply, text)
+        except rule_budget.RuleTimeout:
+            if timeouts is not None:
+                timeouts.append(rule.key)
+            continue
+        finally:
+            if entry is not None:
+                entry[1] += 1
+                entry[4] += size
+                entry[5] += time.perf_counter() - started
+        if count:
+            # a rule the index ruled out can match what this one wrote
+            allowed = None
+            hits[rule.key] = hits.get(rule.key, 0) + count
+            if entry is not None:
+                entry[2] += 1
+                entry[3] += count
+    return text, hits
+
+
+_ruleset_hashes = {}
+
+
+def ruleset_hash(rules, relpath=None):
+    """Hash of the rules that apply to relpath (all rules if relpath is None)"""
+    keys = tuple(rule.key for rule in rules if relpath is None or rule.applies_to(relpath))
+    digest = _ruleset_hashes.get(keys)
+    if digest is None:
+        digest = hashlib.sha1('\n'.join((ENGINE_VERSION,) + keys).encode('utf-8')).hexdigest()
+        _ruleset_hashes[keys] = digest
+    return digest
+
+
+def process_data(relpath, data, rules, cache=None, on_rule=None, budget=0, replay=None,
+                 split=None, hint=None):
+    """Run the rules over one file's bytes (or a view of them); output is None when nothing changes
+
+    With `replay` (the same rules in another order), a file the rules change
+    is transformed again in that order, even when the cache has its output;
+    if the text differs, every rule that touched the file in either order
+    is listed in the result's conflicts.
+    `split` stands in for transform (see codemod.chunks).
+    `hint` is (blob, keys of the rules that may match it) from the trigram
+    index, passed on to transform as `allowed` if the data is still that
+    blob.
+    """
+    blob = files.blob_hash(data) if cache is not None or hint is not None else None
+    allowed = hint[1] if hint is not None and hint[0] == blob else None
+    if cache is not None:
+        ruleset = ruleset_hash(rules, relpath)
+        cached = cache.get(blob, ruleset)
+        if cached is NO_CHANGE:
+            return FileResult(relpath, blob, len(data), cached=True)
+        if cached is not None and replay is None:
+            return FileResult(relpath, blob, len(data), output=cached, cached=True)
+    try:
+        original = normalize_newlines(str(data, 'utf-8'))
+    except UnicodeDecodeError as e:
+        return FileResult(relpath, blob, len(data), error=e, missed=cache is not None)
+    timeouts = []
+    costs = {}
+    if split is None:
+        text, hits = transform(original, rules, relpath, on_rule, budget, timeouts, costs, allowed)
+    else:
+        text, hits = split(original, rules, relpath, on_rule, budget, timeouts, costs)
+    output = text.encode('utf-8') if text != original else None
+    if cache is not None and not timeouts:
+        cache.put(blob, ruleset, NO_CHANGE if output is None else output)
+    conflicts = None
+    if replay is not None and output is not None and not timeouts:
+        other, other_hits = transform(original, replay, relpath, budget=budget, timeouts=timeouts,
+                                      allowed=allowed)
+        if other != text:
+            conflicts = sorted(set(hits) | set(other_hits))
+    return FileResult(relpath, blob, len(data), output=output, hits=hits, timeouts=timeouts,
+                      costs=costs, conflicts=conflicts, missed=cache is not None and cached is None)
+
+
+def process_file(root, relpath, rules, cache=None, on_rule=None, budget=0, replay=None,
+                 split=None, hint=None):
+    try:
+        data = files.read_bytes(root, relpath)
+    except OSError as e:
+        return FileResult(relpath, error=e)
+    return process_data(relpath, data, rules, cache, on_rule, budget, replay, split, hint)
+
+
+def write_output(root, relpath, output):
+    """Replace the file in one step, so an interrupted run never leaves it half written"""
+    path = os.path.join(root, relpath)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.codemod-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(output)
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def apply_renames(root, renames, log=print):
+    """Move files the way fix_all_issues.fix_file_naming does"""
+    moved = []
+    for rule in renames:
+        old_full = os.path.join(root, rule.pattern)
+        new_full = os.path.join(root, rule.replacement)
+        files.finish_move(new_full)
+        if files.exists(root, rule.pattern):
+            os.makedirs(os.path.dirname(new_full), exist_ok=True)
+            files.move(old_full, new_full)
+            log(f"Renamed {rule.pattern} to {rule.replacement}")
+            moved.append(rule)
+    return moved
+
+
+def pending_renames(root, renames):
+    """The moves apply_renames would still make"""
+    return [rule for rule in renames if files.exists(root, rule.pattern)]
+
+
+def _sizes(root, paths):
+    sizes = []
+    for relpath in paths:
+        try:
+            sizes.append(os.stat(os.path.join(root, relpath)).st_size)
+        except OSError:
+            sizes.append(0)
+    return sizes
+
+
+_worker_rules = None
+_worker_scopes = None
+_worker_cache = None
+_worker_budget = 0
+_worker_replay = None
+_worker_arena = None
+_worker_scratch = None
+_worker_diffs = False
+
+
+def _matchers(rules, replay):
+    """Scope matchers for the rules and, if given, the replay order"""
+    return Matcher(rules), None if replay is None else Matcher(replay)
+
+
+def _for_file(scopes, relpath):
+    rules, replay = scopes
+    return rules.rules_for(relpath), None if replay is None else replay.rules_for(relpath)
+
+
+def _init_worker(rules, cache_dir, budget, replay, arena_name=None, diffs=False):
+    """Compile the rule set once per worker process, for the life of the pool"""
+    global _worker_rules, _worker_scopes, _worker_cache, _worker_budget, _worker_replay, \
+        _worker_arena, _worker_diffs
+    from codemod.cache import TransformCache
+    _worker_rules = [rule.compile() for rule in rules]
+    _worker_cache = TransformCache(cache_dir) if cache_dir is not None else None
+    _worker_budget = budget
+    if replay is not None:
+        by_key = {rule.key: rule for rule in _worker_rules}
+        _worker_replay = [by_key[key] for key in replay]
+    _worker_scopes = _matchers(_worker_rules, _worker_replay)
+    _worker_arena = arena_name
+    _worker_diffs = diffs
+
+
+def _packed(hint, positions):
+    """A process_data hint with its rule keys as a bitmask over the pool's rule list"""
+    if hint is None:
+        return None
+    mask = 0
+    for key in hint[1]:
+        mask |= 1 << positions[key]
+    return hint[0], mask
+
+
+def _unpacked(packed):
+    if packed is None:
+        return None
+    blob, mask = packed
+    return blob, frozenset(rule.key for i, rule in enumerate(_worker_rules) if mask >> i & 1)
+
+
+def _work(task):
+    """One file, read from disk or, given its span, from the arena (returning edits)
+
+    When the pool diffs its files, a changed file comes back as the hunks of
+    its patch instead.
+    """
+    root, relpath, span, packed = task
+    started = time.perf_counter()
+    rules, replay = _for_file(_worker_scopes, relpath)
+    hint = _unpacked(packed)
+    if span is None:
+        result = process_file(root, relpath, rules, _worker_cache, budget=_worker_budget,
+                              replay=replay, hint=hint)
+        if _worker_diffs and result.output is not None:
+            from codemod import patch
+            result.patch = patch.hunks(files.read_bytes(root, relpath), result.output)
+            result.output = None
+    else:
+        from codemod import arena
+        offset, length = span
+        with arena.attach(_worker_arena).buf[offset:offset + length] as data:
+            result = process_data(relpath, data, rules, _worker_cache, budget=_worker_budget,
+                                  replay=replay, hint=hint)
+            if result.output is not None:
+                if _worker_diffs:
+                    from codemod import patch
+                    result.patch = patch.hunks(bytes(data), result.output)
+                else:
+                    result.edits = arena.edits(bytes(data), result.output)
+                result.output = None
+    return result, time.perf_counter() - started
+
+
+def _work_piece(task):
+    """Run a stage of splittable rules (positions in the worker's rule list) on one piece
+
+    The piece is a text, or (block, offset, length) in the parent's scratch
+    block, in which case the edits to it are returned instead of its text.
+    """
+    global _worker_scratch
+    positions, relpath, piece = task
+    data = None
+    if isinstance(piece, str):
+        text = piece
+    else:
+        from codemod import arena
+        name, offset, length = piece
+        if name != _worker_scratch:
+            arena.detach(_worker_scratch)
+            _worker_scratch = name
+        with arena.attach(name).buf[offset:offset + length] as view:
+            data = bytes(view)
+        text = data.decode('utf-8')
+    timeouts = []
+    costs = {}
+    text, hits = transform(text, [_worker_rules[i] for i in positions], relpath,
+                           budget=_worker_budget, timeouts=timeouts, costs=costs)
+    if data is not None:
+        output = text.encode('utf-8')
+        text = arena.edits(data, output) if output != data else []
+    return text, hits, timeouts, costs
+
+
+def _serial(tasks, rules, cache, on_rule, budget, replay, hints):
+    for rule in rules:
+        rule.compile()
+    scopes = _matchers(rules, replay)
+    for root, relpath in tasks:
+        started = time.perf_counter()
+        file_rules, file_replay = _for_file(scopes, relpath)
+        result = process_file(root, relpath, file_rules, cache, on_rule, budget, file_replay,
+                              hint=hints.get((root, relpath)))
+        yield result, time.perf_counter() - started
+
+
+def _pooled(tasks, rules, cache, jobs, budget, replay, split_above, hints, shared=False,
+            diffs=False):
+    """Files in the pool; files over split_above bytes are cut up and shared out first
+
+    With `shared`, the files are read into one shared-memory arena and the
+    workers send back edits rather than whole files (see codemod.arena).
+    With `diffs`, they send back patch hunks instead (see codemod.patch).
+    """
+    store = None
+    if shared:
+        from codemod import arena
+        try:
+            store = arena.Arena(tasks)
+        except OSError:
+            pass
+    try:
+        yield from _pool(tasks, rules, cache, jobs, budget, replay, split_above, hints, store,
+                         diffs)
+    finally:
+        if store is not None:
+            store.close()
+
+
+def _pool(tasks, rules, cache, jobs, budget, replay, split_above, hints, store, diffs=False):
+    from concurrent.futures import ProcessPoolExecutor
+    cache_dir = cache.root if cache is not None else None
+    replay_keys = None if replay is None else [rule.key for rule in replay]
+    positions = {rule.key: i for i, rule in enumerate(rules)}
+    large = {}
+    if split_above:
+        for root, relpath in tasks:
+            size = _sizes(root, [relpath])[0]
+            if size >= split_above:
+                large[root, relpath] = size
+    rest = [task for task in tasks if task not in large]
+    chunksize = max(1, min(32, len(rest) // (jobs * 4) or 1))
+    with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                             initargs=(rules, cache_dir, budget, replay_keys,
+                                       None if store is None else store.name, diffs)) as pool:
+        done = {}
+        if large:
+            from codemod import chunks
+
+            def map_pieces(stage, parts, relpath):
+                ids = [positions[rule.key] for rule in stage]
+                if store is None:
+                    return list(pool.map(_work_piece, [(ids, relpath, part) for part in parts]))
+                name, spans = store.stage(parts)
+                results = pool.map(_work_piece, [(ids, relpath, (name,) + span)
+                                                 for span in spans])
+                return [(store.unstage(span, changes), hits, timeouts, costs)
+                        for span, (changes, hits, timeouts, costs) in zip(spans, results)]
+
+            for rule in rules:
+                rule.compile()
+            scopes = _matchers(rules, replay)
+            for (root, relpath), size in large.items():
+                split = functools.partial(chunks.transform, map_pieces=map_pieces,
+                                          pieces=chunks.pieces_for(size, jobs))
+                started = time.perf_counter()
+                file_rules, file_replay = _for_file(scopes, relpath)
+                if store is not None and store.span((root, relpath)) is not None:
+                    with store.view((root, relpath)) as data:
+                        result = process_data(relpath, data, file_rules, cache, budget=budget,
+                                              replay=file_replay, split=split,
+                                              hint=hints.get((root, relpath)))
+                else:
+                    result = process_file(root, relpath, file_rules, cache, budget=budget,
+                                          replay=file_replay, split=split,
+                                          hint=hints.get((root, relpath)))
+                done[root, relpath] = result, time.perf_counter() - started
+        spans = [None if store is None else store.span(task) for task in rest]
+        results = pool.map(_work, [task + (span, _packed(hints.get(task), positions))
+                                   for task, span in zip(rest, spans)], chunksize=chunksize)
+        try:
+            for task in tasks:
+                if task in done:
+                    yield done.pop(task)
+                    continue
+                result, seconds = next(results)
+                if result.edits is not None:
+                    result.output = store.patch(task, result.edits)
+                    result.edits = None
+                yield result, seconds
+        finally:
+            # a caller that stops early (fail-fast checks) does not wait for the rest
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _index_candidates(root, paths, rules):
+    """(paths at least one rule may match, {path: (blob, keys of the rules that may match it)})
+    per the root's trigram index
+
+    Each rule is narrowed on its own: one without a literal of three
+    characters keeps every file in its scope, and leaves the others to the
+    files the index allows.
+    """
+    from codemod.trigrams import TrigramIndex
+    index = TrigramIndex(root)
+    index.refresh(paths)
+    index.save()
+    candidates = index.narrow(rules)
+    kept = [relpath for relpath in paths if relpath in candidates]
+    blob = index.meta.blob
+    return kept, {relpath: (blob(relpath), frozenset(rule.key for rule in candidates[relpath]))
+                  for relpath in kept if blob(relpath) is not None}
+
+
+def _dedupe(tasks, rules, replay, known):
+    """(one task per distinct content and rule set, {kept task: [its duplicates]})
+
+    Blobs come from `known` ({(root, relpath): blob}, filled in from the
+    trigram index) or are hashed here. The rules that apply to a file depend
+    on its path, so files are only grouped when both match.
+    """
+    matcher, replayed = _matchers(rules, replay)
+    kept = []
+    duplicates = {}
+    groups = {}
+    for root, relpath in tasks:
+        blob = known.get((root, relpath))
+        if blob is None:
+            try:
+                blob = files.blob_hash(files.read_bytes(root, relpath))
+            except OSError:
+                kept.append((root, relpath))
+                continue
+        key = (blob, id(matcher.rules_for(relpath)),
+               None if replayed is None else id(replayed.rules_for(relpath)))
+        first = groups.get(key)
+        if first is None:
+            groups[key] = (root, relpath)
+            kept.append((root, relpath))
+        else:
+            duplicates.setdefault(first, []).append((root, relpath))
+    return kept, duplicates
+
+
+def run(roots, rules, renames=(), cache=None, write=True, telemetry=None, jobs=1, index=True,
+        budget=0, adaptive=None, split_above=0, checkpoints=False, resume=False, dedupe=True,
+        shared_memory=True, fail_fast=False, patch=None):
+    """Apply the rules to every Dart file under each root's lib; returns a summary dict
+
+    All roots are fed through the same compiled rules and, with jobs > 1, the
+    same worker pool, so a fleet of packages pays the start-up cost once.
+    With `index`, files the trigram index rules out for every selected rule
+    are not opened at all: if no rule matches a file as it is, none of them
+    can change it. In the files that are opened, the rules it rules out are
+    passed over until another rule has changed the text. A rule that
+    exceeds `budget` seconds on one file is skipped for that file and
+    reported. With `adaptive` (an ordering.Adaptive), its planned order
+    replaces the given one and the run's costs are fed back into it.
+    With jobs > 1, files of at least `split_above` bytes are cut at
+    top-level declarations and their splittable rules run on the pieces
+    across the pool (see codemod.chunks). With `checkpoints`, finished files
+    are logged per root, and with `resume` the files a previous, interrupted
+    run of the same rules finished are skipped (see codemod.checkpoint).
+    With `dedupe`, files with the same content and rules, in any of the
+    roots, are transformed once and the result is written to all of them.
+    With jobs > 1 and `shared_memory`, the pool reads the files from one
+    shared-memory arena and returns edits (see codemod.arena).
+    Rules scoped only to files a move earlier in the scripts takes away are
+    left out (see pipeline.moved_away). Without `write`, summary['pending']
+    lists the (root, rename) moves still to make. With `fail_fast`, the run
+    stops at the first file that would change, or before reading any if a
+    move is pending, and summary['stopped'] names that file. With `patch` (a patch.PatchWriter)
+    and without `write`, the changes and pending moves are streamed into it
+    as a unified diff; with jobs > 1 the workers compute the hunks.
+    """
+    if isinstance(roots, str):
+        roots = [roots]
+    replay = None
+    if adaptive is not None:
+        rules = adaptive.rules
+        replay = adaptive.replay
+    if renames:
+        from codemod.pipeline import moved_away
+        dead = moved_away(rules, renames)
+        if dead:
+            rules = [rule for rule in rules if rule.key not in dead]
+            replay = replay and [rule for rule in replay if rule.key not in dead]
+    started = time.perf_counter()
+    log = telemetry.log if telemetry else print
+    on_rule = telemetry.on_rule if telemetry else None
+    summary = {'files': 0, 'changed': 0, 'errors': 0, 'cached': 0, 'skipped': 0, 'bytes': 0,
+               'hits': {}, 'timeouts': [], 'packages': len(roots), 'conflicts': set(),
+               'sweep': None if adaptive is None else adaptive.sweep,
+               'deferred': [] if adaptive is None else [rule.key for rule in adaptive.demoted],
+               'hit_files': {}, 'pending': [], 'stopped': None, 'resumed': 0, 'duplicates': 0,
+               'misses': 0}
+    costs = {root: {} for root in roots}
+    if not write:
+        summary['pending'] = [(root, rule) for root in roots
+                              for rule in pending_renames(root, renames)]
+        if fail_fast and summary['pending']:
+            summary['elapsed'] = time.perf_counter() - started
+            return summary
+    discovered = {root: files.discover(root) for root in roots}
+    known = {}
+    hints = {}
+    if index:
+        for root, paths in discovered.items():
+            discovered[root], found = _index_candidates(root, paths, rules)
+            summary['skipped'] += len(paths) - len(discovered[root])
+            hints.update(((root, relpath), hint) for relpath, hint in found.items())
+        known = {task: hint[0] for task, hint in hints.items()}
+    journals = {}
+    if write and checkpoints:
+        from codemod import checkpoint
+        run_signature = checkpoint.signature(rules, renames)
+        journals = {root: checkpoint.Checkpoint(root, run_signature, resume, renames)
+                    for root in roots}
+    if resume:
+        for root, journal in journals.items():
+            paths = [relpath for relpath in discovered[root] if not journal.completed(relpath)]
+            summary['resumed'] += len(discovered[root]) - len(paths)
+            discovered[root] = paths
+    tasks = [(root, relpath) for root in roots for relpath in discovered[root]]
+    duplicates = {}
+    if dedupe:
+        tasks, duplicates = _dedupe(tasks, rules, replay, known)
+    summary['duplicates'] = sum(len(group) for group in duplicates.values())
+    labels = {root: project.label(root) if len(roots) > 1 else '' for root in roots}
+    if patch is not None and not write:
+        for root, rule in summary['pending']:
+            patch.move(_shown(labels[root], rule.pattern), _shown(labels[root], rule.replacement))
+    if telemetry:
+        total = sum(sum(_sizes(root, paths)) for root, paths in discovered.items())
+        telemetry.start(len(tasks) + summary['duplicates'], total,
+                        roots=[os.path.abspath(r) for r in roots],
+                        rules=len(rules), jobs=jobs, skipped=summary['skipped'],
+                        sweep=summary['sweep'], deferred=len(summary['deferred']),
+                        resumed=summary['resumed'])
+    if jobs > 1 and len(tasks) > 1:
+        results = _pooled(tasks, rules, cache, jobs, budget, replay, split_above, hints,
+                          shared_memory, diffs=patch is not None and not write)
+    else:
+        results = _serial(tasks, rules, cache, on_rule, budget, replay, hints)
+    try:
+        _collect(tasks, results, duplicates, summary, costs, labels, journals, adaptive, write,
+                 telemetry, log, budget, fail_fast, patch)
+        summary['files'] += summary['skipped'] + summary['resumed']
+        if adaptive is not None:
+            adaptive.finish(costs, summary['conflicts'])
+            for key in sorted(adaptive.pinned):
+                log(f"Pinned {key}: reordering it changed the output")
+        if write:
+            summary['renamed'] = sum(len(apply_renames(root, renames, log)) for root in roots)
+        for journal in journals.values():
+            journal.finish()
+    finally:
+        for journal in journals.values():
+            journal.close()
+    summary['elapsed'] = time.perf_counter() - started
+    if cache is not None:
+        cache.prune()
+    if telemetry:
+        telemetry.finish()
+    return summary
+
+
+def _collect(tasks, results, duplicates, summary, costs, labels, journals, adaptive, write,
+             telemetry, log, budget, fail_fast=False, patch=None):
+    """Fold each file's result into the summary, writing (and logging) changed files
+
+    A result stands for its task and for every duplicate of it.
+    """
+    for task, (first, seconds) in zip(tasks, results):
+        summary['misses'] += first.missed
+        if adaptive is not None:
+            ordering.add_costs(costs[task[0]], first.costs)
+            summary['conflicts'].update(first.conflicts)
+        for root, relpath in [task] + duplicates.get(task, []):
+            if (root, relpath) == task:
+                result = first
+            else:
+                result = FileResult(relpath, first.blob, first.size, first.output, first.hits,
+                                    first.cached, first.error, first.timeouts, patch=first.patch)
+                seconds = 0.0
+            _record(root, relpath, result, seconds, summary, labels, journals, write, telemetry,
+                    log, budget, patch)
+            if fail_fast and result.changed and result.error is None:
+                summary['stopped'] = result.relpath
+                return
+
+
+def _shown(label, relpath):
+    """relpath as a patch names it: under the package's label, '/'-separated"""
+    return os.path.join(label, relpath).replace(os.sep, '/')
+
+
+def _record(root, relpath, result, seconds, summary, labels, journals, write, telemetry, log,
+            budget, patch=None):
+    """Count, write (or add to the patch), journal and report one file's result"""
+    shown = os.path.join(labels[root], relpath)
+    result.relpath = shown
+    summary['files'] += 1
+    summary['bytes'] += result.size
+    summary['cached'] += result.cached
+    if result.error is None:
+        for key, count in result.hits.items():
+            summary['hits'][key] = summary['hits'].get(key, 0) + count
+            summary['hit_files'][key] = summary['hit_files'].get(key, 0) + 1
+        journal = journals.get(root)
+        if result.changed:
+            summary['changed'] += 1
+            if write:
+                if journal is not None:
+                    journal.changed(relpath, result.output)
+                write_output(root, relpath, result.output)
+            elif patch is not None:
+                if result.patch is None:
+                    from codemod.patch import hunks
+                    result.patch = hunks(files.read_bytes(root, relpath), result.output)
+                patch.file(_shown(labels[root], relpath), result.patch)
+        elif journal is not None:
+            journal.unchanged(relpath)
+    if telemetry:
+        telemetry.file_done(result, seconds)
+    for key in result.timeouts:
+        summary['timeouts'].append((shown, key))
+        log(f"Skipped {key} on {shown}: over its {budget:g}s budget")
+    if result.error is not None:
+        summary['errors'] += 1
+        log(f"Error processing {shown}: {result.error}")
+    elif result.changed:
+        log(f"Fixed {shown}" if write else f"Would fix {shown}")
@@ -0,0 +1,114 @@
+"""
+Discovery and I/O of the Dart sources the fix scripts operate on
+"""
+
+import hashlib
+import os
+
+# where move() parks a file between the two steps of a case-only rename
+MOVE_SUFFIX = '.codemod-move'
+
+
+def discover(root, subdir='lib', suffix='.dart'):
+    """Sorted root-relative paths of the Dart files under root/subdir
+
+    Hidden directories and files are skipped, like glob('lib/**/*.dart').
+    """
+    found = []
+    top = os.path.join(root, subdir)
+    stack = [top]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(suffix):
+                    found.append(os.path.relpath(entry.path, root).replace(os.sep, '/'))
+    found.sort()
+    return found
+
+
+def exists(root, relpath):
+    """True if relpath is there, spelled exactly as given
+
+    On a case-insensitive file system os.path.exists() also finds
+    lib/core/utils/load_Image.dart once the file is load_image.dart; here
+    each part of the path must be listed in its directory as written.
+    """
+    if not os.path.exists(os.path.join(root, relpath)):
+        return False
+    parent = root
+    for part in relpath.replace(os.sep, '/').split('/'):
+        try:
+            if part not in os.listdir(parent):
+                return False
+        except OSError:
+            return False
+        parent = os.path.join(parent, part)
+    return True
+
+
+def same_file(a, b):
+    """True if paths a and b name one file, as the two sides of a case-only
+    rename do on a case-insensitive file system
+    """
+    if os.path.normcase(a) == os.path.normcase(b):
+        return True
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def move(source, target):
+    """os.rename(source, target), in two steps through a temporary name when
+    both name the same file
+
+    Some case-insensitive file systems ignore or refuse a one-step rename
+    that only changes case. finish_move() completes one that was cut off
+    between the steps.
+    """
+    if not same_file(source, target):
+        os.rename(source, target)
+        return
+    parked = target + MOVE_SUFFIX
+    os.rename(source, parked)
+    os.rename(parked, target)
+
+
+def finish_move(target):
+    """Put a file move() left at its temporary name in place; True if there was one"""
+    parked = target + MOVE_SUFFIX
+    if not os.path.exists(parked) or os.path.exists(target):
+        return False
+    os.rename(parked, target)
+    return True
+
+
+def read_text(root, relpath):
+    with open(os.path.join(root, relpath), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def write_text(root, relpath, content):
+    with open(os.path.join(root, relpath), 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def read_bytes(root, relpath):
+    with open(os.path.join(root, relpath), 'rb') as f:
+        return f.read()
+
+
+def blob_hash(data):
+    """Git blob id of `data`, so hashes line up with `git ls-tree` output"""
+    digest = hashlib.sha1(b'blob %d\0' % len(data))
+    digest.update(data)
+    return digest.hexdigest()
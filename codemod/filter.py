@@ -0,0 +1,222 @@
+"""
+Stdin-to-stdout filter for editors and git
+
+    python3 -m codemod filter [--script NAME]... [--func NAME]... [--path RELPATH] < in > out
+
+Reads one Dart source, applies the selected rules in script order (as
+`apply --no-adapt` would) and writes the result. Without --path, rules
+limited to particular files are left out. It is meant to run once per
+file, on save or as a git clean filter:
+
+    git config filter.codemod.clean 'python3 -S -m codemod filter --script targeted_fixes --path %f'
+    echo '*.dart filter=codemod' >> .gitattributes
+
+so it never walks the tree and keeps start-up close to a bare
+interpreter: no argparse, and no rule classes. The rule table (each rule's
+kind, pattern, replacement, scope and needles) is saved as JSON in the
+package's .dart_tool/codemod, so rules.py and patterns.py are only
+imported to rebuild it. A regex is compiled with re.compile, and only when
+every needle of its rule is in the text. The table is rebuilt when rules.py
+or patterns.py change, and built in memory each time when there is no
+package or its state directory cannot be written.
+"""
+
+import json
+import os
+import re
+import sys
+
+from codemod.text import replace_in_live_lines, replace_literal
+
+TABLE_VERSION = 2
+SOURCES = ('rules.py', 'patterns.py')
+
+USAGE = """\
+usage: python3 -m codemod filter [--script NAME]... [--func NAME]... [--path RELPATH]
+
+Apply the selected rules to a Dart source read from stdin and write it to stdout.
+
+  --script NAME    only rules lifted from this script (repeatable)
+  --func NAME      only rules lifted from this function (repeatable)
+  --path RELPATH   the file's path, relative to the package root or absolute,
+                   so rules limited to particular files can apply
+"""
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# state.STATE_DIR, without the json and tempfile imports state.py brings in
+_STATE_DIR = os.path.join('.dart_tool', 'codemod')
+
+
+def _table_path(root):
+    return os.path.join(root, _STATE_DIR, 'rule_table.json')
+
+
+def _stamp():
+    stamp = [TABLE_VERSION]
+    for name in SOURCES:
+        st = os.stat(os.path.join(_HERE, name))
+        stamp += [st.st_mtime_ns, st.st_size]
+    return stamp
+
+
+def build_table():
+    """{script: [[func, kind, pattern, replacement, flags, exact, globs, needles, comment]]}"""
+    from codemod import rules, scopes
+    table = {}
+    for script, ruleset in rules.RULESETS.items():
+        entries = []
+        for rule in ruleset:
+            exact, globs = scopes.split(rule.paths or ())
+            entries.append([rule.func, rule.kind, rule.pattern, rule.replacement, rule.flags,
+                            sorted(exact), list(globs), list(rule.needles),
+                            getattr(rule, 'comment', None)])
+        table[script] = entries
+    return table
+
+
+def load_table(root=None):
+    """The precompiled table saved in package `root`, rebuilt (and saved if
+    possible) when it is stale; built in memory when root is None
+    """
+    stamp = _stamp()
+    if root is None:
+        return build_table()
+    path = _table_path(root)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved['stamp'] == stamp:
+            return saved['table']
+    except (OSError, ValueError, TypeError, KeyError):
+        pass
+    table = build_table()
+    tmp = f"{path}.{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'stamp': stamp, 'table': table}, f)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+    return table
+
+
+def select(table, scripts=None, funcs=None):
+    """Entries of the given scripts (all by default), as rules.select picks rules"""
+    names = scripts or list(table)
+    unknown = [name for name in names if name not in table]
+    if unknown:
+        raise KeyError(f"Unknown script(s): {', '.join(unknown)}")
+    selected = []
+    for name in names:
+        for entry in table[name]:
+            if funcs and entry[0] not in funcs and f"{name}.{entry[0]}" not in funcs:
+                continue
+            selected.append(entry)
+    return selected
+
+
+def _in_scope(exact, globs, relpath):
+    if not exact and not globs:
+        return True
+    if relpath is None:
+        return False
+    if relpath in exact:
+        return True
+    if globs:
+        from codemod.scopes import Scope
+        return relpath in Scope(globs)
+    return False
+
+
+def transform(text, entries, relpath=None):
+    """Apply the entries that target relpath, in order, the way engine.transform does"""
+    for _func, kind, pattern, replacement, flags, exact, globs, needles, comment in entries:
+        if kind == 'rename' or not _in_scope(exact, globs, relpath):
+            continue
+        for needle in needles:
+            if needle not in text:
+                break
+        else:
+            if kind == 'literal':
+                text, _count = replace_literal(text, pattern, replacement)
+            elif kind == 'line':
+                text, _count = replace_in_live_lines(text, pattern, replacement, comment)
+            else:
+                text = re.compile(pattern, flags).sub(replacement, text)
+    return text
+
+
+def _package_root(directory):
+    """The nearest directory at or above `directory` holding a pubspec.yaml, or None"""
+    directory = os.path.abspath(directory)
+    while True:
+        if os.path.isfile(os.path.join(directory, 'pubspec.yaml')):
+            return directory
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _package_relpath(path, root):
+    """`path` relative to package `root`; relative paths are taken as they are"""
+    if not os.path.isabs(path):
+        return path.replace(os.sep, '/')
+    if root is None:
+        return None
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def _parse(argv):
+    """{'scripts', 'funcs', 'path'} from the command line; raises ValueError"""
+    options = {'scripts': [], 'funcs': [], 'path': None}
+    names = {'--script': 'scripts', '--func': 'funcs', '--path': 'path'}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        name, sep, value = arg.partition('=')
+        if name not in names:
+            raise ValueError(f"unrecognized argument: {arg}")
+        if not sep:
+            i += 1
+            if i == len(argv):
+                raise ValueError(f"argument {name}: expected one argument")
+            value = argv[i]
+        if name == '--path':
+            options['path'] = value
+        else:
+            options[names[name]].append(value)
+        i += 1
+    return options
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if '-h' in argv or '--help' in argv:
+        sys.stdout.write(USAGE)
+        return 0
+    try:
+        options = _parse(argv)
+        path = options['path']
+        root = _package_root(os.path.dirname(path) if path and os.path.isabs(path) else '.')
+        entries = select(load_table(root), options['scripts'], options['funcs'])
+    except (ValueError, KeyError) as e:
+        sys.stderr.write(f"{USAGE}\nerror: {e.args[0]}\n")
+        return 2
+    data = sys.stdin.buffer.read()
+    try:
+        original = data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        sys.stdout.buffer.write(data)
+        sys.stderr.write(f"error: {e}\n")
+        return 1
+    if '\r' in original:
+        original = original.replace('\r\n', '\n').replace('\r', '\n')
+    relpath = None if path is None else _package_relpath(path, root)
+    text = transform(original, entries, relpath)
+    sys.stdout.buffer.write(data if text == original else text.encode('utf-8'))
+    return 0
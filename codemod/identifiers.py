@@ -0,0 +1,270 @@
+"""
+Persistent identifier index and renames that touch only code
+
+Every Dart file is lexed once per content hash and each identifier token
+of its code (interpolations included, strings and comments left out) is
+recorded as name -> offsets into the file's text. The index lives in
+.dart_tool/codemod/identifiers.bin and is refreshed like the trigram
+index: only files whose stat changed are read, and only new blob hashes
+are lexed; files with the same content share one entry.
+
+A rename looks its names up and rewrites exactly the recorded tokens, so
+it costs O(occurrences) rather than a regex scan of every file, and never
+changes a string, a comment or part of a longer identifier. Renames are
+given as Rename objects, or lifted from the rule table: word-only regex
+rules (`\\bold\\b`, `_([A-Z]\\w*State)`) are applied to each identifier,
+and literal rules that replace one identifier, optionally qualified
+(`SourceEngine.eng_JIS`), by another become exact renames.
+"""
+
+import os
+import re
+import time
+
+from codemod import engine, files, lexer, patterns, state
+from codemod.manifest import FileTable
+
+INDEX_VERSION = 2
+INDEX_FILE = 'identifiers.bin'
+
+_QUALIFIED = re.compile(r'((?:[A-Za-z_$][A-Za-z0-9_$]*\.)*)([A-Za-z_$][A-Za-z0-9_$]*)')
+
+
+def scan(text):
+    """{identifier: [offsets]} for the identifier tokens of the code in text"""
+    found = {}
+    for kind, start, end in lexer.tokenize(text):
+        if kind == lexer.IDENT:
+            name = text[start:end]
+            offsets = found.get(name)
+            if offsets is None:
+                found[name] = [start]
+            else:
+                offsets.append(start)
+    return found
+
+
+class Rename:
+    """Rename identifiers named `old` (or, with `regex`, matching it) to `new`
+
+    `qualifier` ('SourceEngine.') limits an exact rename to tokens written
+    right after it; `paths`, like a rule's, limits it to some files.
+    """
+
+    def __init__(self, old, new, qualifier='', regex=None, paths=None, key=None):
+        self.old = old
+        self.new = new
+        self.qualifier = qualifier
+        self.regex = regex
+        self.paths = paths
+        self.key = key or f"{qualifier}{old}"
+        self._scope = None
+
+    def __repr__(self):
+        return f"<Rename {self.key} -> {self.new}>"
+
+    def names(self, index):
+        """The indexed names this rename applies to"""
+        if self.regex is None:
+            return [self.old] if self.old in index.where else []
+        search = self.regex.search
+        return [name for name in index.where if search(name)]
+
+    def rename(self, name, text, start):
+        """The new name of the token `name` at text[start:], or `name` if it does not apply"""
+        if self.regex is not None:
+            return self.regex.sub(self.new, name)
+        if name != self.old:
+            return name
+        if self.qualifier:
+            begin = start - len(self.qualifier)
+            if begin < 0 or text[begin:start] != self.qualifier:
+                return name
+            if begin and (text[begin - 1].isalnum() or text[begin - 1] in '_$'):
+                return name
+        return self.new
+
+    def applies_to(self, relpath):
+        if self.paths is None:
+            return True
+        if self._scope is None:
+            from codemod.scopes import Scope
+            self._scope = Scope(self.paths)
+        return relpath in self._scope
+
+
+def from_rule(rule):
+    """The Rename doing what `rule` does to identifiers, or None if it is not that kind"""
+    if rule.kind == 'regex':
+        if not patterns.word_only(rule.pattern, rule.flags):
+            return None
+        return Rename(rule.pattern, rule.replacement, regex=rule.regex, paths=rule.paths,
+                      key=rule.key)
+    if rule.kind != 'literal':
+        return None
+    old = _QUALIFIED.fullmatch(rule.pattern)
+    new = _QUALIFIED.fullmatch(rule.replacement)
+    if old is None or new is None or old.group(1) != new.group(1):
+        return None
+    return Rename(old.group(2), new.group(2), old.group(1), paths=rule.paths, key=rule.key)
+
+
+def from_rules(rules):
+    """Renames for the identifier rules among `rules`, in order"""
+    return [rename for rename in map(from_rule, rules) if rename is not None]
+
+
+class IdentifierIndex:
+    """Identifier -> occurrences for the Dart files under root/lib, keyed by content hash"""
+
+    def __init__(self, root, use_state=True):
+        self.root = root
+        self.path = os.path.join(root, state.STATE_DIR, INDEX_FILE) if use_state else None
+        data = state.load_marshal(self.path) if self.path else None
+        try:
+            if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+                raise ValueError
+            self.meta = FileTable.loads(data['files'])
+        except ValueError:
+            data = {'blobs': {}}
+            self.meta = FileTable()
+        self.blobs = data['blobs']
+        self.lexed = 0
+        self.dirty = False
+        self._where = None
+
+    def refresh(self, paths):
+        """Bring the index in line with `paths`; returns the number of files lexed"""
+        wanted = set(paths)
+        for relpath in [p for p in self.meta if p not in wanted]:
+            self.meta.remove(relpath)
+            self.dirty = True
+        lexed = 0
+        for relpath in paths:
+            try:
+                st = os.stat(os.path.join(self.root, relpath))
+            except OSError:
+                self.meta.remove(relpath)
+                continue
+            if self.meta.same_stat(relpath, st):
+                continue
+            try:
+                data = files.read_bytes(self.root, relpath)
+            except OSError:
+                continue
+            lexed += self._record(relpath, st, data)
+        live = set(self.meta.blobs().values())
+        for blob in [b for b in self.blobs if b not in live]:
+            del self.blobs[blob]
+            self.dirty = True
+        self.lexed += lexed
+        return lexed
+
+    def _record(self, relpath, st, data):
+        """Index data as relpath's content; returns 1 if it had to be lexed"""
+        blob = files.blob_hash(data)
+        self.meta.put(relpath, st.st_mtime_ns, st.st_size, blob)
+        self.dirty = True
+        self._where = None
+        if blob in self.blobs:
+            return 0
+        try:
+            text = engine.normalize_newlines(data.decode('utf-8'))
+        except UnicodeDecodeError:
+            self.blobs[blob] = {}
+        else:
+            self.blobs[blob] = scan(text)
+        return 1
+
+    @property
+    def where(self):
+        """{identifier: [paths of the files using it]}"""
+        if self._where is None:
+            by_blob = {}
+            for relpath, blob in self.meta.blobs().items():
+                by_blob.setdefault(blob, []).append(relpath)
+            where = {}
+            for blob, relpaths in by_blob.items():
+                for name in self.blobs.get(blob, ()):
+                    found = where.get(name)
+                    if found is None:
+                        where[name] = list(relpaths)
+                    else:
+                        found.extend(relpaths)
+            self._where = where
+        return self._where
+
+    def occurrences(self, relpath, name):
+        blob = self.meta.blob(relpath)
+        return self.blobs.get(blob, {}).get(name, ()) if blob else ()
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        try:
+            state.state_dir(self.root)
+            state.save_marshal(self.path, {'version': INDEX_VERSION,
+                                           'files': self.meta.dumps(), 'blobs': self.blobs})
+        except OSError:
+            return
+        self.dirty = False
+
+
+def plan(index, renames):
+    """{relpath: {name: [renames]}}: the files and indexed names some rename applies to"""
+    targets = {}
+    for rename in renames:
+        for name in rename.names(index):
+            for relpath in index.where[name]:
+                if rename.applies_to(relpath):
+                    targets.setdefault(relpath, {}).setdefault(name, [])
+    return targets
+
+
+def edit(text, index, relpath, names, renames):
+    """(new text, number of tokens renamed), every rename tried on each token in order"""
+    scoped = [rename for rename in renames if rename.applies_to(relpath)]
+    edits = []
+    for name in names:
+        for start in index.occurrences(relpath, name):
+            new = name
+            for rename in scoped:
+                new = rename.rename(new, text, start)
+            if new != name:
+                edits.append((start, start + len(name), new))
+    if not edits:
+        return text, 0
+    edits.sort()
+    parts = []
+    last = 0
+    for start, end, new in edits:
+        parts.append(text[last:start])
+        parts.append(new)
+        last = end
+    parts.append(text[last:])
+    return ''.join(parts), len(edits)
+
+
+def run(root, renames, write=True, log=print):
+    """Apply the renames to root/lib through the index; returns a summary dict"""
+    started = time.perf_counter()
+    index = IdentifierIndex(root)
+    index.refresh(files.discover(root))
+    summary = {'files': 0, 'changed': 0, 'renamed': 0, 'lexed': index.lexed}
+    for relpath, names in sorted(plan(index, renames).items()):
+        summary['files'] += 1
+        data = files.read_bytes(root, relpath)
+        text = engine.normalize_newlines(data.decode('utf-8'))
+        output, count = edit(text, index, relpath, names, renames)
+        if not count:
+            continue
+        summary['changed'] += 1
+        summary['renamed'] += count
+        if write:
+            output = output.encode('utf-8')
+            engine.write_output(root, relpath, output)
+            index._record(relpath, os.stat(os.path.join(root, relpath)), output)
+        log(f"Renamed {count} identifier(s) in {relpath}")
+    index.save()
+    summary['elapsed'] = time.perf_counter() - started
+    return summary
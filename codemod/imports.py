@@ -0,0 +1,477 @@
+"""
+Computed unused-import detection
+
+Each Dart file is summarized once per content hash: the top-level names it
+declares, the extension members it contributes, its directives and the
+identifiers its code uses. A library's export table is the union of its own
+and its parts' declarations plus whatever it re-exports. An import is unused
+when none of the names it brings in are used by the importing library.
+"""
+
+import bisect
+import json
+import os
+import re
+
+from codemod import files, lexer, state
+
+CACHE_VERSION = 1
+
+TYPE_KEYWORDS = {'class', 'mixin', 'enum', 'typedef', 'extension'}
+MODIFIERS = {'abstract', 'base', 'final', 'interface', 'sealed', 'external', 'static',
+             'const', 'late', 'var', 'augment', 'macro', 'covariant'}
+DIRECTIVES = {'import', 'export', 'part', 'library'}
+OPENERS = {'{', '(', '[', '${'}
+CLOSERS = {'}', ')', ']'}
+_DOC_REF = re.compile(r'\[([A-Za-z_$][A-Za-z0-9_$]*)')
+
+
+def _unquote(literal):
+    literal = literal.lstrip('r')
+    quote = 3 if literal[:3] in ("'''", '"""') else 1
+    return literal[quote:-quote] if len(literal) >= 2 * quote else literal[quote:]
+
+
+def _items(text, tokens):
+    """Group tokens into top-level items, each a list of (kind, start, end, depth)"""
+    items = []
+    current = []
+    depth = 0
+    assigned = False
+    for kind, start, end in tokens:
+        if kind == lexer.COMMENT or kind == lexer.DOC:
+            continue
+        value = text[start:end] if kind == lexer.PUNCT else None
+        if value in CLOSERS:
+            depth -= 1
+        current.append((kind, start, end, depth))
+        if value in OPENERS:
+            depth += 1
+        if depth == 0 and value == '=':
+            assigned = True
+        if depth == 0 and (value == ';' or (value == '}' and not assigned)):
+            items.append(current)
+            current = []
+            assigned = False
+    if current:
+        items.append(current)
+    return items
+
+
+def _skip_annotations(text, item):
+    i = 0
+    while i < len(item) and text[item[i][1]:item[i][2]] == '@':
+        i += 1
+        while i < len(item) and (item[i][0] == lexer.IDENT or text[item[i][1]:item[i][2]] == '.'):
+            i += 1
+        if i < len(item) and text[item[i][1]:item[i][2]] == '(':
+            depth = item[i][3]
+            i += 1
+            while i < len(item) and not (item[i][3] == depth and text[item[i][1]:item[i][2]] == ')'):
+                i += 1
+            i += 1
+    return i
+
+
+def _name_before(text, item, index):
+    """Identifier naming the declaration whose '(' or '=' is at item[index]"""
+    i = index - 1
+    if i >= 0 and text[item[i][1]:item[i][2]] == '>':
+        nesting = 0
+        while i >= 0:
+            value = text[item[i][1]:item[i][2]]
+            if value == '>':
+                nesting += 1
+            elif value == '<':
+                nesting -= 1
+                if nesting == 0:
+                    break
+            i -= 1
+        i -= 1
+    if i >= 0 and item[i][0] == lexer.IDENT:
+        return text[item[i][1]:item[i][2]]
+    return None
+
+
+def _directive(text, item, start):
+    keyword = text[item[start][1]:item[start][2]]
+    entry = {'keyword': keyword, 'uri': None, 'alternatives': [], 'prefix': None,
+             'show': None, 'hide': None, 'start': item[start][1], 'end': item[-1][2]}
+    mode = None
+    for kind, s, e, depth in item[start + 1:]:
+        value = text[s:e]
+        if kind == lexer.STRING:
+            if entry['uri'] is None:
+                entry['uri'] = _unquote(value)
+            elif depth == 0:
+                entry['alternatives'].append(_unquote(value))
+            continue
+        if depth:
+            continue
+        if kind == lexer.IDENT and value in ('as', 'show', 'hide', 'of'):
+            mode = value
+            if value in ('show', 'hide'):
+                entry[value] = entry[value] or []
+            elif value == 'of':
+                entry['keyword'] = 'part of'
+        elif kind == lexer.IDENT and mode == 'as':
+            entry['prefix'] = value
+            mode = None
+        elif kind == lexer.IDENT and mode in ('show', 'hide'):
+            entry[mode].append(value)
+        elif kind == lexer.IDENT and mode == 'of' and entry['uri'] is None:
+            entry['library'] = (entry.get('library') or '') + value
+    return entry
+
+
+def _extension_members(text, item, body):
+    members = []
+    opaque = False
+    for i in range(body, len(item)):
+        kind, s, e, depth = item[i]
+        if depth != 1:
+            continue
+        value = text[s:e]
+        if kind == lexer.IDENT and value == 'operator':
+            opaque = True
+        elif kind == lexer.IDENT and i > 0 and text[item[i - 1][1]:item[i - 1][2]] in ('get', 'set'):
+            members.append(value)
+        elif value == '(' and kind == lexer.PUNCT:
+            name = _name_before(text, item, i)
+            if name:
+                members.append(name)
+    return members, opaque
+
+
+def _declaration(text, item, start, summary):
+    """Record the names declared by one top-level item"""
+    values = [text[s:e] for _k, s, e, _d in item]
+    head = start
+    while head < len(item) and values[head] in MODIFIERS and item[head][0] == lexer.IDENT:
+        head += 1
+    keyword = values[head] if head < len(item) else None
+    if keyword in TYPE_KEYWORDS and item[head][0] == lexer.IDENT:
+        rest = [i for i in range(head + 1, len(item)) if item[i][0] == lexer.IDENT]
+        rest = [i for i in rest if values[i] not in ('class', 'mixin')] if keyword == 'mixin' else rest
+        if keyword == 'typedef':
+            eq = next((i for i in range(head, len(item)) if item[i][3] == 0 and values[i] == '='), None)
+            if eq is not None:
+                name = values[rest[0]] if rest else None
+            else:
+                paren = next((i for i in range(head, len(item)) if values[i] == '('), None)
+                name = _name_before(text, item, paren) if paren is not None else None
+        elif keyword == 'extension':
+            name = None
+            if rest and values[rest[0]] == 'type' and len(rest) > 1 and values[rest[1]] != 'on':
+                name = values[rest[1]]
+            elif rest and values[rest[0]] != 'on':
+                name = values[rest[0]]
+            body = next((i for i in range(head, len(item)) if item[i][3] == 0 and values[i] == '{'), None)
+            if body is not None:
+                members, opaque = _extension_members(text, item, body + 1)
+                summary['extension_members'].extend(members)
+                summary['opaque'] = summary['opaque'] or opaque
+        else:
+            name = values[rest[0]] if rest else None
+        if name:
+            summary['declares'].append(name)
+        return
+    expect_name = True
+    angle = 0
+    for i in range(head, len(item)):
+        kind, _s, _e, depth = item[i]
+        if depth:
+            continue
+        value = values[i]
+        if expect_name and value in ('<', '>'):
+            angle += 1 if value == '<' else -1
+            continue
+        if angle:
+            continue
+        if value == '(' and expect_name:
+            name = _name_before(text, item, i)
+            if name == 'Function':
+                continue
+            if name:
+                summary['declares'].append(name)
+            return
+        if value in ('=', ';', ',', '{') and expect_name:
+            name = _name_before(text, item, i)
+            if name and name not in ('get', 'set'):
+                summary['declares'].append(name)
+            if value in ('{', ';'):
+                return
+            expect_name = False
+        elif value == ',' and not expect_name:
+            expect_name = True
+        elif value == ';':
+            return
+
+
+def summarize(text):
+    """Directives, declarations and identifier uses of one Dart file"""
+    tokens = lexer.tokenize(text)
+    summary = {'directives': [], 'declares': [], 'extension_members': [],
+               'opaque': False, 'uses': []}
+    uses = set()
+    for kind, start, end in tokens:
+        if kind == lexer.DOC:
+            uses.update(_DOC_REF.findall(text, start, end))
+    for item in _items(text, tokens):
+        start = _skip_annotations(text, item)
+        if start >= len(item):
+            continue
+        first = text[item[start][1]:item[start][2]]
+        if item[start][0] == lexer.IDENT and first in DIRECTIVES:
+            if first != 'library':
+                summary['directives'].append(_directive(text, item, start))
+            continue
+        for kind, s, e, _depth in item:
+            if kind == lexer.IDENT:
+                uses.add(text[s:e])
+        _declaration(text, item, start, summary)
+    summary['uses'] = sorted(uses)
+    return summary
+
+
+def package_name(root):
+    try:
+        with open(os.path.join(root, 'pubspec.yaml'), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('name:'):
+                    return line.split(':', 1)[1].strip().strip('\'"')
+    except OSError:
+        pass
+    return None
+
+
+def package_roots(root):
+    """{package: lib_dir} from .dart_tool/package_config.json, if pub get has run"""
+    config_path = os.path.join(root, '.dart_tool', 'package_config.json')
+    config = state.load_json(config_path, {}) or {}
+    roots = {}
+    base = os.path.dirname(config_path)
+    for package in config.get('packages', []):
+        uri = package.get('rootUri', '')
+        path = uri[len('file://'):] if uri.startswith('file://') else os.path.join(base, uri)
+        roots[package['name']] = os.path.normpath(os.path.join(path, package.get('packageUri', 'lib/')))
+    own = package_name(root)
+    if own:
+        roots[own] = os.path.join(os.path.abspath(root), 'lib')
+    return roots
+
+
+class Project:
+    """Summaries and export tables of one package, cached by content hash"""
+
+    def __init__(self, root, use_cache=True):
+        self.root = os.path.abspath(root)
+        self.packages = package_roots(self.root)
+        self.sdk = os.environ.get('DART_SDK')
+        self.cache_path = state.state_path(self.root, 'dart_summaries.json') if use_cache else None
+        cache = state.load_json(self.cache_path, {}) if self.cache_path else {}
+        if not cache or cache.get('version') != CACHE_VERSION:
+            cache = {'version': CACHE_VERSION, 'stat': {}, 'summaries': {}}
+        self.stat_cache = cache['stat']
+        self.summary_cache = cache['summaries']
+        self.touched_stat = {}
+        self.touched = {}
+        self.summarized = 0
+        self._summaries = {}
+        self._tables = {}
+        self._partial = set()
+
+    def save(self):
+        if not self.cache_path:
+            return
+        if (self.summarized == 0 and self.touched_stat == self.stat_cache
+                and len(self.touched) == len(self.summary_cache)):
+            return
+        state.save_json(self.cache_path, {'version': CACHE_VERSION,
+                                          'stat': self.touched_stat,
+                                          'summaries': self.touched})
+
+    def resolve(self, uri, from_path):
+        """Absolute path of a directive URI, or None if it is outside what we can see"""
+        if uri.startswith('package:'):
+            package, _, rest = uri[len('package:'):].partition('/')
+            base = self.packages.get(package)
+            return os.path.join(base, rest) if base else None
+        if uri.startswith('dart:'):
+            name = uri[len('dart:'):]
+            engine = self.packages.get('sky_engine')
+            for base in filter(None, [engine, self.sdk and os.path.join(self.sdk, 'lib')]):
+                path = os.path.join(base, name, f'{name}.dart')
+                if os.path.exists(path):
+                    return path
+            return None
+        if ':' in uri.split('/', 1)[0]:
+            return None
+        return os.path.normpath(os.path.join(os.path.dirname(from_path), uri))
+
+    def summary(self, path):
+        """Summary of the file at `path` (None if unreadable), hashing only on stat change"""
+        if path in self._summaries:
+            return self._summaries[path]
+        result = None
+        try:
+            st = os.stat(path)
+            cached = self.stat_cache.get(path)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size \
+                    and cached[2] in self.summary_cache:
+                digest = cached[2]
+            else:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                digest = files.blob_hash(data)
+                if digest not in self.summary_cache:
+                    self.summary_cache[digest] = summarize(data.decode('utf-8', 'replace'))
+                    self.summarized += 1
+            self.touched_stat[path] = [st.st_mtime_ns, st.st_size, digest]
+            result = self.touched[digest] = self.summary_cache[digest]
+        except OSError:
+            pass
+        self._summaries[path] = result
+        return result
+
+    def parts(self, path):
+        summary = self.summary(path)
+        if summary is None:
+            return []
+        return [self.resolve(d['uri'], path) for d in summary['directives']
+                if d['keyword'] == 'part' and d['uri']]
+
+    def exported_names(self, path, stack=None):
+        """(names, opaque) a library makes visible to importers; names is None if unknown"""
+        if path in self._tables:
+            return self._tables[path]
+        stack = stack if stack is not None else []
+        if path in stack:
+            # Export cycle: the library on the stack supplies these names itself
+            for member in stack[stack.index(path):]:
+                self._partial.add(member)
+            return set(), False
+        summary = self.summary(path)
+        if summary is None:
+            return None, False
+        stack.append(path)
+        try:
+            names, opaque = self._exported_names(path, summary, stack)
+        finally:
+            stack.pop()
+        if path not in self._partial or not stack:
+            self._tables[path] = (names, opaque)
+            self._partial.discard(path)
+        return names, opaque
+
+    def _exported_names(self, path, summary, stack):
+        names = set()
+        opaque = False
+        for unit in [path] + [p for p in self.parts(path) if p]:
+            unit_summary = self.summary(unit)
+            if unit_summary is None:
+                continue
+            names.update(n for n in unit_summary['declares'] if not n.startswith('_'))
+            names.update(unit_summary['extension_members'])
+            opaque = opaque or unit_summary['opaque']
+        for directive in summary['directives']:
+            if directive['keyword'] != 'export' or not directive['uri']:
+                continue
+            if directive['show'] is not None:
+                names.update(directive['show'])
+                continue
+            target = self.resolve(directive['uri'], path)
+            sub, sub_opaque = self.exported_names(target, stack) if target else (None, False)
+            if sub is None:
+                return None, opaque
+            names.update(sub - set(directive['hide'] or ()))
+            opaque = opaque or sub_opaque
+        return names, opaque
+
+    def library_uses(self, path):
+        uses = set(self.summary(path)['uses'])
+        for part in self.parts(path):
+            part_summary = self.summary(part) if part else None
+            if part_summary:
+                uses.update(part_summary['uses'])
+        return uses
+
+    def unused_imports(self, relpath):
+        """[(directive, reason)] for the unused imports of one library file"""
+        path = os.path.join(self.root, relpath)
+        summary = self.summary(path)
+        if summary is None or any(d['keyword'] == 'part of' for d in summary['directives']):
+            return []
+        uses = self.library_uses(path)
+        unused = []
+        for directive in summary['directives']:
+            if directive['keyword'] != 'import' or not directive['uri']:
+                continue
+            if directive['prefix']:
+                if directive['prefix'] not in uses:
+                    unused.append(directive)
+                continue
+            if directive['show'] is not None:
+                names = set(directive['show'])
+                opaque = False
+            else:
+                names = set()
+                opaque = False
+                for uri in [directive['uri']] + directive['alternatives']:
+                    target = self.resolve(uri, path)
+                    sub, sub_opaque = self.exported_names(target) if target else (None, False)
+                    if sub is None:
+                        names = None
+                        break
+                    names.update(sub)
+                    opaque = opaque or sub_opaque
+                if names is None or opaque:
+                    continue
+                names.difference_update(directive['hide'] or ())
+            if not names & uses:
+                unused.append(directive)
+        return unused
+
+
+def remove_directives(text, directives):
+    """Drop the given directives, along with their line when nothing else is on it"""
+    for directive in sorted(directives, key=lambda d: d['start'], reverse=True):
+        start, end = directive['start'], directive['end']
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', end)
+        line_end = len(text) if line_end == -1 else line_end + 1
+        if not text[line_start:start].strip() and not text[end:line_end].strip():
+            start, end = line_start, line_end
+        text = text[:start] + text[end:]
+    return text
+
+
+def run(root, fmt='text', fix=False):
+    """Report (and optionally remove) unused imports under root/lib"""
+    project = Project(root)
+    found = []
+    for relpath in files.discover(root):
+        unused = project.unused_imports(relpath)
+        if not unused:
+            continue
+        text = files.read_text(root, relpath)
+        starts = [0] + [i + 1 for i, c in enumerate(text) if c == '\n']
+        for directive in unused:
+            line = bisect.bisect_right(starts, directive['start'])
+            found.append((relpath, line, directive['start'] - starts[line - 1] + 1, directive))
+        if fix:
+            files.write_text(root, relpath, remove_directives(text, unused))
+            print(f"Removed {len(unused)} unused import(s) from {relpath}")
+    project.save()
+    if fmt == 'json':
+        print(json.dumps({'version': 1, 'diagnostics': [{
+            'code': 'unused_import', 'severity': 'WARNING', 'type': 'STATIC_WARNING',
+            'location': {'file': path, 'range': {'start': {
+                'offset': d['start'], 'line': line, 'column': column}, 'end': {'offset': d['end']}}},
+            'problemMessage': f"Unused import: '{d['uri']}'",
+        } for path, line, column, d in found]}, indent=2))
+    elif not fix:
+        for path, line, column, d in found:
+            print(f"warning • Unused import: '{d['uri']}' • {path}:{line}:{column} • unused_import")
+        print(f"{len(found)} unused imports found. ({project.summarized} files re-summarized)")
+    return 1 if found and not fix else 0
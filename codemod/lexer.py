@@ -0,0 +1,137 @@
+"""
+Lightweight Dart lexer
+
+Splits a source into code tokens, string literal segments and comments,
+following string interpolation (`$name`, `${expr}`) and nested block
+comments. It knows nothing about Dart grammar; callers track brackets.
+"""
+
+import re
+
+IDENT = 'ident'
+NUMBER = 'number'
+PUNCT = 'punct'
+STRING = 'string'
+COMMENT = 'comment'
+DOC = 'doc'
+
+_CODE = re.compile(r'''
+    \s*(?:
+      (?P<doc>///[^\n]*)
+    | (?P<line>//[^\n]*)
+    | (?P<block>/\*)
+    | (?P<string>r?(?:\'\'\'|"""|\'|"))
+    | (?P<ident>[A-Za-z_$][A-Za-z0-9_$]*)
+    | (?P<number>\d[\w.]*|\.\d\w*)
+    | (?P<punct>[^\s])
+    )''', re.X)
+
+_BLOCK = re.compile(r'/\*|\*/')
+_INTERPOLATED_IDENT = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_STRING_STOP = {q: re.compile(r'\\.|\$|' + re.escape(q) + ('' if len(q) == 3 else r'|\n'), re.S)
+                for q in ("'", '"', "'''", '"""')}
+_RAW_STOP = {q: re.compile(re.escape(q) + ('' if len(q) == 3 else r'|\n'))
+             for q in ("'", '"', "'''", '"""')}
+
+
+def tokenize(text):
+    """List of (kind, start, end) tokens covering the code, strings and comments"""
+    out = []
+    _code(text, 0, out, False)
+    return out
+
+
+def _code(text, pos, out, in_interpolation):
+    """Lex code from pos; inside `${...}` stop after the closing brace"""
+    append = out.append
+    match_at = _CODE.match
+    depth = 0
+    size = len(text)
+    while pos < size:
+        m = match_at(text, pos)
+        if m is None or m.lastgroup is None:
+            return size
+        kind = m.lastgroup
+        start = m.start(kind)
+        end = m.end()
+        if kind == 'ident' or kind == 'number':
+            append((kind, start, end))
+        elif kind == 'punct':
+            char = text[start]
+            if in_interpolation:
+                if char == '{':
+                    depth += 1
+                elif char == '}':
+                    if depth == 0:
+                        append((PUNCT, start, end))
+                        return end
+                    depth -= 1
+            append((PUNCT, start, end))
+        elif kind == 'line':
+            append((COMMENT, start, end))
+        elif kind == 'doc':
+            append((DOC, start, end))
+        elif kind == 'block':
+            end = _block_comment(text, end)
+            doc = text.startswith('/**', start) and not text.startswith('/**/', start)
+            append((DOC if doc else COMMENT, start, end))
+        else:
+            quote = m.group(kind)
+            raw = quote[0] == 'r'
+            end = _string(text, start, end, quote.lstrip('r'), raw, out)
+        pos = end
+    return size
+
+
+def _block_comment(text, pos):
+    """End offset of a (possibly nested) block comment opened before pos"""
+    nesting = 1
+    while nesting:
+        m = _BLOCK.search(text, pos)
+        if m is None:
+            return len(text)
+        nesting += 1 if m.group() == '/*' else -1
+        pos = m.end()
+    return pos
+
+
+def _string(text, start, pos, quote, raw, out):
+    """Emit string segments and interpolations; returns the end offset"""
+    append = out.append
+    if raw:
+        m = _RAW_STOP[quote].search(text, pos)
+        end = len(text) if m is None else m.end()
+        append((STRING, start, end))
+        return end
+    stop = _STRING_STOP[quote]
+    segment = start
+    while True:
+        m = stop.search(text, pos)
+        if m is None:
+            append((STRING, segment, len(text)))
+            return len(text)
+        token = m.group()
+        if token == '$':
+            dollar = m.start()
+            if text.startswith('{', dollar + 1):
+                if dollar > segment:
+                    append((STRING, segment, dollar))
+                append((PUNCT, dollar, dollar + 2))
+                pos = _code(text, dollar + 2, out, True)
+                segment = pos
+                continue
+            ident = _INTERPOLATED_IDENT.match(text, dollar + 1)
+            if ident:
+                append((STRING, segment, dollar + 1))
+                append((IDENT, ident.start(), ident.end()))
+                pos = segment = ident.end()
+                continue
+            pos = m.end()
+        elif token[0] == '\\':
+            pos = m.end()
+        else:
+            # Closing quote, or the newline ending an unterminated literal
+            end = m.end() if token != '\n' else m.start()
+            if end > segment:
+                append((STRING, segment, end))
+            return end
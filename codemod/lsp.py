@@ -0,0 +1,498 @@
+"""
+Language server over stdio offering the fixes as code actions
+
+Speaks just enough of the Language Server Protocol for an editor to show
+the rules' findings as diagnostics and apply them: full-text document
+sync, textDocument/codeAction (one quick fix per match, a per-rule "fix
+all in file" and a source.fixAll action) and textDocument/publishDiagnostics.
+The rules stay compiled for the life of the process and each open
+document keeps its matches and its fixed text until the next change, so
+a code action request is a lookup.
+
+`python3 -m codemod lsp --probe FILE` runs a scripted client against a
+fresh server and reports the latency of each request.
+"""
+
+import bisect
+import json
+import os
+import sys
+import time
+from urllib.parse import unquote, urlparse
+from urllib.request import pathname2url
+
+from codemod import engine, project
+from codemod import rules as rule_table
+
+QUICKFIX = 'quickfix'
+FIX_ALL = 'source.fixAll.codemod'
+SOURCE = 'codemod'
+
+PARSE_ERROR = -32700
+METHOD_NOT_FOUND = -32601
+INVALID_REQUEST = -32600
+INTERNAL_ERROR = -32603
+SERVER_NOT_INITIALIZED = -32002
+
+
+def uri_to_path(uri):
+    parsed = urlparse(uri)
+    return os.path.abspath(unquote(parsed.path)) if parsed.scheme == 'file' else None
+
+
+def path_to_uri(path):
+    return 'file://' + pathname2url(os.path.abspath(path))
+
+
+class Document:
+    """An open file: its text, and what the rules make of it, per version"""
+
+    def __init__(self, uri, text, version, root, relpath):
+        self.uri = uri
+        self.root = root
+        self.relpath = relpath
+        self.update(text, version)
+
+    def update(self, text, version):
+        self.text = engine.normalize_newlines(text)
+        self.version = version
+        self._starts = None
+        self._edits = None
+        self._fixed = None
+
+    @property
+    def starts(self):
+        if self._starts is None:
+            from codemod.check import line_starts
+            self._starts = line_starts(self.text)
+        return self._starts
+
+    def edits(self, rules):
+        """[(rule, start, end, new_text)] for every match, in file order"""
+        if self._edits is None:
+            found = []
+            text = self.text
+            for rule in rules:
+                if rule.applies_to(self.relpath) and rule.may_match(text):
+                    found.extend((rule, start, end, new_text)
+                                 for start, end, new_text in rule.edits(text))
+            found.sort(key=lambda edit: (edit[1], edit[2]))
+            self._edits = found
+        return self._edits
+
+    def fixed(self, rules):
+        """The text after every rule, in order, as apply would write it"""
+        if self._fixed is None:
+            self._fixed, _hits = engine.transform(self.text, rules, self.relpath)
+        return self._fixed
+
+    def position(self, offset):
+        """LSP position (UTF-16 code units) of a character offset"""
+        line = bisect.bisect_right(self.starts, offset) - 1
+        start = self.starts[line]
+        segment = self.text[start:offset]
+        if not segment.isascii():
+            return {'line': line, 'character': len(segment.encode('utf-16-le')) // 2}
+        return {'line': line, 'character': offset - start}
+
+    def offset(self, position):
+        starts = self.starts
+        line = min(max(position.get('line', 0), 0), len(starts) - 1)
+        start = starts[line]
+        end = starts[line + 1] - 1 if line + 1 < len(starts) else len(self.text)
+        character = position.get('character', 0)
+        segment = self.text[start:end]
+        if segment.isascii():
+            return start + min(character, len(segment))
+        units = 0
+        for i, char in enumerate(segment):
+            if units >= character:
+                return start + i
+            units += 2 if ord(char) > 0xFFFF else 1
+        return end
+
+    def range(self, start, end):
+        return {'start': self.position(start), 'end': self.position(end)}
+
+
+def _diagnostic(document, rule, start, end):
+    return {
+        'range': document.range(start, end),
+        'severity': 3,
+        'source': SOURCE,
+        'code': rule.name,
+        'message': rule.message,
+        'data': {'rule': rule.key},
+    }
+
+
+def _common(old, new, limit, at_end):
+    """Length of the common prefix (or suffix) within limit, by bisecting slice compares"""
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if (old[len(old) - mid:] == new[len(new) - mid:]) if at_end else old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def minimal_edit(old, new):
+    """(start, end, replacement) in `old` turning it into `new`, trimming common ends"""
+    limit = min(len(old), len(new))
+    head = _common(old, new, limit, False)
+    tail = _common(old, new, limit - head, True)
+    return head, len(old) - tail, new[head:len(new) - tail]
+
+
+class Server:
+    """One editor session; handle() takes a decoded message and sends any reply through write"""
+
+    def __init__(self, rules, write=None):
+        self.rules = [rule.compile() for rule in rules]
+        self.documents = {}
+        self.roots = {}
+        self.write = write
+        self.initialized = False
+        self.shutdown = False
+        self.exit_code = None
+
+    # -- transport -----------------------------------------------------
+
+    def serve(self, reader, writer):
+        """Read framed messages from `reader` until exit; returns the exit code"""
+        self.write = lambda message: write_message(writer, message)
+        while self.exit_code is None:
+            try:
+                message = read_message(reader)
+            except ValueError as e:
+                self.write({'jsonrpc': '2.0', 'id': None,
+                            'error': {'code': PARSE_ERROR, 'message': str(e)}})
+                continue
+            if message is None:
+                return 1
+            self.handle(message)
+        return self.exit_code
+
+    def send(self, message):
+        message['jsonrpc'] = '2.0'
+        if self.write is not None:
+            self.write(message)
+
+    def notify(self, method, params):
+        self.send({'method': method, 'params': params})
+
+    def handle(self, message):
+        method = message.get('method')
+        request_id = message.get('id')
+        handler = self.METHODS.get(method)
+        if method is None:
+            return
+        if handler is None:
+            if request_id is not None:
+                self.send({'id': request_id, 'error': {'code': METHOD_NOT_FOUND,
+                                                       'message': f"Unhandled method {method}"}})
+            return
+        if not self.initialized and method not in ('initialize', 'exit'):
+            if request_id is not None:
+                self.send({'id': request_id, 'error': {'code': SERVER_NOT_INITIALIZED,
+                                                       'message': 'Server not initialized'}})
+            return
+        if self.shutdown and method not in ('exit',):
+            if request_id is not None:
+                self.send({'id': request_id, 'error': {'code': INVALID_REQUEST,
+                                                       'message': 'Server is shutting down'}})
+            return
+        try:
+            result = handler(self, message.get('params') or {})
+        except Exception as e:
+            # one bad message must not take the session down; a failed
+            # notification has nobody to answer
+            if request_id is not None:
+                self.send({'id': request_id, 'error': {'code': INTERNAL_ERROR,
+                                                       'message': f"{method}: {e!r}"}})
+            return
+        if request_id is not None:
+            self.send({'id': request_id, 'result': result})
+
+    # -- lifecycle -----------------------------------------------------
+
+    def initialize(self, params):
+        self.initialized = True
+        return {
+            'capabilities': {
+                'positionEncoding': 'utf-16',
+                'textDocumentSync': {'openClose': True, 'change': 1},
+                'codeActionProvider': {'codeActionKinds': [QUICKFIX, FIX_ALL],
+                                       'resolveProvider': False},
+            },
+            'serverInfo': {'name': 'elythra-codemod'},
+        }
+
+    def on_initialized(self, params):
+        return None
+
+    def on_shutdown(self, params):
+        self.shutdown = True
+        return None
+
+    def on_exit(self, params):
+        self.exit_code = 0 if self.shutdown else 1
+        return None
+
+    # -- documents -----------------------------------------------------
+
+    def _root(self, path):
+        directory = os.path.dirname(path)
+        root = self.roots.get(directory)
+        if root is None:
+            try:
+                root = project.find_root(directory)
+            except FileNotFoundError:
+                root = directory
+            self.roots[directory] = root
+        return root
+
+    def did_open(self, params):
+        item = params.get('textDocument') or {}
+        uri = item.get('uri')
+        path = uri_to_path(uri) if uri else None
+        if path is None:
+            return None
+        root = self._root(path)
+        relpath = os.path.relpath(path, root).replace(os.sep, '/')
+        document = Document(uri, item.get('text', ''), item.get('version'), root, relpath)
+        self.documents[uri] = document
+        self.publish(document)
+        return None
+
+    def did_change(self, params):
+        item = params.get('textDocument') or {}
+        document = self.documents.get(item.get('uri'))
+        changes = params.get('contentChanges') or []
+        if document is None or not changes or changes[-1].get('text') is None:
+            return None
+        # full sync: the last change holds the whole text
+        document.update(changes[-1]['text'], item.get('version'))
+        self.publish(document)
+        return None
+
+    def did_close(self, params):
+        uri = (params.get('textDocument') or {}).get('uri')
+        if self.documents.pop(uri, None) is not None:
+            self.notify('textDocument/publishDiagnostics', {'uri': uri, 'diagnostics': []})
+        return None
+
+    def publish(self, document):
+        diagnostics = [_diagnostic(document, rule, start, end)
+                       for rule, start, end, _new_text in document.edits(self.rules)]
+        self.notify('textDocument/publishDiagnostics',
+                    {'uri': document.uri, 'version': document.version,
+                     'diagnostics': diagnostics})
+
+    # -- code actions --------------------------------------------------
+
+    def code_action(self, params):
+        document = self.documents.get((params.get('textDocument') or {}).get('uri'))
+        if document is None:
+            return []
+        only = (params.get('context') or {}).get('only')
+
+        def wants(kind):
+            return not only or any(kind == k or kind.startswith(k + '.') for k in only)
+
+        actions = []
+        edits = document.edits(self.rules)
+        selected = params.get('range') or {}
+        # quick fixes are offered at the requested range; without one, only fix-all
+        if wants(QUICKFIX) and 'start' in selected and 'end' in selected:
+            lo = document.offset(selected['start'])
+            hi = document.offset(selected['end'])
+            per_rule = {}
+            for rule, start, end, new_text in edits:
+                per_rule.setdefault(rule.key, []).append((start, end, new_text))
+            offered = set()
+            for rule, start, end, new_text in edits:
+                if start > hi or end < lo:
+                    continue
+                actions.append(self._action(
+                    document, f"Fix: {rule.message}", QUICKFIX, [(start, end, new_text)],
+                    [_diagnostic(document, rule, start, end)], preferred=True))
+                if rule.key not in offered and len(per_rule[rule.key]) > 1:
+                    offered.add(rule.key)
+                    actions.append(self._action(
+                        document, f"Fix all '{rule.name}' ({rule.script}) in file", QUICKFIX,
+                        per_rule[rule.key]))
+        if edits and wants(FIX_ALL):
+            start, end, new_text = minimal_edit(document.text, document.fixed(self.rules))
+            if start != end or new_text:
+                actions.append(self._action(document, 'Apply all codemod fixes in file',
+                                            FIX_ALL, [(start, end, new_text)]))
+        return actions
+
+    def _action(self, document, title, kind, edits, diagnostics=None, preferred=False):
+        action = {
+            'title': title,
+            'kind': kind,
+            'edit': {'documentChanges': [{
+                'textDocument': {'uri': document.uri, 'version': document.version},
+                'edits': [{'range': document.range(start, end), 'newText': new_text}
+                          for start, end, new_text in edits],
+            }]},
+        }
+        if diagnostics:
+            action['diagnostics'] = diagnostics
+        if preferred:
+            action['isPreferred'] = True
+        return action
+
+    METHODS = {
+        'initialize': initialize,
+        'initialized': on_initialized,
+        'shutdown': on_shutdown,
+        'exit': on_exit,
+        'textDocument/didOpen': did_open,
+        'textDocument/didChange': did_change,
+        'textDocument/didClose': did_close,
+        'textDocument/codeAction': code_action,
+    }
+
+
+def read_message(reader):
+    """Next framed JSON-RPC message from a binary stream; None at end of input"""
+    length = None
+    while True:
+        line = reader.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode('ascii').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    if length is None:
+        raise ValueError('Missing Content-Length header')
+    body = reader.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+
+def write_message(writer, message):
+    body = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    writer.write(b'Content-Length: %d\r\n\r\n' % len(body))
+    writer.write(body)
+    writer.flush()
+
+
+class Client:
+    """Scripted LSP client driving a server subprocess, for tests and probes"""
+
+    def __init__(self, argv):
+        import subprocess
+        self.process = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.next_id = 0
+        self.notifications = []
+
+    def notify(self, method, params):
+        write_message(self.process.stdin, {'jsonrpc': '2.0', 'method': method, 'params': params})
+
+    def request(self, method, params):
+        """Send a request and wait for its reply; returns (result, seconds)"""
+        self.next_id += 1
+        request_id = self.next_id
+        started = time.perf_counter()
+        write_message(self.process.stdin, {'jsonrpc': '2.0', 'id': request_id,
+                                           'method': method, 'params': params})
+        while True:
+            message = read_message(self.process.stdout)
+            if message is None:
+                raise EOFError(f"Server exited while waiting for {method}")
+            if message.get('id') == request_id:
+                elapsed = time.perf_counter() - started
+                if 'error' in message:
+                    raise RuntimeError(f"{method}: {message['error']['message']}")
+                return message.get('result'), elapsed
+            self.notifications.append(message)
+
+    def wait_for(self, method, uri=None):
+        """Next notification of `method` (for `uri`, if given), including ones already queued"""
+        def wanted(message):
+            return (message.get('method') == method
+                    and (uri is None or (message.get('params') or {}).get('uri') == uri))
+
+        for i, message in enumerate(self.notifications):
+            if wanted(message):
+                return self.notifications.pop(i)
+        while True:
+            message = read_message(self.process.stdout)
+            if message is None:
+                raise EOFError(f"Server exited while waiting for {method}")
+            if wanted(message):
+                return message
+            self.notifications.append(message)
+
+    def close(self):
+        self.request('shutdown', None)
+        self.notify('exit', None)
+        self.process.stdin.close()
+        code = self.process.wait()
+        self.process.stdout.close()
+        return code
+
+
+def probe(paths, argv=None, repeat=20):
+    """Open each file in a fresh server and time diagnostics and code actions; returns exit code"""
+    argv = argv or [sys.executable, '-m', 'codemod', 'lsp']
+    client = Client(argv)
+    _result, elapsed = client.request('initialize', {'processId': os.getpid(), 'rootUri': None,
+                                                     'capabilities': {}})
+    client.notify('initialized', {})
+    print(f"initialize: {elapsed * 1000:.1f}ms")
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        uri = path_to_uri(path)
+        started = time.perf_counter()
+        client.notify('textDocument/didOpen', {'textDocument': {
+            'uri': uri, 'languageId': 'dart', 'version': 1, 'text': text}})
+        published = client.wait_for('textDocument/publishDiagnostics', uri)
+        diagnostics = published['params']['diagnostics']
+        opened = time.perf_counter() - started
+        lines = text.count('\n') + 1
+        whole = {'start': {'line': 0, 'character': 0}, 'end': {'line': lines, 'character': 0}}
+        timings = {'cursor': [], 'file': [], 'fixAll': []}
+        cursor = diagnostics[0]['range'] if diagnostics else {
+            'start': {'line': 0, 'character': 0}, 'end': {'line': 0, 'character': 0}}
+        actions = []
+        for i in range(repeat):
+            # a fresh version each round, so nothing is served from the last answer
+            client.notify('textDocument/didChange', {
+                'textDocument': {'uri': uri, 'version': i + 2},
+                'contentChanges': [{'text': text}]})
+            client.wait_for('textDocument/publishDiagnostics', uri)
+            for name, params in (
+                    ('cursor', {'range': cursor, 'context': {'diagnostics': []}}),
+                    ('file', {'range': whole, 'context': {'diagnostics': []}}),
+                    ('fixAll', {'range': whole, 'context': {'diagnostics': [],
+                                                            'only': ['source.fixAll']}})):
+                params['textDocument'] = {'uri': uri}
+                actions, elapsed = client.request('textDocument/codeAction', params)
+                timings[name].append(elapsed)
+        client.notify('textDocument/didClose', {'textDocument': {'uri': uri}})
+        print(f"{path}: {lines} lines, {len(diagnostics)} diagnostics, "
+              f"open+diagnostics {opened * 1000:.1f}ms")
+        for name, samples in timings.items():
+            samples.sort()
+            print(f"  codeAction {name:<7} median {samples[len(samples) // 2] * 1000:.2f}ms, "
+                  f"max {samples[-1] * 1000:.2f}ms")
+        print(f"  fixAll actions: {len(actions)}")
+    return client.close()
+
+
+def run(scripts=None, funcs=None):
+    """Serve on stdin/stdout until the client says exit"""
+    server = Server(rule_table.select(scripts, funcs))
+    return server.serve(sys.stdin.buffer, sys.stdout.buffer)
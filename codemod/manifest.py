@@ -0,0 +1,227 @@
+"""
+Compact table of the files an index has seen: path, mtime, size and blob
+
+The indexes under .dart_tool/codemod keep one entry per Dart file to tell
+which files changed since they last looked. As a dict of path -> [mtime,
+size, blob] that is several Python objects per file, each path spelled out
+in full; at 100k files the bookkeeping outweighs the index. Here directory
+prefixes are stored once and referred to by number, sizes, mtimes and the
+directory numbers live in typed arrays, and blob hashes are kept as 20 raw
+bytes in a pool that files with the same content share, each file holding
+its offset into it. Saved, the table is a few flat byte strings that load
+with array.frombytes() and one split per string list.
+
+A matching mtime and size only say a file is unchanged if it was not
+written again within the same timestamp tick after it was looked at. As
+git does for its index, the table remembers when it was saved and does
+not trust the stat of a file modified within RACY_NS of that: such files
+are read again, and once a later save is far enough past their mtime they
+are trusted again.
+"""
+
+import struct
+import time
+from array import array
+
+TABLE_VERSION = 2
+# covers filesystems with coarse timestamps (FAT keeps even seconds)
+RACY_NS = 2_000_000_000
+_HEADER = struct.Struct('<4sIIIIq')
+_MAGIC = b'CMFT'
+_HASH = 20
+_NONE = -1
+
+
+class FileRecord:
+    """One file's entry, as the table hands it out"""
+
+    __slots__ = ('path', 'mtime_ns', 'size', 'blob')
+
+    def __init__(self, path, mtime_ns, size, blob):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.blob = blob
+
+    def __repr__(self):
+        return f"<FileRecord {self.path} {self.size} {self.blob}>"
+
+
+class FileTable:
+    """Root-relative path -> FileRecord, stored column by column"""
+
+    def __init__(self):
+        self._dirs = []
+        self._dir_ids = {}
+        self._dir = array('I')
+        self._names = []
+        self._mtime = array('q')
+        self._size = array('q')
+        self._blob = array('i')
+        self._pool = bytearray()
+        self._pool_ids = None
+        self._index = None
+        self._free = []
+        self.saved_ns = None
+
+    def __len__(self):
+        return len(self._names) - len(self._free)
+
+    def __contains__(self, path):
+        return path in self._ids()
+
+    def __iter__(self):
+        """The paths in the table, in no particular order"""
+        dirs = self._dirs
+        for d, name in zip(self._dir, self._names):
+            if name is not None:
+                yield dirs[d] + name
+
+    def _ids(self):
+        """{path: slot}, built on first use"""
+        if self._index is None:
+            if self._free:
+                self._index = {path: i for i, path in self._slots()}
+            else:
+                paths = map(str.__add__, map(self._dirs.__getitem__, self._dir), self._names)
+                self._index = dict(zip(paths, range(len(self._names))))
+        return self._index
+
+    def _slots(self):
+        dirs = self._dirs
+        for i, (d, name) in enumerate(zip(self._dir, self._names)):
+            if name is not None:
+                yield i, dirs[d] + name
+
+    def _blob_at(self, i):
+        offset = self._blob[i]
+        return None if offset == _NONE else self._pool[offset:offset + _HASH].hex()
+
+    def get(self, path):
+        i = self._ids().get(path)
+        if i is None:
+            return None
+        return FileRecord(path, self._mtime[i], self._size[i], self._blob_at(i))
+
+    def same_stat(self, path, st):
+        """Whether the file is in the table with st's mtime and size, and that
+        mtime is far enough before the table was saved to be trusted
+        """
+        i = self._ids().get(path)
+        if i is None or self._mtime[i] != st.st_mtime_ns or self._size[i] != st.st_size:
+            return False
+        return self.saved_ns is None or st.st_mtime_ns < self.saved_ns - RACY_NS
+
+    def blob(self, path):
+        i = self._ids().get(path)
+        return None if i is None else self._blob_at(i)
+
+    def records(self):
+        for i, path in self._slots():
+            yield FileRecord(path, self._mtime[i], self._size[i], self._blob_at(i))
+
+    def blobs(self):
+        """{path: blob} of the files whose content is known"""
+        return {path: self._blob_at(i) for i, path in self._slots() if self._blob[i] != _NONE}
+
+    def _intern_blob(self, blob):
+        if blob is None:
+            return _NONE
+        digest = bytes.fromhex(blob)
+        if self._pool_ids is None:
+            pool = self._pool
+            self._pool_ids = {bytes(pool[o:o + _HASH]): o for o in range(0, len(pool), _HASH)}
+        offset = self._pool_ids.get(digest)
+        if offset is None:
+            offset = self._pool_ids[digest] = len(self._pool)
+            self._pool += digest
+        return offset
+
+    def put(self, path, mtime_ns, size, blob):
+        i = self._ids().get(path)
+        if i is None:
+            name = path[path.rfind('/') + 1:]
+            directory = path[:len(path) - len(name)]
+            d = self._dir_ids.get(directory)
+            if d is None:
+                d = self._dir_ids[directory] = len(self._dirs)
+                self._dirs.append(directory)
+            if self._free:
+                i = self._free.pop()
+                self._dir[i] = d
+                self._names[i] = name
+            else:
+                i = len(self._names)
+                self._dir.append(d)
+                self._names.append(name)
+                self._mtime.append(0)
+                self._size.append(0)
+                self._blob.append(_NONE)
+            self._ids()[path] = i
+        self._mtime[i] = mtime_ns
+        self._size[i] = size
+        self._blob[i] = self._intern_blob(blob)
+
+    def remove(self, path):
+        i = self._ids().pop(path, None)
+        if i is not None:
+            self._names[i] = None
+            self._blob[i] = _NONE
+            self._free.append(i)
+
+    def dumps(self):
+        """The table as bytes; removed entries and unused hashes are dropped first"""
+        if self._free or len(self._pool) > 2 * _HASH * len(self):
+            self._compact()
+        self.saved_ns = time.time_ns()
+        text_dirs = '\0'.join(self._dirs).encode('utf-8')
+        text_names = '\0'.join(self._names).encode('utf-8')
+        return b''.join([_HEADER.pack(_MAGIC, TABLE_VERSION, len(self._names), len(text_dirs),
+                                      len(text_names), self.saved_ns),
+                         text_dirs, text_names, self._dir.tobytes(), self._mtime.tobytes(),
+                         self._size.tobytes(), self._blob.tobytes(), bytes(self._pool)])
+
+    def _compact(self):
+        live = list(self._slots())
+        old_blob, old_pool = self._blob, self._pool
+        columns = self._dir, self._names, self._mtime, self._size
+        self._dir, self._names, self._mtime, self._size = array('I'), [], array('q'), array('q')
+        self._blob, self._pool, self._pool_ids = array('i'), bytearray(), {}
+        self._free = []
+        self._index = None
+        for i, _path in live:
+            self._dir.append(columns[0][i])
+            self._names.append(columns[1][i])
+            self._mtime.append(columns[2][i])
+            self._size.append(columns[3][i])
+            offset = old_blob[i]
+            self._blob.append(_NONE if offset == _NONE
+                              else self._intern_blob(old_pool[offset:offset + _HASH].hex()))
+
+    @classmethod
+    def loads(cls, data):
+        """A table from dumps(); raises ValueError if `data` is not one"""
+        if len(data) < _HEADER.size:
+            raise ValueError("truncated file table")
+        magic, version, count, dirs_len, names_len, saved_ns = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != TABLE_VERSION:
+            raise ValueError("not a file table of this version")
+        table = cls()
+        table.saved_ns = saved_ns
+        pos = _HEADER.size
+        dirs = data[pos:pos + dirs_len]
+        pos += dirs_len
+        names = data[pos:pos + names_len]
+        pos += names_len
+        if count:
+            table._dirs = bytes(dirs).decode('utf-8').split('\0')
+            table._dir_ids = {d: i for i, d in enumerate(table._dirs)}
+            table._names = bytes(names).decode('utf-8').split('\0')
+        for column in (table._dir, table._mtime, table._size, table._blob):
+            end = pos + count * column.itemsize
+            column.frombytes(data[pos:end])
+            pos = end
+        table._pool = bytearray(data[pos:])
+        if len(table._names) != count or len(table._blob) != count or len(table._pool) % _HASH:
+            raise ValueError("truncated file table")
+        return table
@@ -0,0 +1,384 @@
+"""
+File moves that take the directives naming the files along, in one transaction
+
+fix_all_issues.fix_file_naming renames files and leaves every `import`,
+`export`, `part` and `part of` naming them broken until fix_imports_final
+has rewritten the strings all over the tree, by substring, so a second run
+can rewrite what the first already did. A move here is planned from the
+directive index, .dart_tool/codemod/directives.bin: each file's directive
+URIs and their offsets, refreshed like the other indexes (a stat per file,
+and only new content scanned). The index resolves every URI, relative or
+package:, to the file it names, so the files to edit are known without
+reading the tree; only those and the moved files are read, and each URI
+string that names a moved file, or is relative and sits in one, is
+rewritten to the new location in the style it was written in.
+
+The new contents are staged under .dart_tool/codemod/moves/ and listed in
+a journal; writing the journal is the commit point. Until then nothing
+under the package has changed, and after it the moves and edits are
+rolled forward, each one an os.rename() or os.replace(). A run that finds a journal
+finishes that transaction first. Moving a file that is already at its new
+place and rewriting a URI that already names it are no-ops, so a run
+repeated after a successful one changes nothing.
+"""
+
+import os
+import posixpath
+import re
+import shutil
+import stat
+import time
+
+from codemod import files, imports, lexer, state
+from codemod.manifest import FileTable
+
+INDEX_VERSION = 1
+INDEX_FILE = 'directives.bin'
+MOVES_DIR = 'moves'
+JOURNAL_FILE = 'journal.json'
+JOURNAL_VERSION = 1
+SOURCE_DIRS = ('lib', 'bin', 'test', 'tool', 'integration_test')
+
+_PLAIN_STRING = re.compile(r'''r?(['"])([^'"\\$\n]*)\1''')
+
+
+class MoveError(Exception):
+    """The moves cannot be made as given"""
+
+
+def scan(text):
+    """[(keyword, uri, start, end)] for the URI strings of the directives at the top of text
+
+    start and end delimit the URI inside its quotes; interpolated or escaped
+    strings are left out, as no move can be spelled into them safely.
+    """
+    found = []
+    tokens = [token for token in lexer.tokenize(text)
+              if token[0] != lexer.COMMENT and token[0] != lexer.DOC]
+    i = 0
+    while i < len(tokens):
+        kind, start, end = tokens[i]
+        value = text[start:end]
+        if kind == lexer.PUNCT and value == '@':
+            i = _skip_annotation(text, tokens, i + 1)
+            continue
+        if kind != lexer.IDENT or value not in imports.DIRECTIVES:
+            break
+        keyword = value
+        depth = 0
+        i += 1
+        while i < len(tokens):
+            kind, start, end = tokens[i]
+            value = text[start:end]
+            if kind == lexer.PUNCT:
+                if value == '(':
+                    depth += 1
+                elif value == ')':
+                    depth -= 1
+                elif value == ';' and not depth:
+                    break
+            elif kind == lexer.IDENT and value == 'of' and keyword == 'part':
+                keyword = 'part of'
+            elif kind == lexer.STRING and not depth and keyword != 'library':
+                plain = _PLAIN_STRING.fullmatch(value)
+                if plain:
+                    found.append((keyword, plain.group(2), start + plain.start(2),
+                                  start + plain.end(2)))
+            i += 1
+        i += 1
+    return found
+
+
+def _skip_annotation(text, tokens, i):
+    """Index of the token after an annotation's name and arguments"""
+    while i < len(tokens) and (tokens[i][0] == lexer.IDENT
+                               or text[tokens[i][1]:tokens[i][2]] == '.'):
+        i += 1
+    if i < len(tokens) and text[tokens[i][1]:tokens[i][2]] == '(':
+        depth = 0
+        while i < len(tokens):
+            value = text[tokens[i][1]:tokens[i][2]]
+            depth += (value == '(') - (value == ')')
+            i += 1
+            if not depth:
+                break
+    return i
+
+
+def resolve(package, relpath, uri):
+    """Root-relative path of the file `uri` names from the file at relpath; None if not ours"""
+    if uri.startswith('package:'):
+        name, _, rest = uri[len('package:'):].partition('/')
+        return posixpath.normpath('lib/' + rest) if name == package and rest else None
+    if ':' in uri.split('/', 1)[0]:
+        return None
+    return posixpath.normpath(posixpath.join(posixpath.dirname(relpath), uri))
+
+
+def spell(package, relpath, target, uri):
+    """URI naming `target` from the file at relpath, written the way `uri` was"""
+    if uri.startswith('package:') and target.startswith('lib/'):
+        return f'package:{package}/{target[len("lib/"):]}'
+    return posixpath.relpath(target, posixpath.dirname(relpath))
+
+
+class DirectiveIndex:
+    """Directive URIs of the package's Dart files, keyed by content hash"""
+
+    def __init__(self, root, use_state=True):
+        self.root = root
+        self.path = os.path.join(root, state.STATE_DIR, INDEX_FILE) if use_state else None
+        data = state.load_marshal(self.path) if self.path else None
+        try:
+            if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+                raise ValueError
+            self.meta = FileTable.loads(data['files'])
+        except ValueError:
+            data = {'blobs': {}}
+            self.meta = FileTable()
+        self.blobs = data['blobs']
+        self.scanned = 0
+        self.dirty = False
+
+    def refresh(self, paths):
+        """Bring the index in line with `paths`; returns the number of files scanned"""
+        wanted = set(paths)
+        for relpath in [p for p in self.meta if p not in wanted]:
+            self.meta.remove(relpath)
+            self.dirty = True
+        scanned = 0
+        for relpath in paths:
+            try:
+                st = os.stat(os.path.join(self.root, relpath))
+            except OSError:
+                self.meta.remove(relpath)
+                continue
+            if self.meta.same_stat(relpath, st):
+                continue
+            try:
+                data = files.read_bytes(self.root, relpath)
+            except OSError:
+                continue
+            scanned += self.record(relpath, st, data)
+        live = set(self.meta.blobs().values())
+        for blob in [b for b in self.blobs if b not in live]:
+            del self.blobs[blob]
+            self.dirty = True
+        self.scanned += scanned
+        return scanned
+
+    def record(self, relpath, st, data):
+        """Index data as relpath's content; returns 1 if it had to be scanned"""
+        blob = files.blob_hash(data)
+        self.meta.put(relpath, st.st_mtime_ns, st.st_size, blob)
+        self.dirty = True
+        if blob in self.blobs:
+            return 0
+        try:
+            self.blobs[blob] = scan(data.decode('utf-8'))
+        except UnicodeDecodeError:
+            self.blobs[blob] = []
+        return 1
+
+    def forget(self, relpath):
+        self.meta.remove(relpath)
+        self.dirty = True
+
+    def naming(self, package, targets):
+        """Paths of the files with a directive naming one of `targets`"""
+        targets = set(targets)
+        names = {target[target.rfind('/') + 1:] for target in targets}
+        found = set()
+        for relpath, blob in self.meta.blobs().items():
+            for _keyword, uri, _start, _end in self.blobs.get(blob, ()):
+                if (uri[uri.rfind('/') + 1:] in names
+                        and resolve(package, relpath, uri) in targets):
+                    found.add(relpath)
+                    break
+        return found
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        try:
+            state.state_dir(self.root)
+            state.save_marshal(self.path, {'version': INDEX_VERSION,
+                                           'files': self.meta.dumps(), 'blobs': self.blobs})
+        except OSError:
+            return
+        self.dirty = False
+
+
+def discover(root):
+    """The package's Dart files: lib/ and the directories that import it"""
+    return sorted(relpath for subdir in SOURCE_DIRS for relpath in files.discover(root, subdir))
+
+
+def check_moves(root, moves):
+    """{old: new} for the moves still to make or already made; raises MoveError on a clash
+
+    A move whose old path is gone and whose new path exists has been made
+    already (its importers may still need fixing); one where neither exists
+    does not apply to this package and is dropped.
+    """
+    mapping = {}
+    for old, new in moves:
+        old, new = posixpath.normpath(old), posixpath.normpath(new)
+        if old == new:
+            continue
+        if old in mapping and mapping[old] != new:
+            raise MoveError(f"{old} is moved twice, to {mapping[old]} and {new}")
+        mapping[old] = new
+    seen = {}
+    for old, new in mapping.items():
+        if new in seen:
+            raise MoveError(f"{seen[new]} and {old} are both moved to {new}")
+        seen[new] = old
+        if new in mapping:
+            raise MoveError(f"{new} is moved away and onto at once; make one move at a time")
+    live = {}
+    for old, new in mapping.items():
+        # spelled exactly, so a case-only rename is told apart on a case-insensitive disk
+        old_exists = files.exists(root, old)
+        new_exists = files.exists(root, new)
+        if old_exists and new_exists:
+            raise MoveError(f"Cannot move {old}: {new} already exists")
+        if old_exists or new_exists:
+            live[old] = new
+    return live
+
+
+def plan(root, mapping, index, package, paths):
+    """[(current path, final path, new bytes or None, directives rewritten)]: the moves and
+    edits to make, None standing for a move that keeps the content
+    """
+    pending = {old: new for old, new in mapping.items() if files.exists(root, old)}
+    earlier = {new: old for old, new in mapping.items() if old not in pending}
+    known = set(paths) | set(mapping)
+    affected = index.naming(package, mapping) | set(pending) | set(earlier)
+    out = []
+    for relpath in sorted(affected):
+        final = pending.get(relpath, relpath)
+        data = files.read_bytes(root, relpath)
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            continue
+        edits = []
+        for _keyword, uri, start, end in scan(text):
+            target = resolve(package, relpath, uri)
+            if target is None:
+                continue
+            if target not in known and relpath in earlier:
+                # moved without its directives: they still name files from its old place
+                target = resolve(package, earlier[relpath], uri)
+            target = mapping.get(target, target)
+            if resolve(package, final, uri) != target:
+                edits.append((start, end, spell(package, final, target, uri)))
+        if edits:
+            parts = []
+            last = 0
+            for start, end, uri in edits:
+                parts.append(text[last:start])
+                parts.append(uri)
+                last = end
+            parts.append(text[last:])
+            out.append((relpath, final, ''.join(parts).encode('utf-8'), len(edits)))
+        elif final != relpath:
+            out.append((relpath, final, None, 0))
+    return out
+
+
+def _journal_path(root):
+    return os.path.join(root, state.STATE_DIR, MOVES_DIR, JOURNAL_FILE)
+
+
+def commit(root, steps):
+    """Stage the new contents, write the journal and roll forward"""
+    stage_dir = os.path.join(state.state_dir(root), MOVES_DIR)
+    shutil.rmtree(stage_dir, ignore_errors=True)
+    os.makedirs(stage_dir)
+    entries = []
+    for number, (relpath, final, output, _count) in enumerate(steps):
+        staged = None
+        if output is not None:
+            staged = f'{number}.dart'
+            with open(os.path.join(stage_dir, staged), 'wb') as f:
+                f.write(output)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                mode = stat.S_IMODE(os.stat(os.path.join(root, relpath)).st_mode)
+                os.chmod(os.path.join(stage_dir, staged), mode)
+            except OSError:
+                pass
+        entries.append([relpath, final, staged])
+    state.save_json(_journal_path(root), {'version': JOURNAL_VERSION, 'entries': entries})
+    roll_forward(root, entries)
+
+
+def roll_forward(root, entries):
+    """Make every journalled move and edit that is not on disk yet, then drop the journal"""
+    stage_dir = os.path.join(root, state.STATE_DIR, MOVES_DIR)
+    for relpath, final, staged in entries:
+        source = os.path.join(root, relpath)
+        target = os.path.join(root, final)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        files.finish_move(target)
+        # moved before its new content goes in, so a case-only rename never
+        # sees the new file under the old name and removes it
+        if relpath != final and files.exists(root, relpath):
+            files.move(source, target)
+        if staged is not None:
+            staged = os.path.join(stage_dir, staged)
+            if os.path.exists(staged):
+                os.replace(staged, target)
+    shutil.rmtree(stage_dir, ignore_errors=True)
+
+
+def recover(root):
+    """Finish a transaction a previous run was interrupted in; returns its entries"""
+    journal = state.load_json(_journal_path(root), None)
+    if not isinstance(journal, dict) or journal.get('version') != JOURNAL_VERSION:
+        shutil.rmtree(os.path.join(root, state.STATE_DIR, MOVES_DIR), ignore_errors=True)
+        return []
+    roll_forward(root, journal['entries'])
+    return journal['entries']
+
+
+def run(root, moves, write=True, log=print):
+    """Move files and fix the directives naming them; returns a summary dict"""
+    started = time.perf_counter()
+    summary = {'files': 0, 'moved': 0, 'edited': 0, 'directives': 0, 'scanned': 0,
+               'recovered': 0}
+    if write:
+        recovered = recover(root)
+        summary['recovered'] = len(recovered)
+        if recovered:
+            log(f"Finished an interrupted move of {len(recovered)} files")
+    package = imports.package_name(root)
+    mapping = check_moves(root, moves)
+    index = DirectiveIndex(root)
+    paths = discover(root)
+    summary['files'] = len(paths)
+    index.refresh(paths)
+    steps = plan(root, mapping, index, package, paths) if mapping else []
+    for relpath, final, output, count in steps:
+        if final != relpath:
+            summary['moved'] += 1
+            log(f"Moved {relpath} to {final}" if write else f"Would move {relpath} to {final}")
+        if count:
+            summary['edited'] += 1
+            summary['directives'] += count
+            log(f"Rewrote {count} directive(s) in {final}" if write
+                else f"Would rewrite {count} directive(s) in {final}")
+    if write and steps:
+        commit(root, steps)
+        for relpath, final, _output, _count in steps:
+            index.forget(relpath)
+            index.record(final, os.stat(os.path.join(root, final)),
+                         files.read_bytes(root, final))
+    summary['scanned'] = index.scanned
+    index.save()
+    summary['elapsed'] = time.perf_counter() - started
+    return summary
@@ -0,0 +1,285 @@
+"""
+Adaptive rule ordering from measured selectivity
+
+Every apply records, per rule, how often its prefilter let a file through,
+how often it then changed something and what that cost per byte. From
+those numbers the next runs:
+
+- run independent rules in order of selectivity and cost, cheapest
+  filters first, while rules that may interact keep their relative order,
+  and rules the table declares pinned never move past another rule;
+- with `idle_runs` set (apply --adapt), leave out rules that have not
+  matched for that many runs, except on a periodic sweep run that applies
+  every rule in its original order.
+
+Sweep runs also replay a candidate order on every file they change. A
+file that comes out differently pins all rules that touched it, so an
+order dependence the static check missed is only ever observed once. A
+newly learned order is kept as a candidate and only used once a sweep has
+replayed it without a difference.
+"""
+
+import hashlib
+import os
+
+from codemod import scopes, state
+from codemod.patterns import PROBE, alphabet
+
+STATS_FILE = 'rule_stats.json'
+STATS_VERSION = 3
+IDLE_RUNS = 5
+SWEEP_EVERY = 10
+
+# tried, ran, matched, hits, bytes, seconds
+TRIED, RAN, MATCHED, HITS, BYTES, SECONDS = range(6)
+
+
+def add_costs(total, costs):
+    for key, values in costs.items():
+        entry = total.get(key)
+        if entry is None:
+            total[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                entry[i] += value
+    return total
+
+
+class RuleStats:
+    """Per-project rule statistics in .dart_tool/codemod/rule_stats.json"""
+
+    def __init__(self, root, use_state=True):
+        self.root = root
+        self.path = os.path.join(root, state.STATE_DIR, STATS_FILE) if use_state else None
+        data = state.load_json(self.path, None) if self.path else None
+        if not isinstance(data, dict) or data.get('version') != STATS_VERSION:
+            data = {'runs': 0, 'last_sweep': 0, 'rules': {}, 'pinned': []}
+        self.runs = data['runs']
+        self.last_sweep = data['last_sweep']
+        self.rules = data['rules']
+        self.pinned = set(data['pinned'])
+        self.interactions = data.get('interactions') or {}
+        self.plans = data.get('plans') or {}
+
+    def record(self, costs, swept):
+        """Fold one run's costs in; rules that were tried and never hit grow idler"""
+        self.runs += 1
+        for key, values in costs.items():
+            entry = self.rules.setdefault(key, {'totals': [0, 0, 0, 0, 0, 0.0], 'idle': 0})
+            for i, value in enumerate(values):
+                entry['totals'][i] += value
+            if values[HITS]:
+                entry['idle'] = 0
+            elif values[TRIED]:
+                entry['idle'] += 1
+        if swept:
+            self.last_sweep = self.runs
+
+    def idle(self, key):
+        entry = self.rules.get(key)
+        return entry['idle'] if entry else 0
+
+    def score(self, key):
+        """(pass rate of the prefilter, seconds per byte); None when never measured"""
+        entry = self.rules.get(key)
+        if not entry or not entry['totals'][TRIED]:
+            return None
+        totals = entry['totals']
+        per_byte = totals[SECONDS] / totals[BYTES] if totals[BYTES] else 0.0
+        return totals[RAN] / totals[TRIED], per_byte
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            state.state_dir(self.root)
+            state.save_json(self.path, {'version': STATS_VERSION, 'runs': self.runs,
+                                        'last_sweep': self.last_sweep, 'rules': self.rules,
+                                        'pinned': sorted(self.pinned),
+                                        'interactions': self.interactions,
+                                        'plans': self.plans})
+        except OSError:
+            pass
+
+
+def _overlap(a, b):
+    """True if `a` and `b` can share characters of one occurrence in some text"""
+    if a in b or b in a:
+        return True
+    for size in range(1, min(len(a), len(b))):
+        if a[-size:] == b[:size] or b[-size:] == a[:size]:
+            return True
+    return False
+
+
+_READS = {}
+
+
+def _reads(rule):
+    """Characters that decide where the rule matches (see patterns.alphabet), or None"""
+    if rule.key not in _READS:
+        if rule.kind == 'literal':
+            _READS[rule.key] = frozenset(rule.pattern)
+        elif rule.kind == 'regex':
+            _READS[rule.key] = alphabet(rule.pattern, rule.flags)
+        else:
+            # a line rule also reads how the line starts
+            _READS[rule.key] = None
+    return _READS[rule.key]
+
+
+def interacts(a, b):
+    """Conservative: may applying `a` and `b` in either order give different text?
+
+    Rules on disjoint files never interact. Two literal rewrites commute
+    when neither's text can share an occurrence with the other's pattern.
+    Otherwise the rules must read disjoint sets of characters and neither
+    may write one the other reads: a regex reads through its character
+    classes, so the getter rule for `x.toARGB32s`, which matches
+    `${x}.toARGB32s` once the interpolation rule has dropped the braces,
+    shares the word characters with it. Either way a rule whose edit can
+    shrink to nothing could join text around it, so it interacts.
+    """
+    if (a.paths is not None and b.paths is not None and not set(a.paths) & set(b.paths)
+            and not any(map(scopes.is_glob, a.paths + b.paths))):
+        return False
+    written_a, written_b = ''.join(a.written), ''.join(b.written)
+    if not written_a or not written_b:
+        return True
+    if a.kind == 'literal' and b.kind == 'literal':
+        return (_overlap(a.pattern, b.pattern) or _overlap(a.replacement, b.pattern)
+                or _overlap(b.replacement, a.pattern))
+    reads_a, reads_b = _reads(a), _reads(b)
+    if reads_a is None or reads_b is None:
+        return True
+    if any(c not in PROBE for c in written_a + written_b):
+        return True
+    return bool(reads_a & reads_b or reads_b.intersection(written_a)
+                or reads_a.intersection(written_b))
+
+
+def _interacting_pairs(rules, stats):
+    """{(i, j)} for i < j whose rules interact; cached in the stats per rule list"""
+    digest = hashlib.sha1('\n'.join(rule.key for rule in rules).encode('utf-8')).hexdigest()
+    for entry in stats:
+        if entry.interactions.get('rules') == digest:
+            return {tuple(pair) for pair in entry.interactions['pairs']}
+    pairs = [(i, j) for j in range(len(rules)) for i in range(j) if interacts(rules[i], rules[j])]
+    for entry in stats:
+        entry.interactions = {'rules': digest, 'pairs': pairs}
+    return set(pairs)
+
+
+def order(rules, stats):
+    """Every rule, in the order to run them
+
+    A topological sort of the original order, where an edge joins every
+    pair of interacting rules and every pair with a pinned rule (declared
+    in the table or learned from a conflict), always taking the most
+    selective, cheapest rule that is free to go next.
+    """
+    learned = {rule.key for rule in rules if rule.pinned}
+    for entry in stats:
+        learned |= entry.pinned
+    static = _interacting_pairs(rules, stats)
+    scores = {}
+    for rule in rules:
+        measured = [s for s in (entry.score(rule.key) for entry in stats) if s is not None]
+        if measured:
+            scores[rule.key] = (sum(s[0] for s in measured) / len(measured),
+                                sum(s[1] for s in measured) / len(measured))
+    blockers = [0] * len(rules)
+    after = [[] for _ in rules]
+    for j, later in enumerate(rules):
+        for i in range(j):
+            if (i, j) in static or rules[i].key in learned or later.key in learned:
+                blockers[j] += 1
+                after[i].append(j)
+    ready = [i for i, count in enumerate(blockers) if not count]
+    ordered = []
+    while ready:
+        ready.sort(key=lambda i: (scores.get(rules[i].key, (1.0, 0.0)), i))
+        i = ready.pop(0)
+        ordered.append(rules[i])
+        for j in after[i]:
+            blockers[j] -= 1
+            if not blockers[j]:
+                ready.append(j)
+    return ordered
+
+
+def deferred(rules, stats, idle_runs):
+    """The rules idle for `idle_runs` runs in every package; none when idle_runs is 0"""
+    if not idle_runs:
+        return []
+    learned = set()
+    for entry in stats:
+        learned |= entry.pinned
+    return [rule for rule in rules
+            if not rule.pinned and rule.key not in learned
+            and all(entry.idle(rule.key) >= idle_runs for entry in stats)]
+
+
+def due_for_sweep(stats, every=SWEEP_EVERY):
+    return any(entry.runs - entry.last_sweep >= every for entry in stats)
+
+
+class Adaptive:
+    """The rule order for one apply run, and the bookkeeping after it
+
+    An order is only ever made on a sweep run and then frozen until the
+    next one, so timing noise cannot reshuffle the rules, and with them the
+    transform cache keys, on every run. An order that differs from the
+    scripts' is only used once a sweep run has replayed it on the files it
+    changed and found no difference; until then every run is a sweep that
+    checks it. Idle rules are only left out with `idle_runs` set.
+    """
+
+    def __init__(self, roots, rules, idle_runs=0, sweep_every=SWEEP_EVERY, sweep=False):
+        self.original = list(rules)
+        self.stats = {root: RuleStats(root) for root in roots}
+        self.digest = hashlib.sha1('\n'.join(r.key for r in rules).encode('utf-8')).hexdigest()
+        stored = None
+        for entry in self.stats.values():
+            stored = entry.plans.get(self.digest)
+            if stored:
+                break
+        by_key = {rule.key: rule for rule in rules}
+        if stored and set(stored.get('full', ())) != set(by_key):
+            stored = None
+        verified = bool(stored and stored.get('verified'))
+        self.sweep = bool(sweep or not verified
+                          or due_for_sweep(self.stats.values(), sweep_every))
+        self.replay = None
+        self.demoted = []
+        if self.sweep:
+            self.rules = self.original
+            if stored and not verified:
+                candidate = [by_key[key] for key in stored['full']]
+            else:
+                candidate = order(self.original, list(self.stats.values()))
+            if [r.key for r in candidate] != [r.key for r in self.original]:
+                self.replay = candidate
+        else:
+            self.demoted = deferred(self.original, list(self.stats.values()), idle_runs)
+            left_out = {rule.key for rule in self.demoted}
+            self.rules = [by_key[key] for key in stored['full'] if key not in left_out]
+        self.pinned = set()
+
+    def finish(self, costs, conflicts=()):
+        """Record {root: costs}; on a sweep, learn pins from `conflicts` and re-plan"""
+        stats = list(self.stats.values())
+        for root, entry in self.stats.items():
+            entry.record(costs.get(root, {}), self.sweep)
+        if self.sweep:
+            self.pinned = set(conflicts) - set().union(*(entry.pinned for entry in stats))
+            for entry in stats:
+                entry.pinned |= set(conflicts)
+            full = [r.key for r in order(self.original, stats)]
+            replayed = None if self.replay is None else [r.key for r in self.replay]
+            verified = (full == [r.key for r in self.original]
+                        or (full == replayed and not conflicts))
+            for entry in stats:
+                entry.plans[self.digest] = {'full': full, 'verified': verified}
+        for entry in stats:
+            entry.save()
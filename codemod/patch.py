@@ -0,0 +1,141 @@
+"""
+Unified diffs of the engine's output, streamed into one patch file
+
+`apply --emit-patch FILE` writes nothing under lib/: each changed file
+becomes a `diff --git` entry, and each pending move a rename entry, in a
+patch that `git apply` takes from the package root. With -j the workers
+diff their own files and send back only the hunks, and the parent appends
+them to the patch as results arrive, so a run never holds more than the
+files in flight.
+"""
+
+import difflib
+import os
+
+CONTEXT = 3
+
+_NO_NEWLINE = b'\n\\ No newline at end of file\n'
+
+
+def _range(start, length):
+    """The 'start,length' of a hunk header, as diff writes it"""
+    if length == 1:
+        return f'{start + 1}'
+    if not length:
+        return f'{start},0'
+    return f'{start + 1},{length}'
+
+
+def _lines(prefix, lines):
+    for line in lines:
+        yield prefix + line if line.endswith(b'\n') else prefix + line + _NO_NEWLINE
+
+
+def _opcodes(a, b):
+    """get_opcodes() over the lines, the common head and tail left out of the matching"""
+    head = 0
+    while head < len(a) and head < len(b) and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < len(a) - head and tail < len(b) - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+    matcher = difflib.SequenceMatcher(None, a[head:len(a) - tail], b[head:len(b) - tail],
+                                      autojunk=False)
+    codes = [('equal', 0, head, 0, head)] if head else []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        codes.append((tag, i1 + head, i2 + head, j1 + head, j2 + head))
+    if tail:
+        codes.append(('equal', len(a) - tail, len(a), len(b) - tail, len(b)))
+    return codes
+
+
+def _groups(codes, context):
+    """The opcodes in hunks with `context` lines around each change, as
+    SequenceMatcher.get_grouped_opcodes() cuts them
+    """
+    if not codes:
+        return
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def hunks(old, new, context=CONTEXT):
+    """The hunks of a unified diff from bytes `old` to bytes `new` (b'' if they are equal)"""
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    out = []
+    for group in _groups(_opcodes(a, b), context):
+        first, last = group[0], group[-1]
+        out.append(f'@@ -{_range(first[1], last[2] - first[1])} '
+                   f'+{_range(first[3], last[4] - first[3])} @@\n'.encode('ascii'))
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                out.extend(_lines(b' ', a[i1:i2]))
+                continue
+            out.extend(_lines(b'-', a[i1:i2]))
+            out.extend(_lines(b'+', b[j1:j2]))
+    return b''.join(out)
+
+
+class PatchWriter:
+    """One patch file, written under a temporary name and put in place by close()
+
+    A file that is also moved gets one entry, renaming and editing it, as
+    `git apply` does not chain two entries for the same path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp = f"{path}.{os.getpid()}.tmp"
+        self.out = open(self.tmp, 'wb')
+        self.moves = {}
+        self.files = 0
+        self.renames = 0
+
+    def move(self, old, new):
+        """Record that the file at `old` moves to `new` (both like file()'s `path`)"""
+        self.moves[old] = new
+
+    def file(self, path, diff):
+        """Add the hunks (from hunks()) of the file at `path`, a '/'-separated relative path"""
+        if not diff:
+            return
+        new = self.moves.pop(path, None)
+        if new is None:
+            self.out.write(f'diff --git a/{path} b/{path}\n'.encode('utf-8'))
+        else:
+            self._rename(path, new)
+        self.out.write(f'--- a/{path}\n+++ b/{new or path}\n'.encode('utf-8'))
+        self.out.write(diff)
+        self.files += 1
+
+    def _rename(self, old, new):
+        self.out.write(f'diff --git a/{old} b/{new}\nrename from {old}\nrename to {new}\n'
+                       .encode('utf-8'))
+        self.renames += 1
+
+    def close(self):
+        """Add the moves of files that were not edited, and put the patch in place"""
+        for old, new in self.moves.items():
+            self._rename(old, new)
+        self.moves.clear()
+        self.out.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.out.close()
+        os.unlink(self.tmp)
@@ -0,0 +1,488 @@
+"""
+Static analysis of the rule regexes (literals a match must contain)
+"""
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+    from re import _compiler as sre_compile
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+    import sre_compile
+
+LITERAL = sre_constants.LITERAL
+NOT_LITERAL = sre_constants.NOT_LITERAL
+IN = sre_constants.IN
+ANY = sre_constants.ANY
+BRANCH = sre_constants.BRANCH
+SUBPATTERN = sre_constants.SUBPATTERN
+MAX_REPEAT = sre_constants.MAX_REPEAT
+MIN_REPEAT = sre_constants.MIN_REPEAT
+POSSESSIVE_REPEAT = getattr(sre_constants, 'POSSESSIVE_REPEAT', None)
+ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+AT = sre_constants.AT
+ASSERT = sre_constants.ASSERT
+ASSERT_NOT = sre_constants.ASSERT_NOT
+GROUPREF = sre_constants.GROUPREF
+AT_BEGINNING = sre_constants.AT_BEGINNING
+AT_END = sre_constants.AT_END
+AT_BOUNDARY = sre_constants.AT_BOUNDARY
+AT_NON_BOUNDARY = sre_constants.AT_NON_BOUNDARY
+SRE_FLAG_MULTILINE = sre_constants.SRE_FLAG_MULTILINE
+SRE_FLAG_IGNORECASE = sre_constants.SRE_FLAG_IGNORECASE
+MAXREPEAT = sre_constants.MAXREPEAT
+
+REPEATS = tuple(op for op in (MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT) if op is not None)
+
+
+def parse(pattern, flags=0):
+    """Parse a pattern into the sre tree used by the re module"""
+    return sre_parse.parse(pattern, flags)
+
+
+def _collect(items, runs, current):
+    """Append the literal runs of a parsed sequence to `runs`"""
+    for op, av in items:
+        if op is LITERAL:
+            current.append(chr(av))
+        elif op is SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            if add_flags & SRE_FLAG_IGNORECASE:
+                _flush(runs, current)
+                continue
+            _collect(sub.data, runs, current)
+        elif op is ATOMIC_GROUP:
+            _collect(av.data, runs, current)
+        elif op in REPEATS:
+            low, _high, sub = av
+            _flush(runs, current)
+            if low >= 1:
+                inner = []
+                _collect(sub.data, runs, inner)
+                _flush(runs, inner)
+        elif op in (AT, ASSERT, ASSERT_NOT):
+            # Zero-width: the characters on either side stay adjacent
+            continue
+        else:
+            _flush(runs, current)
+    return runs
+
+
+def _flush(runs, current):
+    if current:
+        runs.append(''.join(current))
+        del current[:]
+
+
+def literal_runs(pattern, flags=0):
+    """Literal strings that every match of `pattern` must contain, in pattern order"""
+    if flags & SRE_FLAG_IGNORECASE:
+        return []
+    tree = parse(pattern, flags)
+    if tree.state.flags & SRE_FLAG_IGNORECASE:
+        return []
+    runs = []
+    current = []
+    _collect(tree.data, runs, current)
+    _flush(runs, current)
+    return runs
+
+
+def required_literals(pattern, flags=0):
+    """Literal strings that every match of `pattern` must contain, longest first"""
+    return sorted(set(literal_runs(pattern, flags)), key=len, reverse=True)
+
+
+def _prefix(items, classes):
+    """Split off the leading single-character items; returns the rest or None"""
+    for index, (op, av) in enumerate(items):
+        if op in (IN, NOT_LITERAL, ANY):
+            classes.append((op, av))
+        elif op in REPEATS and all(sub_op in (IN, NOT_LITERAL, ANY) for sub_op, _ in av[2].data):
+            classes.extend(av[2].data)
+        elif op is AT:
+            continue
+        elif op is SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            if add_flags or del_flags:
+                return None
+            rest = _prefix(sub.data, classes)
+            if rest is None or rest:
+                # The group holds the anchor itself: keep its tail in sequence
+                return None if rest is None else list(rest) + list(items[index + 1:])
+        else:
+            return items[index:]
+    return []
+
+
+def anchor(pattern, flags=0):
+    """(literal, prefix_class) for patterns shaped like `<class items> literal ...`
+
+    Every match of such a pattern starts with a run of characters accepted by
+    `prefix_class` (a compiled single-character pattern, or None when the
+    pattern starts with the literal) immediately followed by `literal`. The
+    first character of the literal is outside the class, so the literal can
+    never start inside that run. Returns None when the pattern does not have
+    that shape.
+    """
+    parts = _anchor_parts(pattern, flags)
+    if parts is None:
+        return None
+    literal, branch = parts
+    if branch is None:
+        return literal, None
+    prefix_class = sre_compile.compile(branch, branch.state.flags)
+    if prefix_class.match(literal[0]):
+        return None
+    return literal, prefix_class
+
+
+def _anchor_parts(pattern, flags):
+    """(literal, parsed prefix class or None) for anchor(), or None"""
+    if flags & SRE_FLAG_IGNORECASE:
+        return None
+    tree = parse(pattern, flags)
+    if tree.state.flags & SRE_FLAG_IGNORECASE:
+        return None
+    classes = []
+    rest = _prefix(tree.data, classes)
+    if not rest or rest[0][0] is not LITERAL:
+        return None
+    chars = []
+    for op, av in rest:
+        if op is not LITERAL:
+            break
+        chars.append(chr(av))
+    literal = ''.join(chars)
+    if not classes:
+        return literal, None
+    state = tree.state
+    return literal, sre_parse.SubPattern(state, [(BRANCH, (None, [
+        sre_parse.SubPattern(state, [item]) for item in classes]))])
+
+
+# Characters used to compare what two single-character items can match
+PROBE = ''.join(chr(c) for c in range(128)) + '\u00e9\u00a0\u4e2d\U0001f600'
+SINGLE = (LITERAL, NOT_LITERAL, IN, ANY)
+
+
+def _charset(item, state, cache):
+    """Probe characters a single-character item accepts"""
+    key = repr(item)
+    found = cache.get(key)
+    if found is None:
+        compiled = sre_compile.compile(sre_parse.SubPattern(state, [item]), state.flags)
+        found = frozenset(c for c in PROBE if compiled.fullmatch(c))
+        cache[key] = found
+    return found
+
+
+def _repeat_set(item, state, cache):
+    """(min, unbounded, charset) for a repeat of one single-character item, else None"""
+    op, av = item
+    if op not in (MAX_REPEAT, MIN_REPEAT):
+        return None
+    low, high, sub = av
+    body = sub.data
+    while len(body) == 1 and body[0][0] is SUBPATTERN and not body[0][1][1] and not body[0][1][2]:
+        body = body[0][1][3].data
+    if len(body) != 1 or body[0][0] not in SINGLE:
+        return None
+    return low, high == MAXREPEAT, _charset(body[0], state, cache)
+
+
+def _flatten(items):
+    """The sequence with plain groups inlined, so adjacency shows through them"""
+    flat = []
+    for op, av in items:
+        if op is SUBPATTERN and not av[1] and not av[2]:
+            flat.extend(_flatten(av[3].data))
+        else:
+            flat.append((op, av))
+    return flat
+
+
+def _has_unbounded(items):
+    for op, av in items:
+        if op in (MAX_REPEAT, MIN_REPEAT):
+            if av[1] == MAXREPEAT:
+                return True
+            if _has_unbounded(av[2].data):
+                return True
+        elif op is SUBPATTERN:
+            if _has_unbounded(av[3].data):
+                return True
+        elif op is BRANCH:
+            if any(_has_unbounded(branch.data) for branch in av[1]):
+                return True
+    return False
+
+
+_CATEGORIES = {
+    'CATEGORY_DIGIT': r'\d', 'CATEGORY_NOT_DIGIT': r'\D',
+    'CATEGORY_SPACE': r'\s', 'CATEGORY_NOT_SPACE': r'\S',
+    'CATEGORY_WORD': r'\w', 'CATEGORY_NOT_WORD': r'\W',
+}
+
+
+def _render_char(code):
+    char = chr(code)
+    return '\\' + char if char in '\\.^$*+?{}[]()|-' else repr(char)[1:-1]
+
+
+def _render_single(op, av):
+    if op is LITERAL:
+        return _render_char(av)
+    if op is NOT_LITERAL:
+        return f"[^{_render_char(av)}]"
+    if op is ANY:
+        return '.'
+    parts = []
+    negate = ''
+    for sub_op, sub_av in av:
+        name = str(sub_op)
+        if name == 'NEGATE':
+            negate = '^'
+        elif sub_op is LITERAL:
+            parts.append(_render_char(sub_av))
+        elif name == 'RANGE':
+            parts.append(f"{_render_char(sub_av[0])}-{_render_char(sub_av[1])}")
+        elif name == 'CATEGORY':
+            parts.append(_CATEGORIES.get(str(sub_av), '?'))
+    if not negate and len(parts) == 1 and parts[0].startswith('\\'):
+        return parts[0]
+    return f"[{negate}{''.join(parts)}]"
+
+
+def _render_repeat(item):
+    """Approximate source text of a repeat of one single-character item"""
+    op, (low, high, sub) = item
+    body = sub.data
+    while len(body) == 1 and body[0][0] is SUBPATTERN:
+        body = body[0][1][3].data
+    text = _render_single(*body[0])
+    if (low, high) == (0, MAXREPEAT):
+        text += '*'
+    elif (low, high) == (1, MAXREPEAT):
+        text += '+'
+    elif (low, high) == (0, 1):
+        text += '?'
+    else:
+        text += f"{{{low},{'' if high == MAXREPEAT else high}}}"
+    return text + ('?' if op is MIN_REPEAT else '')
+
+
+def _sample(chars):
+    shown = sorted(chars)[:4]
+    more = ', ...' if len(chars) > len(shown) else ''
+    return ', '.join(repr(c) for c in shown) + more
+
+
+def _scan(items, state, cache, risks):
+    items = _flatten(items)
+    for index, (op, av) in enumerate(items):
+        if op in (MAX_REPEAT, MIN_REPEAT):
+            if av[1] == MAXREPEAT and _has_unbounded(av[2].data):
+                risks.append('nested quantifier: an unbounded repeat inside an unbounded repeat '
+                             'can backtrack exponentially')
+            _scan(av[2].data, state, cache, risks)
+            first = _repeat_set((op, av), state, cache)
+            if first is not None and first[1]:
+                _overlaps((op, av), first[2], items[index + 1:], state, cache, risks)
+        elif op is SUBPATTERN:
+            _scan(av[3].data, state, cache, risks)
+        elif op is BRANCH:
+            for branch in av[1]:
+                _scan(branch.data, state, cache, risks)
+        elif op in (ASSERT, ASSERT_NOT):
+            _scan(av[1].data, state, cache, risks)
+
+
+def _overlaps(first, chars, following, state, cache, risks):
+    """Flag later repeats that can trade characters with an unbounded repeat over `chars`
+
+    Walks forward while every item in between could also be consumed by the
+    first repeat; past a character it cannot take, the two cannot compete.
+    """
+    for item in following:
+        op, av = item
+        if op in (AT, ASSERT, ASSERT_NOT):
+            continue
+        repeat = _repeat_set(item, state, cache)
+        if repeat is not None:
+            low, unbounded, other = repeat
+            common = chars & other
+            if common and unbounded:
+                risks.append(f"overlapping quantifiers: {_render_repeat(first)} and "
+                             f"{_render_repeat(item)} both accept {_sample(common)} and can "
+                             f"trade them, so a failing match backtracks polynomially")
+                return
+            if low and not other <= chars:
+                return
+            continue
+        if op in SINGLE and _charset(item, state, cache) <= chars:
+            continue
+        return
+
+
+def backtracking_risks(pattern, flags=0):
+    """Static warnings about nested or overlapping quantifiers in `pattern`"""
+    tree = parse(pattern, flags)
+    risks = []
+    _scan(tree.data, tree.state, {}, risks)
+    return list(dict.fromkeys(risks))
+
+
+def _shape(items, state, cache, multiline, groups):
+    """(nullable, first chars, last chars, spans) of a sequence, or None if unknown
+
+    `spans` is true when some match can hold `}` directly followed by a
+    newline. Zero-width items must not be able to see across a line.
+    """
+    nullable, first, last, spans = True, set(), set(), False
+    for op, av in items:
+        if op in SINGLE:
+            chars = _charset((op, av), state, cache)
+            shape = (False, chars, chars, False)
+        elif op is AT:
+            if av in (AT_BEGINNING, AT_END) and multiline or av in (AT_BOUNDARY, AT_NON_BOUNDARY):
+                continue
+            return None
+        elif op in (ASSERT, ASSERT_NOT):
+            inner = _shape(av[1].data, state, cache, multiline, groups)
+            if inner is None or '\n' in inner[1] | inner[2]:
+                return None
+            continue
+        elif op in REPEATS:
+            low, high, sub = av
+            inner = _shape(sub.data, state, cache, multiline, groups)
+            if inner is None:
+                return None
+            looped = high > 1 and '}' in inner[2] and '\n' in inner[1]
+            shape = (inner[0] or low == 0, inner[1], inner[2], inner[3] or looped)
+        elif op is SUBPATTERN:
+            group, add_flags, del_flags, sub = av
+            inner_multiline = ((multiline or add_flags & SRE_FLAG_MULTILINE)
+                               and not del_flags & SRE_FLAG_MULTILINE)
+            shape = _shape(sub.data, state, cache, inner_multiline, groups)
+            if shape is None:
+                return None
+            if group is not None:
+                groups[group] = shape
+        elif op is ATOMIC_GROUP:
+            shape = _shape(av.data, state, cache, multiline, groups)
+            if shape is None:
+                return None
+        elif op is BRANCH:
+            shapes = [_shape(branch.data, state, cache, multiline, groups) for branch in av[1]]
+            if any(shape is None for shape in shapes):
+                return None
+            shape = (any(s[0] for s in shapes), set().union(*(s[1] for s in shapes)),
+                     set().union(*(s[2] for s in shapes)), any(s[3] for s in shapes))
+        elif op is GROUPREF and av in groups:
+            referenced = groups[av]
+            # the referenced text can be any string the group matched
+            chars = referenced[1] | referenced[2]
+            shape = (referenced[0], chars, chars, referenced[3] or '\n' in chars)
+        else:
+            return None
+        item_nullable, item_first, item_last, item_spans = shape
+        spans = spans or item_spans or ('}' in last and '\n' in item_first)
+        if nullable:
+            first = first | item_first
+        last = last | item_last if item_nullable else set(item_last)
+        nullable = nullable and item_nullable
+    return nullable, first, last, spans
+
+
+def splittable(pattern, flags=0):
+    """True if applying `pattern` to pieces of a text gives the same result as
+    applying it to the whole, when every cut falls just after a `}` that ends
+    its line
+
+    Every match crossing such a cut would have to start with that newline
+    or hold `}` directly followed by it; this checks that no match can,
+    that the pattern never matches the empty string, and that its anchors
+    and lookarounds never look across a line.
+    """
+    tree = parse(pattern, flags)
+    if tree.getwidth()[0] == 0:
+        return False
+    multiline = bool(tree.state.flags & SRE_FLAG_MULTILINE)
+    shape = _shape(tree.data, tree.state, {}, multiline, {})
+    return shape is not None and not shape[3] and '\n' not in shape[1]
+
+
+WORD = frozenset(c for c in PROBE if c.isalnum() or c == '_')
+
+
+def word_only(pattern, flags=0):
+    """True if every match of `pattern` is a non-empty run of word characters
+
+    Such a pattern matches the same inside an identifier token as it does
+    in the whole text, since the token is a maximal run of word characters
+    (see codemod.identifiers).
+    """
+    tree = parse(pattern, flags)
+    return tree.getwidth()[0] > 0 and _word_only(tree.data, tree.state, {})
+
+
+def _word_only(items, state, cache):
+    for op, av in items:
+        if op in SINGLE:
+            if not _charset((op, av), state, cache) <= WORD:
+                return False
+        elif op is SUBPATTERN:
+            if not _word_only(av[3].data, state, cache):
+                return False
+        elif op in REPEATS:
+            if not _word_only(av[2].data, state, cache):
+                return False
+        elif op is BRANCH:
+            if not all(_word_only(branch.data, state, cache) for branch in av[1]):
+                return False
+        elif op is not AT or av not in (AT_BOUNDARY, AT_NON_BOUNDARY):
+            return False
+    return True
+
+
+def alphabet(pattern, flags=0):
+    """Probe characters a match of `pattern` can consume or look at, or None if unknown
+
+    Lookarounds count with what they look for, `\\b` with every word
+    character and line anchors with the newline. A text edit that neither
+    removes nor inserts any of these characters, and never shrinks to
+    nothing, cannot start or stop a match: every match is a run of them.
+    """
+    tree = parse(pattern, flags)
+    found = set()
+    if not _alphabet(tree.data, tree.state, {}, found):
+        return None
+    return frozenset(found)
+
+
+def _alphabet(items, state, cache, found):
+    for op, av in items:
+        if op in SINGLE:
+            found |= _charset((op, av), state, cache)
+        elif op is SUBPATTERN:
+            if not _alphabet(av[3].data, state, cache, found):
+                return False
+        elif op in REPEATS:
+            if not _alphabet(av[2].data, state, cache, found):
+                return False
+        elif op is BRANCH:
+            if not all(_alphabet(branch.data, state, cache, found) for branch in av[1]):
+                return False
+        elif op in (ASSERT, ASSERT_NOT):
+            if not _alphabet(av[1].data, state, cache, found):
+                return False
+        elif op is AT:
+            if av in (AT_BOUNDARY, AT_NON_BOUNDARY):
+                found |= WORD
+            elif av in (AT_BEGINNING, AT_END):
+                found.add('\n')
+        elif op is not GROUPREF:
+            return False
+    return True
@@ -0,0 +1,302 @@
+"""
+Planning a run of several fix scripts as few tree passes as possible
+
+Run one after another, every legacy fix function globs lib/ and reads (and
+rewrites) the files it finds, so a chain of scripts walks the tree once per
+function. The planner puts the selected scripts' rules and file moves, in
+the order given, into a dependency graph built from what each one reads
+and writes:
+
+- two content rules that may interact (ordering.interacts) keep their
+  order, which one pass already does;
+- a rule scoped to a path that a move takes away or brings in runs before
+  the move if it came before it, in the same pass at the latest, and in a
+  later pass if it came after it, once the move is on disk;
+- moves keep their order among themselves when they share a path.
+
+A rule that is not scoped to a moved path does not care where the file
+lives: rewriting the imports of 'GlobalDB.dart' edits the importing files'
+text, before or after the move, so it shares the pass. The passes are the
+longest-path layers of the graph, which is the fewest any schedule that
+respects its edges can use; each runs through engine.run, its moves last.
+"""
+
+import json
+import os
+import time
+
+from codemod import engine, files, project
+from codemod import rules as rule_table
+from codemod.ordering import interacts
+
+
+class Step:
+    """A rule or a file move at its place in the scripts' order, and its pass"""
+
+    def __init__(self, index, script, func, rule):
+        self.index = index
+        self.script = script
+        self.func = func
+        self.rule = rule
+        self.after = []
+        self.pass_index = 0
+        self.dead = False
+
+    @property
+    def is_move(self):
+        return self.rule.kind == 'rename'
+
+    def __repr__(self):
+        return f"<Step {self.index} {self.rule.key} pass {self.pass_index}>"
+
+
+def steps(scripts=None, funcs=None):
+    """[Step] in the order the scripts, given in that order, would run them"""
+    from codemod.shadow import units
+    order = list(scripts or rule_table.RULESETS)
+    out = []
+    for script, func, rules, renames in sorted(units(scripts, funcs),
+                                               key=lambda unit: order.index(unit[0])):
+        for rule in rules + renames:
+            out.append(Step(len(out), script, func, rule))
+    return out
+
+
+def _scoped_to(rule, relpath):
+    return rule.paths is not None and rule.applies_to(relpath)
+
+
+def _moved_paths(move):
+    return move.rule.pattern, move.rule.replacement
+
+
+def mark_dead(plan):
+    """Mark the rules scoped only to files that earlier moves took away
+
+    Such a rule matches nothing by the time it runs, as in the legacy
+    scripts; it is left out rather than given a pass of its own.
+    """
+    gone = set()
+    for step in plan:
+        if step.is_move:
+            gone.add(step.rule.pattern)
+            gone.discard(step.rule.replacement)
+        elif (step.rule.paths is not None and gone
+              and all(path in gone for path in step.rule.paths)):
+            step.dead = True
+    return plan
+
+
+def moved_away(rules, renames):
+    """Keys of the rules that only apply to files a move earlier in the scripts takes away
+
+    engine.run makes its moves after every content rule, where the
+    scripts move files part way through: these rules find no file in the
+    scripts, and must not fire on the file at its old path either.
+    """
+    if not renames:
+        return set()
+    keys = {rule.key for rule in rules} | {rule.key for rule in renames}
+    scripts = list(dict.fromkeys(rule.script for rule in list(rules) + list(renames)))
+    plan = mark_dead([step for step in steps(scripts) if step.rule.key in keys])
+    return {step.rule.key for step in plan if step.dead}
+
+
+def link(plan):
+    """Fill in each step's `after`: [(earlier step, needs a new pass, reason)]
+    and mark the dead rules (see mark_dead)
+    """
+    mark_dead(plan)
+    for j, later in enumerate(plan):
+        if later.dead:
+            continue
+        for earlier in plan[:j]:
+            if earlier.dead:
+                continue
+            if earlier.is_move and later.is_move:
+                if set(_moved_paths(earlier)) & set(_moved_paths(later)):
+                    later.after.append((earlier, False, 'moves the same file first'))
+            elif earlier.is_move:
+                moved = [path for path in _moved_paths(earlier) if _scoped_to(later.rule, path)]
+                if moved:
+                    later.after.append((earlier, True, f"is scoped to {moved[0]}, moved first"))
+            elif later.is_move:
+                moved = [path for path in _moved_paths(later) if _scoped_to(earlier.rule, path)]
+                if moved:
+                    later.after.append((earlier, False, f"edits {moved[0]} before the move"))
+            elif interacts(earlier.rule, later.rule):
+                later.after.append((earlier, False, 'may rewrite the same text'))
+    return plan
+
+
+def schedule(plan):
+    """Number the passes: each step goes to the first pass its dependencies allow.
+    Returns [(content rules, moves)] per pass, both in the scripts' order.
+    """
+    plan = [step for step in plan if not step.dead]
+    for step in plan:
+        step.pass_index = max([earlier.pass_index + new_pass
+                               for earlier, new_pass, _reason in step.after], default=0)
+    count = max((step.pass_index for step in plan), default=-1) + 1
+    passes = [([], []) for _ in range(count)]
+    for step in plan:
+        passes[step.pass_index][1 if step.is_move else 0].append(step.rule)
+    return passes
+
+
+def _opened(step, relpaths):
+    """The files a legacy function opens for one of its rules: its scope, or None for all of lib/"""
+    if step.rule.paths is None:
+        return None
+    return {relpath for relpath in relpaths if step.rule.applies_to(relpath)}
+
+
+def estimate(roots, plan, passes):
+    """What the legacy functions and the planned passes read, over all the roots"""
+    sizes = {}
+    for root in roots:
+        for relpath in files.discover(root):
+            try:
+                sizes[root, relpath] = os.stat(os.path.join(root, relpath)).st_size
+            except OSError:
+                continue
+    relpaths = {relpath for _root, relpath in sizes}
+    total_bytes = sum(sizes.values())
+    by_func = {}
+    for step in plan:
+        if step.is_move:
+            continue
+        unit = step.script, step.func
+        opened = _opened(step, relpaths)
+        if opened is None or by_func.get(unit, set()) is None:
+            by_func[unit] = None
+        else:
+            by_func[unit] = by_func.get(unit, set()) | opened
+    walks = sum(1 for opened in by_func.values() if opened is None)
+    legacy_files = legacy_bytes = 0
+    for opened in by_func.values():
+        if opened is None:
+            legacy_files += len(sizes)
+            legacy_bytes += total_bytes
+        else:
+            picked = [size for (_root, relpath), size in sizes.items() if relpath in opened]
+            legacy_files += len(picked)
+            legacy_bytes += sum(picked)
+    planned = sum(1 for rules, _moves in passes if rules)
+    return {
+        'scripts': len({step.script for step in plan}),
+        'functions': len({(step.script, step.func) for step in plan}),
+        'legacy_walks': walks,
+        'legacy_files': legacy_files,
+        'legacy_bytes': legacy_bytes,
+        'passes': len(passes),
+        'planned_files': planned * len(sizes),
+        'planned_bytes': planned * total_bytes,
+    }
+
+
+def describe(plan, passes, savings):
+    """The plan as a JSON-ready dict"""
+    out = []
+    for number, (rules, moves) in enumerate(passes):
+        members = [step for step in plan if step.pass_index == number and not step.dead]
+        out.append({
+            'pass': number + 1,
+            'rules': len(rules),
+            'moves': [f"{rule.pattern} -> {rule.replacement}" for rule in moves],
+            'functions': sorted({f"{step.script}.{step.func}" for step in members},
+                                key=[f"{s.script}.{s.func}" for s in plan].index),
+            'waits_for': [{'rule': step.rule.key, 'after': earlier.rule.key, 'reason': reason}
+                          for step in members for earlier, new_pass, reason in step.after
+                          if new_pass],
+        })
+    return {'passes': out, 'savings': savings,
+            'ordered_pairs': sum(len(step.after) for step in plan),
+            'dead': [{'rule': step.rule.key, 'paths': list(step.rule.paths)}
+                     for step in plan if step.dead]}
+
+
+def _size(count):
+    for unit in ('B', 'KB', 'MB'):
+        if count < 1024:
+            return f"{count:.0f}{unit}" if unit == 'B' else f"{count:.1f}{unit}"
+        count /= 1024
+    return f"{count:.1f}GB"
+
+
+def format_text(described):
+    out = []
+    for entry in described['passes']:
+        line = f"Pass {entry['pass']}: {entry['rules']} rules"
+        if entry['moves']:
+            line += f", then {len(entry['moves'])} moves"
+        out.append(line)
+        for func in entry['functions']:
+            out.append(f"    {func}")
+        for move in entry['moves']:
+            out.append(f"    move {move}")
+        for wait in entry['waits_for']:
+            out.append(f"    waits: {wait['rule']} {wait['reason']} ({wait['after']})")
+    for dead in described['dead']:
+        out.append(f"Left out: {dead['rule']}, its files are moved away before it runs "
+                   f"({', '.join(dead['paths'])})")
+    s = described['savings']
+    out.append(f"{described['ordered_pairs']} ordering constraints between "
+               f"{sum(e['rules'] + len(e['moves']) for e in described['passes'])} steps")
+    out.append(f"Legacy: {s['scripts']} scripts, {s['functions']} functions, "
+               f"{s['legacy_walks']} tree walks, {s['legacy_files']} file reads "
+               f"({_size(s['legacy_bytes'])})")
+    saved = s['legacy_bytes'] - s['planned_bytes']
+    share = f"{saved / s['legacy_bytes']:.0%}" if s['legacy_bytes'] else '0%'
+    passes = f"{s['passes']} pass" + ('' if s['passes'] == 1 else 'es')
+    out.append(f"Planned: {passes}, at most {s['planned_files']} file reads "
+               f"({_size(s['planned_bytes'])}); {_size(max(saved, 0))} less to read ({share})")
+    return '\n'.join(out)
+
+
+def main(roots, scripts=None, funcs=None, fmt='text', run=True, cache=None, jobs=1,
+         index=True):
+    """The pipeline command: prints the plan, then runs it pass by pass; returns the exit code"""
+    plan = link(steps(scripts, funcs))
+    passes = schedule(plan)
+    described = describe(plan, passes, estimate(roots, plan, passes))
+    if fmt == 'text':
+        print(format_text(described))
+    errors = 0
+    if run:
+        described['runs'] = []
+        started = time.perf_counter()
+        for number, (rules, moves) in enumerate(passes):
+            summary = engine.run(roots, rules, moves, cache, jobs=jobs, index=index,
+                                 telemetry=None if fmt == 'text' else _Quiet())
+            errors += summary['errors']
+            row = {'pass': number + 1, 'files': summary['files'], 'changed': summary['changed'],
+                   'moved': summary.get('renamed', 0), 'errors': summary['errors'],
+                   'seconds': round(summary['elapsed'], 4)}
+            described['runs'].append(row)
+            if fmt == 'text':
+                print(f"Pass {row['pass']}: {row['files']} files scanned, {row['changed']} "
+                      f"changed, {row['moved']} moved in {summary['elapsed']:.2f}s")
+        described['elapsed'] = round(time.perf_counter() - started, 4)
+    if fmt == 'json':
+        print(json.dumps({'version': 1, 'packages': [project.label(r) or '.' for r in roots],
+                          **described}, indent=2))
+    return 1 if errors else 0
+
+
+class _Quiet:
+    """Telemetry for a JSON run: the engine's per-file lines would garble stdout"""
+
+    on_rule = None
+
+    def start(self, total_files, total_bytes, **fields):
+        pass
+
+    def file_done(self, result, seconds=None):
+        pass
+
+    def log(self, message):
+        pass
+
+    def finish(self, **fields):
+        pass
@@ -0,0 +1,58 @@
+"""
+Locating Dart package roots (directories holding a pubspec.yaml)
+"""
+
+import os
+
+PUBSPEC = 'pubspec.yaml'
+SKIP_DIRS = {'.dart_tool', '.git', 'build', 'node_modules', '.symlinks', '.pub-cache'}
+
+
+def find_root(start=None, fallback=None):
+    """Nearest directory at or above `start` (default: cwd) with a pubspec.yaml
+
+    When nothing is found above `start`, the search is repeated from
+    `fallback` (the fix scripts pass their own directory).
+    """
+    for origin in (start or os.getcwd(), fallback):
+        if origin is None:
+            continue
+        current = os.path.abspath(origin)
+        while True:
+            if os.path.isfile(os.path.join(current, PUBSPEC)):
+                return current
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+    raise FileNotFoundError(f"No {PUBSPEC} found above {os.path.abspath(start or os.getcwd())}")
+
+
+def find_packages(directory):
+    """Every package root at or below `directory`, sorted"""
+    roots = []
+    for current, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith('.'))
+        if PUBSPEC in names:
+            roots.append(os.path.abspath(current))
+    return roots
+
+
+def resolve_roots(paths=(), search=()):
+    """Package roots from explicit paths (walking up) and search directories (walking down)"""
+    roots = []
+    for path in paths or ([] if search else [None]):
+        roots.append(find_root(path))
+    for directory in search:
+        roots.extend(find_packages(directory))
+    unique = []
+    for root in roots:
+        if root not in unique:
+            unique.append(root)
+    return unique
+
+
+def label(root):
+    """Short name for a package root in multi-package output"""
+    relative = os.path.relpath(root)
+    return root if relative.startswith('..') else relative
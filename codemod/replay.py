@@ -0,0 +1,238 @@
+"""
+Replaying the rules over a range of commits
+
+Each commit of the range is checked out into one of a few detached git
+worktrees, and the selected rules run over it without writing (like
+`apply --check --exhaustive`). Every worker owns one worktree and takes a
+contiguous stretch of the range, so moving from one commit to the next
+only touches the files that differ, and the worktrees are reused by later
+replays. All workers share the transform cache, so a blob seen at an
+earlier commit (or in an earlier replay) is never transformed again.
+
+The worktrees live in the cache directory, under worktrees/<repository>,
+keyed by the path of the repository's top level. Kept inside the checkout
+they would be picked up by tools that walk the tree (the analyzer, IDE
+indexers, `flutter pub get` in the workspace).
+
+The result is one row per commit: files, the files the rules would change,
+the edits they would make (runs of changed lines, so files served from the
+cache count too), the pending file moves, cache hits and time.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from codemod import arena, engine, project
+from codemod import rules as rule_table
+
+WORKTREE_DIR = 'worktrees'
+
+
+class ReplayError(Exception):
+    """The range or the repository cannot be replayed"""
+
+
+def git(cwd, *args):
+    """stdout of a git command, raising ReplayError when it fails"""
+    try:
+        done = subprocess.run(['git', *args], cwd=cwd, capture_output=True, text=True)
+    except OSError as e:
+        raise ReplayError(f"Cannot run git: {e}") from e
+    if done.returncode:
+        raise ReplayError(f"git {' '.join(args)} failed: {done.stderr.strip()}")
+    return done.stdout
+
+
+def commits(root, revisions):
+    """[(sha, subject)] of the range, oldest first; a single revision is a range of one"""
+    if '..' in revisions:
+        listed = git(root, 'rev-list', '--reverse', revisions).split()
+    else:
+        listed = [git(root, 'rev-parse', '--verify', f'{revisions}^{{commit}}').strip()]
+    rows = []
+    for sha in listed:
+        rows.append((sha, git(root, 'log', '-1', '--format=%s', sha).strip()))
+    return rows
+
+
+def worktree_base(top, cache_dir=None):
+    """Directory holding the replay worktrees of the repository whose top level is `top`"""
+    from codemod.cache import default_dir
+    top = os.path.realpath(top)
+    key = hashlib.sha1(top.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir or default_dir(), WORKTREE_DIR,
+                        f"{os.path.basename(top)}-{key}")
+
+
+def _registered(top):
+    """Real paths of the worktrees git knows for the repository at `top`"""
+    listed = git(top, 'worktree', 'list', '--porcelain')
+    return {os.path.realpath(line[len('worktree '):]) for line in listed.splitlines()
+            if line.startswith('worktree ')}
+
+
+def worktree(top, index, cache_dir=None, registered=None):
+    """Path of the index-th replay worktree, created on first use
+
+    A directory left from an earlier clone at the same path is not a
+    worktree of this repository any more; it is replaced.
+    """
+    path = os.path.join(worktree_base(top, cache_dir), f'wt{index}')
+    if registered is None:
+        registered = _registered(top)
+    if os.path.realpath(path) in registered and os.path.isdir(path):
+        return path
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    git(top, 'worktree', 'prune')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    git(top, 'worktree', 'add', '--detach', '--force', path, 'HEAD')
+    return path
+
+
+def remove_worktrees(top, cache_dir=None):
+    """Drop the replay worktrees; returns how many there were"""
+    base = worktree_base(top, cache_dir)
+    if not os.path.isdir(base):
+        return 0
+    removed = 0
+    for name in sorted(os.listdir(base)):
+        git(top, 'worktree', 'remove', '--force', os.path.join(base, name))
+        removed += 1
+    git(top, 'worktree', 'prune')
+    os.rmdir(base)
+    return removed
+
+
+class _Tally:
+    """Stands in for the run's Telemetry: keeps quiet and counts the edits of changed files"""
+
+    on_rule = None
+
+    def __init__(self, root):
+        self.root = root
+        self.edits = 0
+
+    def start(self, total_files, total_bytes, **fields):
+        pass
+
+    def file_done(self, result, seconds=None):
+        if result.changed and result.error is None:
+            with open(os.path.join(self.root, result.relpath), 'rb') as f:
+                self.edits += len(arena.edits(f.read(), result.output))
+
+    def log(self, message):
+        pass
+
+    def finish(self, **fields):
+        pass
+
+
+def _stretches(items, parts):
+    """`items` in at most `parts` contiguous runs of similar length"""
+    parts = max(1, min(parts, len(items)))
+    size, extra = divmod(len(items), parts)
+    out = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (i < extra)
+        out.append(items[start:end])
+        start = end
+    return out
+
+
+def replay_stretch(task):
+    """Rows for a run of commits, all checked out in turn into one worktree"""
+    path, prefix, shas, scripts, funcs, cache_dir = task
+    from codemod.cache import TransformCache
+    selected = rule_table.select(scripts, funcs)
+    renames = [rule for rule in rule_table.select_renames(scripts)
+               if not funcs or rule.func in funcs or f"{rule.script}.{rule.func}" in funcs]
+    cache = TransformCache(cache_dir)
+    rows = []
+    for sha in shas:
+        started = time.perf_counter()
+        git(path, 'checkout', '--detach', '--force', '--quiet', sha)
+        checkout = time.perf_counter() - started
+        package = os.path.join(path, prefix)
+        if not os.path.isdir(os.path.join(package, 'lib')):
+            rows.append({'commit': sha, 'missing': True, 'checkout': round(checkout, 4)})
+            continue
+        tally = _Tally(package)
+        summary = engine.run(package, selected, renames, cache, write=False, telemetry=tally)
+        rows.append({
+            'commit': sha,
+            'files': summary['files'],
+            'changed': summary['changed'],
+            'edits': tally.edits,
+            'moves': len(summary['pending']),
+            'cached': summary['cached'],
+            'errors': summary['errors'],
+            'checkout': round(checkout, 4),
+            'seconds': round(summary['elapsed'], 4),
+        })
+    return rows
+
+
+def run(root, revisions, scripts=None, funcs=None, jobs=1, cache_dir=None, keep=True):
+    """Replay the range; returns [row] in commit order, each with 'subject' added"""
+    root = os.path.abspath(root)
+    top = git(root, 'rev-parse', '--show-toplevel').strip()
+    prefix = os.path.relpath(root, top)
+    rows = commits(root, revisions)
+    if not rows:
+        raise ReplayError(f"No commits in {revisions}")
+    from codemod.cache import default_dir
+    cache_dir = cache_dir or default_dir()
+    stretches = _stretches([sha for sha, _subject in rows], jobs)
+    registered = _registered(top)
+    tasks = [(worktree(top, i, cache_dir, registered), prefix, shas, scripts, funcs, cache_dir)
+             for i, shas in enumerate(stretches)]
+    try:
+        if len(tasks) == 1:
+            results = [replay_stretch(tasks[0])]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(len(tasks)) as pool:
+                results = list(pool.map(replay_stretch, tasks))
+    finally:
+        if not keep:
+            remove_worktrees(top, cache_dir)
+    subjects = dict(rows)
+    replayed = [row for stretch in results for row in stretch]
+    for row in replayed:
+        row['subject'] = subjects[row['commit']]
+    return replayed
+
+
+def format_text(rows, elapsed):
+    out = [f"{'commit':<10} {'files':>6} {'changed':>7} {'edits':>6} {'moves':>5} "
+           f"{'cached':>6} {'seconds':>8}  subject"]
+    for row in rows:
+        if row.get('missing'):
+            out.append(f"{row['commit'][:10]:<10} {'(no package at this commit)':>44}  "
+                       f"{row['subject']}")
+            continue
+        out.append(f"{row['commit'][:10]:<10} {row['files']:>6} {row['changed']:>7} "
+                   f"{row['edits']:>6} {row['moves']:>5} {row['cached']:>6} "
+                   f"{row['seconds']:>8.3f}  {row['subject']}")
+    out.append(f"{len(rows)} commits replayed in {elapsed:.2f}s")
+    return '\n'.join(out)
+
+
+def main(root, revisions, scripts=None, funcs=None, jobs=1, fmt='text', cache_dir=None,
+         keep=True):
+    """The replay command: prints the table; returns the exit code"""
+    started = time.perf_counter()
+    rows = run(root, revisions, scripts, funcs, jobs, cache_dir, keep)
+    elapsed = time.perf_counter() - started
+    if fmt == 'json':
+        print(json.dumps({'version': 1, 'package': project.label(root) or '.',
+                          'commits': rows, 'elapsed': round(elapsed, 4)}, indent=2))
+    else:
+        print(format_text(rows, elapsed))
+    return 0
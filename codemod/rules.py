@@ -0,0 +1,721 @@
+"""
+Shared rule table for the Dart fix scripts
+
+Every rewrite performed by the fix_*.py scripts is listed here once, tagged
+with the script and function it comes from, so the codemod tools can count,
+apply and compare them without walking the tree once per script.
+
+This table is the authoritative copy: the scripts read their patterns,
+file lists and moves from it (see pairs() and paths()) instead of spelling
+them out, so a rewrite is changed here and both sides follow.
+
+Rules marked pinned=True are known to depend on the rules around them (a
+catch-all that must see the specific rules' output, or a pair where one
+rewrites the text the other reads): adaptive ordering never moves them
+past another rule or defers them (see codemod.ordering).
+"""
+
+import hashlib
+import re
+
+from codemod.patterns import anchor, required_literals, splittable
+from codemod.scopes import Scope
+from codemod.text import anchored_matches, replace_in_live_lines, replace_literal
+
+_UNSET = object()
+_GROUP_REF = re.compile(r'\\(?:\d+|g<[^>]*>)')
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+
+
+class Rule:
+    """A regex rewrite lifted from one of the fix scripts"""
+
+    kind = 'regex'
+
+    def __init__(self, func, name, pattern, replacement, message, flags=0, paths=None,
+                 pinned=False):
+        self.script = None
+        self.func = func
+        self.name = name
+        self.pattern = pattern
+        self.replacement = replacement
+        self.message = message
+        self.flags = flags
+        self.paths = tuple(paths) if paths else None
+        self.pinned = pinned
+        self._regex = None
+        self._needles = None
+        self._anchor = _UNSET
+        self._splittable = None
+        self._scope = None
+        self._key = None
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.key}>"
+
+    def __getstate__(self):
+        # compiled state is rebuilt lazily on the other side of a pickle
+        state = self.__dict__.copy()
+        state.update(_regex=None, _needles=None, _anchor=_UNSET, _scope=None)
+        return state
+
+    def compile(self):
+        """Build the regex, needles and anchor up front (worker warm-up)"""
+        self.needles
+        if self.kind == 'regex':
+            self.regex
+            if self._anchor is _UNSET:
+                self._anchor = anchor(self.pattern, self.flags)
+        return self
+
+    @property
+    def key(self):
+        """Stable identifier, unique across the whole table"""
+        if self._key is None:
+            spec = repr((self.kind, self.script, self.func, self.name, self.pattern,
+                         self.replacement, self.flags, self.paths))
+            digest = hashlib.sha1(spec.encode('utf-8')).hexdigest()[:8]
+            self._key = f"{self.script}.{self.name}.{digest}"
+        return self._key
+
+    @property
+    def regex(self):
+        if self._regex is None:
+            self._regex = re.compile(self.pattern, self.flags)
+        return self._regex
+
+    @property
+    def needles(self):
+        """Literals that must all be present in a file for the rule to match"""
+        if self._needles is None:
+            self._needles = tuple(required_literals(self.pattern, self.flags))
+        return self._needles
+
+    @property
+    def written(self):
+        """Literal text the replacement inserts, with group references taken out"""
+        pieces = []
+        for piece in _GROUP_REF.split(self.replacement):
+            piece = re.sub(r'\\(.)', lambda m: _ESCAPES.get(m.group(1), m.group(1)), piece)
+            if piece:
+                pieces.append(piece)
+        return tuple(pieces)
+
+    @property
+    def splittable(self):
+        """True if the rule edits a text cut after line-ending `}`s the same as the whole"""
+        if self._splittable is None:
+            self._splittable = splittable(self.pattern, self.flags)
+        return self._splittable
+
+    def applies_to(self, relpath):
+        """True if relpath is in the rule's scope (explicit paths and globs, see codemod.scopes)"""
+        if self.paths is None:
+            return True
+        if self._scope is None:
+            self._scope = Scope(self.paths)
+        return relpath in self._scope
+
+    def may_match(self, text):
+        for needle in self.needles:
+            if needle not in text:
+                return False
+        return True
+
+    def matches(self, text):
+        """Same matches as regex.finditer, but only tried next to the anchor literal
+
+        A leading `\\w*`-style group otherwise makes the regex engine retry
+        at every character of every identifier in the file.
+        """
+        if self._anchor is _UNSET:
+            self._anchor = anchor(self.pattern, self.flags)
+        if self._anchor is None:
+            return self.regex.finditer(text)
+        literal, prefix_class = self._anchor
+        return anchored_matches(self.regex, literal, prefix_class, text)
+
+    def edits(self, text):
+        """Yield (start, end, new_text) for every match whose rewrite would change the text"""
+        for match in self.matches(text):
+            new_text = match.expand(self.replacement)
+            if new_text != match.group(0):
+                yield match.start(), match.end(), new_text
+
+    def finditer(self, text):
+        """Yield (start, end) of every match whose rewrite would change the text"""
+        for start, end, _new_text in self.edits(text):
+            yield start, end
+
+    def apply(self, text):
+        """Return (new_text, number_of_substitutions)"""
+        if self._anchor is None:
+            return self.regex.subn(self.replacement, text)
+        parts = []
+        last = 0
+        count = 0
+        for match in self.matches(text):
+            parts.append(text[last:match.start()])
+            parts.append(match.expand(self.replacement))
+            last = match.end()
+            count += 1
+        if not count:
+            return text, 0
+        parts.append(text[last:])
+        return ''.join(parts), count
+
+
+class LiteralRule(Rule):
+    """A plain str.replace rewrite"""
+
+    kind = 'literal'
+
+    @property
+    def needles(self):
+        return (self.pattern,)
+
+    @property
+    def written(self):
+        return (self.replacement,) if self.replacement else ()
+
+    @property
+    def splittable(self):
+        return bool(self.pattern) and '}\n' not in self.pattern and self.pattern[0] != '\n'
+
+    def edits(self, text):
+        for start, end in self.finditer(text):
+            yield start, end, self.replacement
+
+    def finditer(self, text):
+        if self.pattern == self.replacement:
+            return
+        start = text.find(self.pattern)
+        while start != -1:
+            end = start + len(self.pattern)
+            yield start, end
+            start = text.find(self.pattern, end)
+
+    def apply(self, text):
+        return replace_literal(text, self.pattern, self.replacement)
+
+
+class LineRule(Rule):
+    """A str.replace applied only to lines that are not already comments"""
+
+    kind = 'line'
+    written = LiteralRule.written
+    edits = LiteralRule.edits
+
+    def __init__(self, func, name, pattern, replacement, message, comment='//', paths=None,
+                 pinned=False):
+        super().__init__(func, name, pattern, replacement, message, paths=paths, pinned=pinned)
+        self.comment = comment
+
+    @property
+    def splittable(self):
+        # works line by line
+        return True
+
+    @property
+    def needles(self):
+        return (self.pattern,)
+
+    def _live(self, line):
+        return self.pattern in line and not line.strip().startswith(self.comment)
+
+    def finditer(self, text):
+        offset = 0
+        for line in text.split('\n'):
+            if self._live(line):
+                start = line.find(self.pattern)
+                while start != -1:
+                    yield offset + start, offset + start + len(self.pattern)
+                    start = line.find(self.pattern, start + len(self.pattern))
+            offset += len(line) + 1
+
+    def apply(self, text):
+        return replace_in_live_lines(text, self.pattern, self.replacement, self.comment)
+
+
+class RenameRule(Rule):
+    """A file move; `pattern` and `replacement` are root-relative paths"""
+
+    kind = 'rename'
+    edits = LiteralRule.edits
+
+    def __init__(self, func, old, new):
+        super().__init__(func, 'file_names', old, new,
+                         f"The file name '{old.rsplit('/', 1)[-1]}' isn't a "
+                         f"lower_case_with_underscores identifier", paths=[old])
+
+    @property
+    def needles(self):
+        return ()
+
+    def finditer(self, text):
+        return iter(())
+
+    def apply(self, text):
+        return text, 0
+
+
+def _unused_imports(func, entries, quotes="'"):
+    """One literal rule per (file, import) entry and quote style"""
+    rules = []
+    for path, uri in entries:
+        for quote in quotes:
+            rules.append(LiteralRule(
+                func, 'unused_import', f"import {quote}{uri}{quote};\n", '',
+                f"Unused import: '{uri}'", paths=[path]))
+    return rules
+
+
+def _literals(func, name, pairs, message, paths=None):
+    return [LiteralRule(func, name, old, new, message.format(old=old, new=new), paths=paths)
+            for old, new in pairs]
+
+
+FINAL_CLEANUP = [
+    Rule('fix_remaining_issues', 'use_super_parameters',
+         r'(\w+)\(\s*{([^}]*this\.key[^}]*)}\s*\)\s*:\s*super\(\)', r'\1({super.key}) : super()',
+         "Parameter 'key' could be a super parameter"),
+    Rule('fix_remaining_issues', 'prefer_const_constructors',
+         r'return\s+([A-Z]\w*)\(\[\]\)', r'return const \1([])',
+         "Use 'const' with the constructor to improve performance"),
+    Rule('fix_remaining_issues', 'prefer_const_constructors',
+         r'emit\(\s*([A-Z]\w*)\(\[\]\)\s*\)', r'emit(const \1([]))',
+         "Use 'const' with the constructor to improve performance"),
+    Rule('fix_remaining_issues', 'prefer_const_declarations',
+         r'final\s+([a-zA-Z_]\w*)\s*=\s*(\[.*?\])\s*;', r'const \1 = \2;',
+         "Use 'const' for final variables initialized to a constant value"),
+    Rule('fix_remaining_issues', 'deprecated_member_use',
+         r'\.withOpacity\(([^)]+)\)', r'.withValues(alpha: \1)',
+         "'withOpacity' is deprecated, use '.withValues()'"),
+    Rule('fix_remaining_issues', 'unnecessary_null_checks',
+         r'([a-zA-Z_]\w*)\s*!=\s*null\s*\?\s*\1\s*:\s*null', r'\1',
+         "Unnecessary null check"),
+    Rule('fix_remaining_issues', 'always_specify_types',
+         r'var\s+([a-zA-Z_]\w*)\s*;', r'dynamic \1;',
+         "Missing type annotation"),
+    Rule('fix_remaining_issues', 'empty_constructor_bodies',
+         r'(\w+)\(\)\s*{\s*}', r'\1();',
+         "Empty constructor bodies should be written using a ';' rather than '{}'"),
+    Rule('fix_remaining_issues', 'prefer_is_not_empty',
+         r'\.length\s*>\s*0', '.isNotEmpty',
+         "Use 'isNotEmpty' instead of 'length' to test whether the collection is empty"),
+    Rule('fix_remaining_issues', 'prefer_is_empty',
+         r'\.length\s*==\s*0', '.isEmpty',
+         "Use 'isEmpty' instead of 'length' to test whether the collection is empty"),
+    Rule('fix_remaining_issues', 'avoid_function_literals_in_foreach_calls',
+         r'\.forEach\(\(([^)]+)\)\s*=>\s*([^;]+)\)', r'.map((\1) => \2).toList()',
+         "Function literals shouldn't be passed to 'forEach'"),
+    Rule('fix_remaining_issues', 'library_private_types_in_public_api',
+         r'_([A-Z]\w*State)', r'\1State',
+         "Invalid use of a private type in a public API"),
+    LiteralRule('fix_specific_files', 'must_be_immutable',
+                '@immutable', '// @immutable - Removed due to mutable fields',
+                "This class is marked '@immutable' but has mutable fields",
+                paths=['lib/core/blocs/settings_cubit/cubit/settings_state.dart']),
+    Rule('fix_specific_files', 'override_on_non_overriding_member',
+         r'@override\s+void\s+dispose\(\)\s*{', 'void dispose() {',
+         "The method doesn't override an inherited method",
+         paths=['lib/features/lyrics/enhanced_lyrics_widget.dart']),
+]
+
+# Script name -> (file, import URI) pairs its fix_unused_imports removes
+UNUSED_IMPORTS = {
+    'fix_all_issues': [
+        ('lib/features/player/screens/widgets/song_tile.dart', 'package:audio_service/audio_service.dart'),
+        ('lib/features/player/screens/screen/library_views/more_opts_sheet.dart', 'package:elythra_music/core/model/media_playlist_model.dart'),
+        ('lib/features/lyrics/services/enhanced_lyrics_service.dart', 'package:http/http.dart'),
+    ],
+    'targeted_fixes': [
+        ('lib/core/utils/pallete_generator.dart', 'package:cached_network_image/cached_network_image.dart'),
+        ('lib/features/auth/services/enhanced_auth_service.dart', 'package:crypto/crypto.dart'),
+        ('lib/features/auth/webview_auth_service.dart', 'package:flutter/foundation.dart'),
+        ('lib/features/lyrics/services/enhanced_lyrics_service.dart', 'package:http/http.dart'),
+        ('lib/features/lyrics/services/enhanced_lyrics_service.dart', 'package:elythra_music/features/lyrics/repository/lyrics.dart'),
+        ('lib/features/music_intelligence/recommendation_engine.dart', 'dart:math'),
+        ('lib/features/performance/performance_optimizer.dart', 'dart:isolate'),
+        ('lib/features/player/screens/screen/home_views/youtube_views/playlist.dart', 'package:elythra_music/core/model/MediaPlaylistModel.dart'),
+        ('lib/features/player/screens/screen/library_views/more_opts_sheet.dart', 'package:elythra_music/core/model/MediaPlaylistModel.dart'),
+        ('lib/features/player/screens/screen/library_views/playlist_screen.dart', 'package:elythra_music/core/model/MediaPlaylistModel.dart'),
+        ('lib/features/player/screens/screen/library_views/playlist_screen.dart', 'package:flutter/foundation.dart'),
+        ('lib/features/player/screens/screen/offline_screen.dart', 'package:elythra_music/core/model/MediaPlaylistModel.dart'),
+        ('lib/features/player/screens/screen/player_screen.dart', 'dart:ui'),
+        ('lib/features/player/screens/screen/player_screen.dart', 'package:elythra_music/core/services/bloomeePlayer.dart'),
+        ('lib/features/player/screens/widgets/createPlaylist_bottomsheet.dart', 'package:flutter/cupertino.dart'),
+        ('lib/features/player/screens/widgets/song_tile.dart', 'package:audio_service/audio_service.dart'),
+        ('lib/features/player/services/enhanced_audio_service.dart', 'package:audio_service/audio_service.dart'),
+        ('lib/features/player/services/enhanced_audio_service.dart', 'package:elythra_music/core/repository/Saavn/saavn_api.dart'),
+        ('lib/features/player/services/enhanced_audio_service.dart', 'package:elythra_music/core/repository/Youtube/ytm/ytmusic.dart'),
+        ('lib/features/settings/enhanced_settings_screen.dart', 'package:flutter_bloc/flutter_bloc.dart'),
+        ('lib/features/social/social_features_service.dart', 'package:url_launcher/url_launcher.dart'),
+        ('lib/main.dart', 'package:elythra_music/features/harmony_integration/enhanced_stream_service.dart'),
+    ],
+}
+
+SHARE_FILES = [
+    'lib/features/player/screens/screen/home_views/youtube_views/playlist.dart',
+    'lib/features/player/screens/screen/library_views/more_opts_sheet.dart',
+    'lib/features/player/screens/widgets/more_bottom_sheet.dart',
+]
+
+FIX_ALL_ISSUES = [
+    LiteralRule('fix_cardtheme_errors', 'argument_type_not_assignable',
+                'CardTheme(', 'CardThemeData(',
+                "'CardTheme' can't be assigned to 'CardThemeData?'",
+                paths=['lib/features/player/theme_data/default.dart']),
+    *_unused_imports('fix_unused_imports', UNUSED_IMPORTS['fix_all_issues']),
+    *_literals('fix_deprecated_share', 'deprecated_member_use', [
+        ('Share.share(', 'SharePlus.share('),
+        ('Share.shareXFiles(', 'SharePlus.shareXFiles('),
+        ("'Share'", "'SharePlus'"),
+        ('"Share"', '"SharePlus"'),
+    ], "'{old}' is deprecated, use '{new}'", paths=SHARE_FILES),
+    *_literals('fix_deprecated_apis', 'deprecated_member_use', [
+        ('onPopInvoked:', 'onPopInvokedWithResult:'),
+        ('ButtonBar(', 'OverflowBar('),
+        ('tolerance:', 'toleranceFor:'),
+    ], "'{old}' is deprecated, use '{new}'"),
+    # rewrites every `.value`, including the ones earlier rules just wrote
+    LiteralRule('fix_deprecated_apis', 'deprecated_member_use', '.value', '.toARGB32',
+                "'.value' is deprecated, use '.toARGB32'", pinned=True),
+    *_literals('fix_deprecated_apis', 'deprecated_member_use', [
+        ('surfaceVariant', 'surfaceContainerHighest'),
+    ], "'{old}' is deprecated, use '{new}'"),
+    *[Rule('fix_variable_naming', 'non_constant_identifier_names',
+           rf'\b{re.escape(old)}\b', new,
+           f"The variable name '{old}' isn't a lowerCamelCase identifier")
+      for old, new in [
+          ('last_YTM_search', 'lastYtmSearch'),
+          ('last_YTV_search', 'lastYtvSearch'),
+          ('last_JIS_search', 'lastJisSearch'),
+          ('MediaItem2MediaItemDB', 'mediaItemToMediaItemDB'),
+          ('MediaItemDB2MediaItem', 'mediaItemDBToMediaItem'),
+          ('old_idx', 'oldIdx'),
+          ('new_idx', 'newIdx'),
+          ('launch_Url', 'launchUrl'),
+          ('ElythraDBCubit', 'elythraDBCubit'),
+          ('ANDROID_CONTEXT', 'androidContext'),
+          ('IOS_CONTEXT', 'iosContext'),
+      ]],
+    *[Rule('fix_constant_naming', name, pattern, replacement, message)
+      for name, pattern, replacement, message in [
+          ('constant_identifier_names', r'const String eng_JIS', 'const String engJis',
+           "The constant name 'eng_JIS' isn't a lowerCamelCase identifier"),
+          ('constant_identifier_names', r'const String eng_YTM', 'const String engYtm',
+           "The constant name 'eng_YTM' isn't a lowerCamelCase identifier"),
+          ('constant_identifier_names', r'const String eng_YTV', 'const String engYtv',
+           "The constant name 'eng_YTV' isn't a lowerCamelCase identifier"),
+          ('constant_identifier_names', r'const String ImportMediaFromPlatforms',
+           'const String importMediaFromPlatforms',
+           "The constant name 'ImportMediaFromPlatforms' isn't a lowerCamelCase identifier"),
+          ('constant_identifier_names', r'const String ChartScreen', 'const String chartScreen',
+           "The constant name 'ChartScreen' isn't a lowerCamelCase identifier"),
+          ('camel_case_types', r'class Default_Theme', 'class DefaultTheme',
+           "The type name 'Default_Theme' isn't an UpperCamelCase identifier"),
+      ]],
+    # the second rewrites `this.key` inside the braces the first one matches
+    Rule('fix_super_parameters', 'use_super_parameters',
+         r'({[^}]*key[^}]*})\s*:\s*super\(\)', r'({super.key}) : super()',
+         "Parameter 'key' could be a super parameter", pinned=True),
+    Rule('fix_super_parameters', 'use_super_parameters',
+         r'this\.key\s*,', 'super.key,',
+         "Parameter 'key' could be a super parameter", pinned=True),
+    Rule('fix_empty_catches', 'empty_catches',
+         r'catch\s*\([^)]*\)\s*{\s*}', r'catch (e) {\n    // Ignore error\n  }',
+         "Empty catch block"),
+    Rule('fix_const_constructors', 'prefer_const_constructors',
+         r'return ([A-Z][a-zA-Z]*)\(\[\]\)', r'return const \1([])',
+         "Use 'const' with the constructor to improve performance"),
+    Rule('fix_const_constructors', 'prefer_const_constructors',
+         r'emit\(([A-Z][a-zA-Z]*)\(\[\]\)', r'emit(const \1([]))',
+         "Use 'const' with the constructor to improve performance"),
+    Rule('fix_override_annotations', 'annotate_overrides',
+         r'(\s+)(final\s+[A-Za-z]+\s+resultType)', r'\1@override\n\1\2',
+         "The member 'resultType' overrides an inherited member but isn't annotated with '@override'"),
+    Rule('fix_override_annotations', 'annotate_overrides',
+         r'(\s+)(bool\s+showLyrics)', r'\1@override\n\1\2',
+         "The member 'showLyrics' overrides an inherited member but isn't annotated with '@override'"),
+    Rule('fix_unreachable_code', 'unreachable_switch_default',
+         r'default:\s*break;\s*}', '}',
+         "This default clause is covered by the previous cases"),
+    Rule('fix_unreachable_code', 'unreachable_switch_default',
+         r'default:\s*// unreachable\s*}', '}',
+         "This default clause is covered by the previous cases"),
+    Rule('fix_unused_variables', 'unused_local_variable',
+         r'final\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([^;]+);(\s*//.*unused.*)',
+         r'// final \1 = \2; // Unused variable',
+         "The value of the local variable isn't used"),
+    Rule('fix_unused_variables', 'unused_local_variable',
+         r'var\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([^;]+);(\s*//.*unused.*)',
+         r'// var \1 = \2; // Unused variable',
+         "The value of the local variable isn't used"),
+    Rule('fix_string_interpolation', 'unnecessary_brace_in_string_interps',
+         r'\$\{([a-zA-Z_][a-zA-Z0-9_]*)\}', r'$\1',
+         "Unnecessary braces in a string interpolation"),
+    # both match around the same `??`
+    Rule('fix_null_aware_operators', 'invalid_null_aware_operator',
+         r'([a-zA-Z_][a-zA-Z0-9_]*)\?\.\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\?\?', r'\1.\2 ??',
+         "The receiver can't be null, so the null-aware operator '?.' is unnecessary",
+         pinned=True),
+    Rule('fix_null_aware_operators', 'invalid_null_aware_operator',
+         r'([a-zA-Z_][a-zA-Z0-9_]*)\s*\?\?\s*([a-zA-Z_][a-zA-Z0-9_]*)', r'\1 ?? \2',
+         "The left operand can't be null, so the right operand is never executed",
+         pinned=True),
+    Rule('fix_type_annotations', 'always_specify_types',
+         r'var\s+([a-zA-Z_][a-zA-Z0-9_]*);', r'dynamic \1;',
+         "Missing type annotation"),
+    Rule('fix_type_annotations', 'always_specify_types',
+         r'final\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*<String>\[\];', r'final List<String> \1 = <String>[];',
+         "Missing type annotation"),
+    Rule('fix_build_context_usage', 'use_build_context_synchronously',
+         r'(await\s+[^;]+;\s*)(Navigator\.[^(]+\(context)', r'\1if (mounted) \2',
+         "Don't use 'BuildContext's across async gaps"),
+    Rule('fix_build_context_usage', 'use_build_context_synchronously',
+         r'(await\s+[^;]+;\s*)(ScaffoldMessenger\.[^(]+\(context)', r'\1if (mounted) \2',
+         "Don't use 'BuildContext's across async gaps"),
+]
+
+TARGETED_FIXES = [
+    *_unused_imports('fix_unused_imports', UNUSED_IMPORTS['targeted_fixes'], quotes='\'"'),
+    Rule('fix_deprecated_withopacity', 'deprecated_member_use',
+         r'\.withOpacity\(([0-9.]+)\)', r'.withValues(alpha: \1)',
+         "'withOpacity' is deprecated, use '.withValues()'"),
+    LineRule('fix_print_statements', 'avoid_print', 'print(', '// print(',
+             "Don't invoke 'print' in production code"),
+    *_literals('fix_deprecated_share', 'deprecated_member_use', [
+        ('Share.share(', 'SharePlus.share('),
+        ('Share.shareXFiles(', 'SharePlus.shareXFiles('),
+    ], "'{old}' is deprecated, use '{new}'", paths=SHARE_FILES),
+    LiteralRule('fix_deprecated_button_bar', 'deprecated_member_use',
+                'ButtonBar(', 'OverflowBar(', "'ButtonBar' is deprecated, use 'OverflowBar'",
+                paths=['lib/features/player/screens/screen/library_views/playlist_screen.dart']),
+]
+
+FIX_IMPORTS_FINAL = [
+    *_literals('fix_all_imports', 'uri_does_not_exist', [
+        ('load_Image.dart', 'load_image.dart'),
+        ('GlobalDB.dart', 'global_db.dart'),
+        ('GlobalDB.g.dart', 'global_db.g.dart'),
+        ('bloomeeUpdaterTools.dart', 'bloomee_updater_tools.dart'),
+        ('createPlaylist_bottomsheet.dart', 'create_playlist_bottomsheet.dart'),
+        ('playPause_widget.dart', 'play_pause_widget.dart'),
+        ('tabList_widget.dart', 'tab_list_widget.dart'),
+        ('bloomeePlayer.dart', 'bloomee_player.dart'),
+    ], "Target of URI doesn't exist: '{old}' was renamed to '{new}'"),
+    LiteralRule('fix_all_imports', 'undefined_identifier', 'Default_Theme', 'DefaultTheme',
+                "Undefined name 'Default_Theme'"),
+    LiteralRule('fix_all_imports', 'undefined_identifier', 'LoadImage', 'LoadImage',
+                "Undefined name 'LoadImage'"),
+]
+
+ALIAS_FILES = [
+    'lib/features/player/screens/screen/explore_screen.dart',
+    'lib/features/player/screens/screen/library_views/more_opts_sheet.dart',
+]
+
+FIX_COMPILATION_ERRORS = [
+    LiteralRule('fix_import_conflicts', 'ambiguous_import',
+                "import 'package:audio_service/audio_service.dart';",
+                "import 'package:audio_service/audio_service.dart' as audio_service;",
+                "The name 'MediaItem' is defined in multiple libraries",
+                paths=['lib/core/blocs/mini_player/mini_player_bloc.dart',
+                       'lib/features/player/screens/widgets/song_tile.dart',
+                       *ALIAS_FILES]),
+    LiteralRule('fix_mediaplaylist_conflicts', 'ambiguous_import',
+                "import 'package:elythra_music/core/model/MediaPlaylistModel.dart';",
+                "import 'package:elythra_music/core/model/MediaPlaylistModel.dart' as core_playlist;",
+                "The name 'MediaPlaylist' is defined in multiple libraries",
+                paths=ALIAS_FILES),
+    Rule('fix_mediaplaylist_conflicts', 'ambiguous_import',
+         r'\bMediaPlaylist\(', 'core_playlist.MediaPlaylist(',
+         "The name 'MediaPlaylist' is defined in multiple libraries",
+         paths=ALIAS_FILES),
+    Rule('fix_method_signatures', 'undefined_method',
+         r'\.loadPlaylist\(\s*MediaPlaylist\([^)]+\),\s*doPlay:\s*true,?\s*\)',
+         '.updateQueue(mediaitems, doPlay: true, idx: 0)',
+         "The method 'loadPlaylist' isn't defined, use 'updateQueue'"),
+    Rule('fix_method_signatures', 'undefined_method',
+         r'\.loadPlaylist\(\s*MediaPlaylist\([^)]+\),\s*idx:\s*(\w+),\s*doPlay:\s*true\)',
+         r'.updateQueue(mediaitems, idx: \1, doPlay: true)',
+         "The method 'loadPlaylist' isn't defined, use 'updateQueue'"),
+    Rule('fix_method_signatures', 'extra_positional_arguments',
+         r'\.updateQueue\([^)]+\),\s*doPlay:\s*true\)',
+         '.updateQueue(mediaitems, doPlay: true, idx: 0)',
+         "Too many positional arguments to 'updateQueue'"),
+    Rule('fix_type_conversions', 'argument_type_not_assignable',
+         r'\.addQueueItem\((\w+)\)', r'.addQueueItem(MediaItem.fromMediaItemModel(\1))',
+         "The argument type 'MediaItemModel' can't be assigned to 'MediaItem'"),
+    Rule('fix_type_conversions', 'undefined_getter',
+         r'\.queueTitle\.value', '.queueTitle',
+         "The getter 'value' isn't defined for 'queueTitle'"),
+]
+
+# The catch-all `.toARGB32` rules must see the text left by the specific ones
+FIX_TOARGB32_ERRORS = [
+    *[Rule('fix_compilation_errors', name, pattern, replacement, message,
+           pinned=pattern.startswith((r'(\w+)', r'\.toARGB32')))
+      for name, pattern, replacement, message in [
+          ('undefined_enum_constant', r'SourceEngine\.toARGB32s', 'SourceEngine.values',
+           "There's no constant named 'toARGB32s' in 'SourceEngine'"),
+          ('undefined_method', r'SourceEngine\(\w+\)\.toARGB32', 'SourceEngine.value',
+           "The getter 'toARGB32' isn't defined for 'SourceEngine'"),
+          ('undefined_getter', r'(\w+)\.toARGB32s(?=\s*[,\)\]\s;])', r'\1.values',
+           "The getter 'toARGB32s' isn't defined, use 'values'"),
+          ('undefined_enum_constant', r'AudioQuality\.toARGB32s', 'AudioQuality.values',
+           "There's no constant named 'toARGB32s' in 'AudioQuality'"),
+          ('undefined_enum_constant', r'StreamingMode\.toARGB32s', 'StreamingMode.values',
+           "There's no constant named 'toARGB32s' in 'StreamingMode'"),
+          ('undefined_enum_constant', r'ResultTypes\.toARGB32s', 'ResultTypes.values',
+           "There's no constant named 'toARGB32s' in 'ResultTypes'"),
+          ('undefined_enum_constant', r'ContentType\.toARGB32s', 'ContentType.values',
+           "There's no constant named 'toARGB32s' in 'ContentType'"),
+          ('undefined_enum_constant', r'ShareMethod\.toARGB32s', 'ShareMethod.values',
+           "There's no constant named 'toARGB32s' in 'ShareMethod'"),
+          ('undefined_getter', r'loopMode\.toARGB32', 'loopMode.value',
+           "The getter 'toARGB32' isn't defined for 'loopMode'"),
+          ('undefined_getter', r'queue\.toARGB32', 'queue.value',
+           "The getter 'toARGB32' isn't defined for 'queue'"),
+          ('undefined_getter', r'relatedSongs\.toARGB32', 'relatedSongs.value',
+           "The getter 'toARGB32' isn't defined for 'relatedSongs'"),
+          ('undefined_method', r'Future\.toARGB32', 'Future.value',
+           "The method 'toARGB32' isn't defined for 'Future'"),
+          ('undefined_setter', r'\.toARGB32\s*=', '.value =',
+           "The setter 'toARGB32' isn't defined"),
+          ('undefined_getter', r'(\w+)\.toARGB32(?=\s*[,\)\]\s;])', r'\1.value',
+           "The getter 'toARGB32' isn't defined, use 'value'"),
+          ('undefined_function', r'CardThemeData\(', 'CardTheme(',
+           "The function 'CardThemeData' isn't defined"),
+          ('undefined_method', r'\.withValues\(', '.withOpacity(',
+           "The method 'withValues' isn't defined"),
+          ('undefined_named_parameter', r'toleranceFor:', 'tolerance:',
+           "The named parameter 'toleranceFor' isn't defined"),
+          ('undefined_identifier', r'contentId_', 'contentId',
+           "Undefined name 'contentId_'"),
+          ('undefined_method', r'Share\.shareXFiles', 'Share.shareXFiles',
+           "The method 'shareXFiles' isn't defined for 'Share'"),
+      ]],
+]
+
+BILLBOARD_CONSTANTS = [
+    ('HOT_100', 'hot100'),
+    ('BILLBOARD_200', 'billboard200'),
+    ('SOCIAL_50', 'social50'),
+    ('STREAMING_SONGS', 'streamingSongs'),
+    ('DIGITAL_SONG_SALES', 'digitalSongSales'),
+    ('RADIO_SONGS', 'radioSongs'),
+    ('TOP_ALBUM_SALES', 'topAlbumSales'),
+    ('CURRENT_ALBUMS', 'currentAlbums'),
+    ('INDEPENDENT_ALBUMS', 'independentAlbums'),
+    ('CATALOG_ALBUMS', 'catalogAlbums'),
+    ('SOUNDTRACKS', 'soundtracks'),
+    ('VINYL_ALBUMS', 'vinylAlbums'),
+    ('HEATSEEKERS_ALBUMS', 'heatseekersAlbums'),
+    ('WORLD_ALBUMS', 'worldAlbums'),
+    ('CANADIAN_HOT_100', 'canadianHot100'),
+    ('JAPAN_HOT_100', 'japanHot100'),
+    ('KOREA_100', 'korea100'),
+    ('INDIA_SONGS', 'indiaSongs'),
+    ('BILLBOARD_GLOBAL_200', 'billboardGlobal200'),
+]
+
+THEME_FILES = [
+    'lib/core/theme_data/default.dart',
+    'lib/features/player/theme_data/default.dart',
+]
+
+FIX_ANALYSIS_ISSUES = [
+    *_literals('fix_constant_naming', 'constant_identifier_names',
+               [(f'const String {old}', f'const String {new}') for old, new in BILLBOARD_CONSTANTS]
+               + [(f'String {old} =', f'String {new} =') for old, new in BILLBOARD_CONSTANTS],
+               "The constant name in '{old}' isn't a lowerCamelCase identifier",
+               paths=['lib/plugins/ext_charts/billboard_charts.dart']),
+    *_literals('fix_variable_naming', 'non_constant_identifier_names', [
+        ('MediaItem2MediaItemDB', 'mediaItem2MediaItemDB'),
+        ('MediaItemDB2MediaItem', 'mediaItemDB2MediaItem'),
+    ], "The function name '{old}' isn't a lowerCamelCase identifier",
+        paths=['lib/core/model/song_model.dart']),
+    *_literals('fix_class_naming', 'camel_case_types', [
+        ('class Default_Theme', 'class DefaultTheme'),
+        ('Default_Theme()', 'DefaultTheme()'),
+    ], "The type name 'Default_Theme' isn't an UpperCamelCase identifier", paths=THEME_FILES),
+]
+
+FIX_ENUM_REFERENCES = _literals('fix_enum_references', 'undefined_enum_constant', [
+    ('SourceEngine.eng_JIS', 'SourceEngine.engJis'),
+    ('SourceEngine.eng_YTM', 'SourceEngine.engYtm'),
+    ('SourceEngine.eng_YTV', 'SourceEngine.engYtv'),
+], "There's no constant named '{old}', use '{new}'")
+
+# Script name -> rules in the order the script applies them
+RULESETS = {
+    'fix_compilation_errors': FIX_COMPILATION_ERRORS,
+    'fix_toargb32_errors': FIX_TOARGB32_ERRORS,
+    'fix_all_issues': FIX_ALL_ISSUES,
+    'fix_imports_final': FIX_IMPORTS_FINAL,
+    'targeted_fixes': TARGETED_FIXES,
+    'final_cleanup': FINAL_CLEANUP,
+    'fix_analysis_issues': FIX_ANALYSIS_ISSUES,
+    'fix_enum_references': FIX_ENUM_REFERENCES,
+}
+
+# fix_all_issues.fix_file_naming moves files instead of editing them
+FILE_RENAMES = [
+    ('lib/core/services/bloomeeUpdaterTools.dart', 'lib/core/services/bloomee_updater_tools.dart'),
+    ('lib/core/services/db/GlobalDB.dart', 'lib/core/services/db/global_db.dart'),
+    ('lib/core/services/db/GlobalDB.g.dart', 'lib/core/services/db/global_db.g.dart'),
+    ('lib/core/utils/load_Image.dart', 'lib/core/utils/load_image.dart'),
+    ('lib/features/player/screens/widgets/createPlaylist_bottomsheet.dart', 'lib/features/player/screens/widgets/create_playlist_bottomsheet.dart'),
+    ('lib/features/player/screens/widgets/playPause_widget.dart', 'lib/features/player/screens/widgets/play_pause_widget.dart'),
+    ('lib/features/player/screens/widgets/tabList_widget.dart', 'lib/features/player/screens/widgets/tab_list_widget.dart'),
+]
+
+RENAMES = {
+    'fix_all_issues': [RenameRule('fix_file_naming', old, new) for old, new in FILE_RENAMES],
+}
+
+for _table in (RULESETS, RENAMES):
+    for _script, _rules in _table.items():
+        for _rule in _rules:
+            _rule.script = _script
+
+
+def select(scripts=None, funcs=None):
+    """Rules of the given scripts (all by default), in application order
+
+    `funcs` restricts the selection to rules lifted from those functions,
+    given either as 'function' or 'script.function'.
+    """
+    names = scripts or list(RULESETS)
+    unknown = [name for name in names if name not in RULESETS]
+    if unknown:
+        raise KeyError(f"Unknown script(s): {', '.join(unknown)}")
+    selected = []
+    for name in names:
+        for rule in RULESETS[name]:
+            if funcs and rule.func not in funcs and f"{rule.script}.{rule.func}" not in funcs:
+                continue
+            selected.append(rule)
+    return selected
+
+
+def select_renames(scripts=None):
+    """File moves performed by the given scripts (all by default)"""
+    return [rule for name in (scripts or list(RULESETS)) for rule in RENAMES.get(name, ())]
+
+
+def pairs(script, func):
+    """(pattern, replacement) of a script function's rules, in the order it applies them"""
+    return [(rule.pattern, rule.replacement) for rule in select([script], [func])]
+
+
+def paths(script, func):
+    """Files a script function's rules are scoped to, in table order"""
+    found = []
+    for rule in select([script], [func]):
+        for path in rule.paths or ():
+            if path not in found:
+                found.append(path)
+    return found
@@ -0,0 +1,127 @@
+"""
+Path scopes: which rules apply to which files
+
+A rule's `paths` holds root-relative paths and globs (`*` and `?` stay
+within a directory, `**/` spans any number of them, `[...]` is a class).
+A Matcher compiles the scopes of a whole rule list once: explicit paths go
+into one dict, all globs into one alternation that is tried first, so each
+discovered file is resolved to its rules with a dict lookup and at most
+one regex match, and files with the same rules share one rule tuple.
+"""
+
+import re
+
+GLOB_CHARS = '*?['
+
+
+def is_glob(path):
+    return any(char in path for char in GLOB_CHARS)
+
+
+def glob_regex(pattern):
+    """Regex source matching the same relative paths as the glob"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            out.append('[^/]*')
+        elif char == '?':
+            out.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return ''.join(out)
+
+
+def split(paths):
+    """(set of explicit paths, list of globs)"""
+    exact = set()
+    globs = []
+    for path in paths:
+        if is_glob(path):
+            globs.append(path)
+        else:
+            exact.add(path)
+    return exact, globs
+
+
+class Scope:
+    """Compiled `paths` of one rule"""
+
+    __slots__ = ('exact', 'globs', 'regex')
+
+    def __init__(self, paths):
+        self.exact, self.globs = split(paths)
+        self.regex = (re.compile('|'.join(f"(?:{glob_regex(g)})" for g in self.globs))
+                      if self.globs else None)
+
+    def __contains__(self, relpath):
+        return relpath in self.exact or (self.regex is not None
+                                         and self.regex.fullmatch(relpath) is not None)
+
+
+class Matcher:
+    """The rules of a list that apply to a file, in list order"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.everywhere = []
+        self.exact = {}
+        globs = []
+        for position, rule in enumerate(self.rules):
+            if rule.paths is None:
+                self.everywhere.append(position)
+                continue
+            exact, patterns = split(rule.paths)
+            for path in exact:
+                self.exact.setdefault(path, []).append(position)
+            for pattern in patterns:
+                globs.append((pattern, position))
+        self.globs = [(re.compile(glob_regex(pattern)), position) for pattern, position in globs]
+        self.any_glob = (re.compile('|'.join(f"(?:{glob_regex(p)})" for p, _ in globs))
+                         if globs else None)
+        self._by_positions = {}
+        self._by_path = {}
+
+    @property
+    def scoped(self):
+        """True if some rule is limited to particular files"""
+        return len(self.everywhere) < len(self.rules)
+
+    def rules_for(self, relpath):
+        found = self._by_path.get(relpath)
+        if found is not None:
+            return found
+        positions = self.exact.get(relpath, ())
+        if self.any_glob is not None and self.any_glob.fullmatch(relpath):
+            positions = list(positions) + [position for regex, position in self.globs
+                                           if regex.fullmatch(relpath)]
+        if positions:
+            key = tuple(sorted(set(self.everywhere).union(positions)))
+        else:
+            key = tuple(self.everywhere)
+        found = self._by_positions.get(key)
+        if found is None:
+            found = tuple(self.rules[i] for i in key)
+            self._by_positions[key] = found
+        self._by_path[relpath] = found
+        return found
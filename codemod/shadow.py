@@ -0,0 +1,291 @@
+"""
+Shadow runs: the legacy fix functions against the engine, side by side
+
+Each selected function (final_cleanup.fix_remaining_issues, ...) is run
+twice over in-memory copies of the Dart files under root/lib: once as the
+legacy script wrote it, with its open(), glob, os and re calls served from
+memory, and once as the engine applies its rules. Both start from the same
+texts, the outputs are compared byte for byte, and the next function starts
+from the legacy output, so one divergence does not spill into the rest.
+
+Both sides are timed without disk I/O or regex compilation. The legacy
+side's re.sub calls are timed one by one, so regex rules get a speedup of
+their own (the engine's time for a rule leaves out files its literals
+ruled out); literal rewrites only count towards their function's. Files that
+diverge are dumped, both versions and a diff, under
+.dart_tool/codemod/shadow/<script>.<function>/.
+"""
+
+import difflib
+import importlib.util
+import io
+import json
+import os
+import re
+import shutil
+import time
+
+from codemod import engine, files, project, state
+from codemod import rules as rule_table
+
+SHADOW_DIR = 'shadow'
+
+_SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MemoryTree:
+    """Root-relative path -> text; the files a shadow run reads and writes"""
+
+    def __init__(self, root, texts):
+        self.root = os.path.abspath(root)
+        self.texts = texts
+
+    def key(self, path):
+        return os.path.relpath(os.path.normpath(os.path.join(self.root, path)),
+                               self.root).replace(os.sep, '/')
+
+    def open(self, path, mode='r', *args, **kwargs):
+        key = self.key(path)
+        if 'r' in mode:
+            if key not in self.texts:
+                raise FileNotFoundError(2, 'No such file or directory', path)
+            return io.StringIO(self.texts[key])
+        return _Writer(self.texts, key)
+
+    def exists(self, path):
+        key = self.key(path)
+        return key in self.texts or any(name.startswith(key + '/') for name in self.texts)
+
+    def glob(self, pattern, recursive=False):
+        regex = re.compile(_translate(self.key(pattern), recursive))
+        return [os.path.join(self.root, key) for key in sorted(self.texts) if regex.fullmatch(key)]
+
+    def walk(self, top):
+        prefix = self.key(top) + '/'
+        by_dir = {}
+        for key in sorted(self.texts):
+            if key.startswith(prefix):
+                directory, _, name = key.rpartition('/')
+                by_dir.setdefault(directory, []).append(name)
+        for directory, names in by_dir.items():
+            yield os.path.join(self.root, directory), [], names
+
+    def rename(self, old, new):
+        self.texts[self.key(new)] = self.texts.pop(self.key(old))
+
+
+class _Writer(io.StringIO):
+    """A file opened for writing; its text lands in the tree when it is closed"""
+
+    def __init__(self, texts, key):
+        super().__init__()
+        self._texts = texts
+        self._key = key
+
+    def close(self):
+        if not self.closed:
+            self._texts[self._key] = self.getvalue()
+        super().close()
+
+
+def _translate(pattern, recursive):
+    """Regex for a glob pattern over '/'-separated paths (no character classes)"""
+    out = []
+    for part in pattern.split('/'):
+        if recursive and part == '**':
+            out.append('(?:[^/]+/)*')
+            continue
+        out.append(''.join('[^/]*' if c == '*' else '[^/]' if c == '?' else re.escape(c)
+                           for c in part))
+        out.append('/')
+    return ''.join(out)[:-1]
+
+
+class _Module:
+    """Stands in for a module the legacy script imported, overriding some of its functions"""
+
+    def __init__(self, module, **overrides):
+        self._module = module
+        self.__dict__.update(overrides)
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+class _TimedRe(_Module):
+    """The re module, with every re.sub call timed per pattern"""
+
+    def __init__(self):
+        super().__init__(re)
+        self.seconds = {}
+
+    def sub(self, pattern, repl, string, count=0, flags=0):
+        started = time.perf_counter()
+        try:
+            return re.sub(pattern, repl, string, count=count, flags=flags)
+        finally:
+            self.seconds[pattern] = (self.seconds.get(pattern, 0.0)
+                                     + time.perf_counter() - started)
+
+
+def load_legacy(script, tree, timed_re):
+    """A fresh copy of the script's module, doing its file and regex work through tree and timed_re"""
+    path = os.path.join(_SCRIPTS, f'{script}.py')
+    spec = importlib.util.spec_from_file_location(f'_shadow_{script}', path)
+    if spec is None or not os.path.isfile(path):
+        raise FileNotFoundError(f"No legacy script {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.ROOT = tree.root
+    module.open = tree.open
+    module.print = lambda *args, **kwargs: None
+    module.glob = _Module(module.glob, glob=tree.glob)
+    module.re = timed_re
+    module.os = _Module(os, rename=tree.rename, walk=tree.walk,
+                        makedirs=lambda *args, **kwargs: None,
+                        path=_Module(os.path, exists=tree.exists))
+    return module
+
+
+def units(scripts=None, funcs=None):
+    """[(script, function, [rules], [renames])] in the order the scripts run them"""
+    selected = {}
+    for rule in rule_table.select(scripts, funcs):
+        selected.setdefault((rule.script, rule.func), ([], []))[0].append(rule)
+    for rule in rule_table.select_renames(scripts):
+        if not funcs or rule.func in funcs or f"{rule.script}.{rule.func}" in funcs:
+            selected.setdefault((rule.script, rule.func), ([], []))[1].append(rule)
+    order = list(rule_table.RULESETS)
+    lines = {}
+    for script in {script for script, _func in selected}:
+        source = open(os.path.join(_SCRIPTS, f'{script}.py'), encoding='utf-8').read()
+        for number, line in enumerate(source.splitlines(), 1):
+            if line.startswith('def '):
+                lines[script, line[4:].split('(', 1)[0]] = number
+    ordered = sorted(selected, key=lambda unit: (order.index(unit[0]), lines.get(unit, 0)))
+    return [(script, func, *selected[script, func]) for script, func in ordered]
+
+
+def run_legacy(script, func, texts, root, warm=()):
+    """(output texts, seconds, {pattern: seconds}) of the legacy function on a copy of texts"""
+    tree = MemoryTree(root, dict(texts))
+    timed_re = _TimedRe()
+    module = load_legacy(script, tree, timed_re)
+    for pattern, flags in warm:
+        re.compile(pattern, flags)
+    started = time.perf_counter()
+    getattr(module, func)()
+    return tree.texts, time.perf_counter() - started, timed_re.seconds
+
+
+def run_engine(rules, renames, texts):
+    """(output texts, seconds, {rule key: seconds}) of the engine on a copy of texts"""
+    for rule in rules:
+        rule.compile()
+    out = dict(texts)
+    costs = {}
+    started = time.perf_counter()
+    for rule in renames:
+        if rule.pattern in out:
+            out[rule.replacement] = out.pop(rule.pattern)
+    for relpath, text in out.items():
+        out[relpath], _hits = engine.transform(text, rules, relpath, costs=costs)
+    seconds = time.perf_counter() - started
+    return out, seconds, {key: entry[5] for key, entry in costs.items()}
+
+
+def diverged(legacy, engine_out):
+    """Paths whose text differs (or that exist on one side only), sorted"""
+    return sorted(relpath for relpath in set(legacy) | set(engine_out)
+                  if legacy.get(relpath) is None or engine_out.get(relpath) is None
+                  or legacy[relpath].encode('utf-8') != engine_out[relpath].encode('utf-8'))
+
+
+def dump(directory, relpath, legacy, engine_out):
+    """Write both versions of a divergent file and their diff under directory"""
+    base = os.path.join(directory, relpath)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    for suffix, text in (('.legacy', legacy), ('.engine', engine_out)):
+        if text is not None:
+            files.write_text(directory, relpath + suffix, text)
+    diff = difflib.unified_diff((legacy or '').splitlines(keepends=True),
+                                (engine_out or '').splitlines(keepends=True),
+                                f'legacy/{relpath}', f'engine/{relpath}')
+    files.write_text(directory, relpath + '.diff', ''.join(diff))
+
+
+def _speedup(legacy, engine_seconds):
+    return round(legacy / engine_seconds, 2) if engine_seconds else None
+
+
+def run(root, scripts=None, funcs=None):
+    """Shadow every selected function; returns a report entry per function"""
+    texts = {}
+    for relpath in files.discover(root):
+        try:
+            texts[relpath] = files.read_text(root, relpath)
+        except (OSError, UnicodeDecodeError):
+            continue
+    dump_dir = os.path.join(root, state.STATE_DIR, SHADOW_DIR)
+    shutil.rmtree(dump_dir, ignore_errors=True)
+    report = []
+    for script, func, rules, renames in units(scripts, funcs):
+        warm = [(rule.pattern, rule.flags) for rule in rules if rule.kind == 'regex']
+        legacy, legacy_seconds, by_pattern = run_legacy(script, func, texts, root, warm)
+        engine_out, engine_seconds, by_rule = run_engine(rules, renames, texts)
+        different = diverged(legacy, engine_out)
+        if different:
+            directory = os.path.join(dump_dir, f'{script}.{func}')
+            for relpath in different:
+                dump(directory, relpath, legacy.get(relpath), engine_out.get(relpath))
+        per_rule = []
+        for rule in rules:
+            if rule.kind != 'regex' or rule.pattern not in by_pattern:
+                continue
+            seconds = by_rule.get(rule.key, 0.0)
+            per_rule.append({'rule': rule.key, 'legacy': round(by_pattern[rule.pattern], 6),
+                             'engine': round(seconds, 6),
+                             'speedup': _speedup(by_pattern[rule.pattern], seconds)})
+        report.append({'function': f'{script}.{func}', 'files': len(texts),
+                       'changed': sum(1 for relpath in legacy
+                                      if legacy[relpath] != texts.get(relpath)),
+                       'diverged': different, 'legacy': round(legacy_seconds, 6),
+                       'engine': round(engine_seconds, 6),
+                       'speedup': _speedup(legacy_seconds, engine_seconds), 'rules': per_rule})
+        texts = legacy
+    return report
+
+
+def format_text(report, dump_dir):
+    out = []
+    for entry in report:
+        speedup = '-' if entry['speedup'] is None else f"{entry['speedup']:.1f}x"
+        status = f"{len(entry['diverged'])} DIVERGED" if entry['diverged'] else 'identical'
+        out.append(f"{entry['function']}: {status}, {entry['changed']} of {entry['files']} files "
+                   f"changed; legacy {entry['legacy'] * 1000:.1f}ms, engine "
+                   f"{entry['engine'] * 1000:.1f}ms ({speedup})")
+        for rule in entry['rules']:
+            if rule['speedup'] is None:
+                out.append(f"    {rule['rule']}: legacy {rule['legacy'] * 1000:.2f}ms, engine "
+                           f"skipped every file")
+                continue
+            out.append(f"    {rule['rule']}: legacy {rule['legacy'] * 1000:.2f}ms, engine "
+                       f"{rule['engine'] * 1000:.2f}ms ({rule['speedup']:.1f}x)")
+        for relpath in entry['diverged']:
+            out.append(f"    diverged: {relpath}")
+    bad = sum(1 for entry in report if entry['diverged'])
+    out.append(f"{len(report) - bad} of {len(report)} functions identical to the legacy scripts."
+               + (f" Divergent files are in {dump_dir}" if bad else ''))
+    return '\n'.join(out)
+
+
+def main(root, scripts=None, funcs=None, fmt='text'):
+    """The shadow command: prints the report; returns 1 if any function diverged"""
+    report = run(root, scripts, funcs)
+    if fmt == 'json':
+        print(json.dumps({'version': 1, 'package': project.label(root) or '.',
+                          'functions': report}, indent=2))
+    else:
+        print(format_text(report, os.path.join(project.label(root) or '.', state.STATE_DIR,
+                                               SHADOW_DIR)))
+    return 1 if any(entry['diverged'] for entry in report) else 0
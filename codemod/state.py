@@ -0,0 +1,57 @@
+"""
+Per-project state kept under .dart_tool/codemod (indexes, caches, checkpoints)
+"""
+
+import json
+import marshal
+import os
+import tempfile
+
+STATE_DIR = os.path.join('.dart_tool', 'codemod')
+
+
+def state_dir(root):
+    path = os.path.join(root, STATE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def state_path(root, name):
+    return os.path.join(state_dir(root), name)
+
+
+def load_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Write atomically so a concurrent reader never sees a torn file"""
+    _atomic_write(path, 'w', lambda f: json.dump(data, f, separators=(',', ':')))
+
+
+def load_marshal(path, default=None):
+    """Binary state for indexes too big to round-trip through JSON quickly"""
+    try:
+        with open(path, 'rb') as f:
+            return marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return default
+
+
+def save_marshal(path, data):
+    _atomic_write(path, 'wb', lambda f: marshal.dump(data, f))
+
+
+def _atomic_write(path, mode, write):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,197 @@
+"""
+Run-level instrumentation: live progress line, JSONL event stream and an
+OpenMetrics textfile for the node exporter's textfile collector
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+REFRESH_INTERVAL = 0.1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class Telemetry:
+    """Counters for one run, reported live and on completion"""
+
+    def __init__(self, command='apply', progress=None, events_path=None, metrics_path=None,
+                 stream=None):
+        self.command = command
+        self.stream = stream or sys.stderr
+        self.progress = self.stream.isatty() if progress is None else progress
+        self.metrics_path = metrics_path
+        self.events = open(events_path, 'a', encoding='utf-8') if events_path else None
+        self.total_files = 0
+        self.total_bytes = 0
+        self.files = 0
+        self.bytes = 0
+        self.modified = 0
+        self.cached = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rule_hits = {}
+        self.current_rule = ''
+        self.show_rule = True
+        self.started = None
+        self.finished = None
+        self._drawn = False
+        self._last_draw = 0.0
+
+    def start(self, total_files, total_bytes, **fields):
+        self.started = time.time()
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        # worker processes do not report the rule they are on
+        self.show_rule = fields.get('jobs', 1) <= 1
+        self.event('run_start', command=self.command, files=total_files, bytes=total_bytes, **fields)
+        self._draw(force=True)
+
+    def on_rule(self, rule):
+        self.current_rule = rule.key
+
+    def file_done(self, result, seconds=None):
+        self.files += 1
+        self.bytes += result.size
+        if result.error is not None:
+            self.errors += 1
+        if result.changed:
+            self.modified += 1
+        if result.cached:
+            self.cached += 1
+        self.timeouts += len(result.timeouts)
+        for key, count in result.hits.items():
+            self.rule_hits[key] = self.rule_hits.get(key, 0) + count
+        if self.events:
+            self.event('file', path=result.relpath, bytes=result.size, changed=result.changed,
+                       cached=result.cached, hits=result.hits,
+                       error=None if result.error is None else str(result.error),
+                       timeouts=result.timeouts,
+                       seconds=None if seconds is None else round(seconds, 6))
+        self._draw()
+
+    def log(self, message):
+        """Print a line without tearing the progress display"""
+        self._clear()
+        print(message)
+        sys.stdout.flush()
+        self._draw(force=True)
+
+    def event(self, kind, **fields):
+        if not self.events:
+            return
+        record = {'ts': round(time.time(), 6), 'event': kind}
+        record.update(fields)
+        self.events.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def finish(self, **fields):
+        self.finished = time.time()
+        self._clear()
+        elapsed = self.elapsed
+        for key, count in sorted(self.rule_hits.items()):
+            self.event('rule', rule=key, matches=count)
+        self.event('run_end', command=self.command, seconds=round(elapsed, 6), files=self.files,
+                   modified=self.modified, cached=self.cached, errors=self.errors,
+                   timeouts=self.timeouts,
+                   bytes=self.bytes, **fields)
+        if self.events:
+            self.events.close()
+            self.events = None
+        if self.metrics_path:
+            write_metrics(self.metrics_path, self)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def status_line(self):
+        elapsed = max(self.elapsed, 1e-6)
+        files_rate = self.files / elapsed
+        bytes_rate = self.bytes / elapsed
+        percent = 100.0 * self.files / self.total_files if self.total_files else 100.0
+        if bytes_rate and self.total_bytes > self.bytes:
+            eta = _duration((self.total_bytes - self.bytes) / bytes_rate)
+        else:
+            eta = '--:--'
+        width = len(str(self.total_files))
+        line = (f"[{self.files:>{width}}/{self.total_files} {percent:3.0f}%] "
+                f"{files_rate:7.1f} files/s {bytes_rate / 1e6:6.2f} MB/s ETA {eta}")
+        if self.show_rule:
+            line += f"  {self.current_rule}"
+        return line
+
+    def _draw(self, force=False):
+        if not self.progress or self.started is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_draw < REFRESH_INTERVAL:
+            return
+        self._last_draw = now
+        self.stream.write('\r\x1b[K' + self.status_line())
+        self.stream.flush()
+        self._drawn = True
+
+    def _clear(self):
+        if self._drawn:
+            self.stream.write('\r\x1b[K')
+            self.stream.flush()
+            self._drawn = False
+
+
+def render_metrics(telemetry):
+    """OpenMetrics exposition of the last run (gauges, so a re-run overwrites them)"""
+    command = _escape(telemetry.command)
+    lines = []
+
+    def gauge(name, help_text, value, labels=''):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f'{name}{{command="{command}"{labels}}} {value}')
+
+    gauge('codemod_last_run_timestamp_seconds', 'Unix time the last run finished.',
+          f"{telemetry.finished or time.time():.3f}")
+    gauge('codemod_last_run_duration_seconds', 'Wall-clock duration of the last run.',
+          f"{telemetry.elapsed:.6f}")
+    gauge('codemod_last_run_files_scanned', 'Files scanned by the last run.', telemetry.files)
+    gauge('codemod_last_run_files_modified', 'Files the last run rewrote.', telemetry.modified)
+    gauge('codemod_last_run_files_cached', 'Files answered from the transform cache.',
+          telemetry.cached)
+    gauge('codemod_last_run_errors', 'Files that could not be processed.', telemetry.errors)
+    gauge('codemod_last_run_rule_timeouts', 'Rule applications abandoned over their time budget.',
+          telemetry.timeouts)
+    gauge('codemod_last_run_bytes_scanned', 'Bytes read by the last run.', telemetry.bytes)
+    lines.append('# HELP codemod_last_run_rule_matches Substitutions made by each rule in the last run.')
+    lines.append('# TYPE codemod_last_run_rule_matches gauge')
+    for key, count in sorted(telemetry.rule_hits.items()):
+        script = key.split('.', 1)[0]
+        lines.append(f'codemod_last_run_rule_matches{{command="{command}",'
+                     f'script="{_escape(script)}",rule="{_escape(key)}"}} {count}')
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(path, telemetry):
+    """Replace the textfile atomically so the collector never reads half of it"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.codemod-', suffix='.prom.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(render_metrics(telemetry))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,46 @@
+"""
+Plain-text rewriting shared by the rule classes and the stdin filter
+
+Kept free of imports so that `codemod filter` can use it without loading
+the rule classes.
+"""
+
+
+def replace_literal(text, old, new):
+    """(text, count) of a plain str.replace, as LiteralRule applies it"""
+    if old == new or old not in text:
+        return text, 0
+    return text.replace(old, new), text.count(old)
+
+
+def replace_in_live_lines(text, old, new, comment):
+    """(text, count) of str.replace on lines not starting with `comment`, as LineRule does"""
+    lines = text.split('\n')
+    count = 0
+    for i, line in enumerate(lines):
+        if old in line and not line.strip().startswith(comment):
+            count += line.count(old)
+            lines[i] = line.replace(old, new)
+    if not count:
+        return text, 0
+    return '\n'.join(lines), count
+
+
+def anchored_matches(regex, literal, prefix_class, text):
+    """regex.finditer(text), trying only the starts allowed by patterns.anchor (see Rule.matches)"""
+    match_at = regex.match
+    find = text.find
+    pos = 0
+    i = find(literal)
+    while i != -1:
+        lo = i
+        if prefix_class is not None:
+            while lo > pos and prefix_class.match(text, lo - 1):
+                lo -= 1
+        for start in range(lo, i + 1):
+            match = match_at(text, start)
+            if match:
+                yield match
+                pos = match.end()
+                break
+        i = find(literal, max(pos, i + 1))
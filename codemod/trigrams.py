@@ -0,0 +1,203 @@
+"""
+Persistent trigram index of a package's Dart files
+
+Maps every three-character substring of every file to a bitmask of the
+files containing it, so the files a rule can possibly match are found by
+AND-ing the masks of the trigrams of its required literals, without
+opening a single file. The index lives in .dart_tool/codemod/trigrams.bin
+and is refreshed incrementally: only files whose stat changed are read,
+and only files whose blob hash changed are re-indexed.
+"""
+
+import os
+import re
+
+from codemod import files, scopes, state
+from codemod.engine import normalize_newlines
+from codemod.manifest import FileTable
+
+INDEX_VERSION = 2
+INDEX_FILE = 'trigrams.bin'
+
+
+_CHUNK = re.compile(r'...', re.S)
+
+
+def trigrams(text):
+    """Every three-character substring of text, as three non-overlapping scans"""
+    grams = set(_CHUNK.findall(text))
+    grams.update(_CHUNK.findall(text, 1))
+    grams.update(_CHUNK.findall(text, 2))
+    return grams
+
+
+class TrigramIndex:
+    """Trigram -> file bitmask for the Dart files under root/lib"""
+
+    def __init__(self, root, use_state=True):
+        self.root = root
+        self.path = os.path.join(root, state.STATE_DIR, INDEX_FILE) if use_state else None
+        data = state.load_marshal(self.path) if self.path else None
+        try:
+            if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+                raise ValueError
+            self.meta = FileTable.loads(data['files'])
+        except ValueError:
+            data = {'paths': [], 'grams': {}, 'opaque': 0}
+            self.meta = FileTable()
+        self.paths = data['paths']
+        self.grams = data['grams']
+        self.opaque = data['opaque']
+        self.ids = {path: i for i, path in enumerate(self.paths) if path is not None}
+        self.reindexed = 0
+        self.dirty = False
+
+    @property
+    def live(self):
+        mask = 0
+        for i in self.ids.values():
+            mask |= 1 << i
+        return mask
+
+    def _allocate(self, relpath, free):
+        if free:
+            i = free.pop()
+            self.paths[i] = relpath
+        else:
+            i = len(self.paths)
+            self.paths.append(relpath)
+        self.ids[relpath] = i
+        return i
+
+    def refresh(self, paths):
+        """Bring the index in line with `paths`; returns the number of files re-indexed"""
+        wanted = set(paths)
+        stale = 0
+        fresh = {}
+        for relpath in [p for p in self.ids if p not in wanted]:
+            i = self.ids.pop(relpath)
+            self.paths[i] = None
+            self.meta.remove(relpath)
+            stale |= 1 << i
+        free = [i for i in range(len(self.paths) - 1, -1, -1) if self.paths[i] is None]
+        for relpath in paths:
+            try:
+                st = os.stat(os.path.join(self.root, relpath))
+            except OSError:
+                continue
+            if self.meta.same_stat(relpath, st):
+                continue
+            try:
+                data = files.read_bytes(self.root, relpath)
+            except OSError:
+                continue
+            blob = files.blob_hash(data)
+            previous = self.meta.blob(relpath)
+            self.meta.put(relpath, st.st_mtime_ns, st.st_size, blob)
+            self.dirty = True
+            if previous == blob:
+                continue
+            i = self.ids.get(relpath)
+            if i is None:
+                i = self._allocate(relpath, free)
+            else:
+                stale |= 1 << i
+            try:
+                fresh[i] = trigrams(normalize_newlines(data.decode('utf-8')))
+            except UnicodeDecodeError:
+                fresh[i] = None
+        if stale:
+            keep = ~stale
+            self.grams = {gram: mask & keep for gram, mask in self.grams.items() if mask & keep}
+            self.opaque &= keep
+            self.dirty = True
+        postings = {}
+        for i, grams in fresh.items():
+            if grams is None:
+                # undecodable: let the engine open it and report the error
+                self.opaque |= 1 << i
+                continue
+            for gram in grams:
+                ids = postings.get(gram)
+                if ids is None:
+                    postings[gram] = [i]
+                else:
+                    ids.append(i)
+        table = self.grams
+        width = (len(self.paths) + 7) // 8
+        for gram, ids in postings.items():
+            table[gram] = table.get(gram, 0) | _mask(ids, width)
+        self.reindexed = len(fresh)
+        return self.reindexed
+
+    def mask(self, literals):
+        """Files that may contain every literal (all files if none is long enough)"""
+        result = self.live
+        grams = self.grams
+        for literal in literals:
+            for i in range(len(literal) - 2):
+                result &= grams.get(literal[i:i + 3], 0)
+                if not result:
+                    return self.opaque
+        return result | self.opaque
+
+    def narrow(self, rules):
+        """{relpath: [rules that may match it]} for the files at least one rule may match
+
+        A rule without a literal of three characters may match every file
+        in its scope. Only valid against the files as they are on disk: a
+        rule can still match text produced by an earlier rule, so callers
+        that chain rules may only pass over the others until the text
+        changes (see engine.transform).
+        """
+        result = {}
+        live = self.ids
+        for rule in rules:
+            mask = self.mask(rule.needles)
+            if not mask:
+                continue
+            if rule.paths is not None and not any(map(scopes.is_glob, rule.paths)):
+                targets = [p for p in rule.paths if p in live and mask >> live[p] & 1]
+            elif rule.paths is not None:
+                targets = [self.paths[i] for i in _bits(mask) if rule.applies_to(self.paths[i])]
+            else:
+                targets = [self.paths[i] for i in _bits(mask)]
+            for relpath in targets:
+                result.setdefault(relpath, []).append(rule)
+        return result
+
+    def size(self, relpath):
+        record = self.meta.get(relpath)
+        return record.size if record else 0
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        try:
+            state.state_dir(self.root)
+            state.save_marshal(self.path, {'version': INDEX_VERSION, 'paths': self.paths,
+                                           'files': self.meta.dumps(), 'grams': self.grams,
+                                           'opaque': self.opaque})
+        except OSError:
+            return
+        self.dirty = False
+
+
+def _mask(ids, width):
+    """Bitmask with the given bits set, built without quadratic big-int ORs"""
+    if len(ids) < 8:
+        mask = 0
+        for i in ids:
+            mask |= 1 << i
+        return mask
+    bitmap = bytearray(width)
+    for i in ids:
+        bitmap[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bitmap, 'little')
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -7,9 +7,15 @@ import os
 import re
 import glob
 
+from codemod import rules
+from codemod.project import find_root
+
+ROOT = find_root(fallback=os.path.dirname(os.path.abspath(__file__)))
+
 def fix_remaining_issues():
     """Fix the remaining analysis issues"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('final_cleanup', 'fix_remaining_issues')
     
     for file_path in dart_files:
         try:
@@ -18,42 +24,11 @@ def fix_remaining_issues():
             
             original_content = content
             
-            # Fix remaining issues
-            
-            # 1. Fix super parameters
-            content = re.sub(r'(\w+)\(\s*{([^}]*this\.key[^}]*)}\s*\)\s*:\s*super\(\)', 
-                           r'\1({super.key}) : super()', content)
-            
-            # 2. Fix const constructors
-            content = re.sub(r'return\s+([A-Z]\w*)\(\[\]\)', r'return const \1([])', content)
-            content = re.sub(r'emit\(\s*([A-Z]\w*)\(\[\]\)\s*\)', r'emit(const \1([]))', content)
-            
-            # 3. Fix prefer_const_declarations
-            content = re.sub(r'final\s+([a-zA-Z_]\w*)\s*=\s*(\[.*?\])\s*;', 
-                           r'const \1 = \2;', content)
-            
-            # 4. Fix withOpacity deprecation
-            content = re.sub(r'\.withOpacity\(([^)]+)\)', r'.withValues(alpha: \1)', content)
-            
-            # 5. Fix unnecessary null checks
-            content = re.sub(r'([a-zA-Z_]\w*)\s*!=\s*null\s*\?\s*\1\s*:\s*null', r'\1', content)
-            
-            # 6. Fix type annotations
-            content = re.sub(r'var\s+([a-zA-Z_]\w*)\s*;', r'dynamic \1;', content)
-            
-            # 7. Fix empty constructor bodies
-            content = re.sub(r'(\w+)\(\)\s*{\s*}', r'\1();', content)
-            
-            # 8. Fix prefer_is_empty
-            content = re.sub(r'\.length\s*>\s*0', '.isNotEmpty', content)
-            content = re.sub(r'\.length\s*==\s*0', '.isEmpty', content)
-            
-            # 9. Fix avoid_function_literals_in_foreach_calls
-            content = re.sub(r'\.forEach\(\(([^)]+)\)\s*=>\s*([^;]+)\)', 
-                           r'.map((\1) => \2).toList()', content)
-            
-            # 10. Fix library_private_types_in_public_api
-            content = re.sub(r'_([A-Z]\w*State)', r'\1State', content)
+            # Fix remaining issues: super parameters, const constructors and
+            # declarations, withOpacity, null checks, type annotations, empty
+            # constructor bodies, isEmpty, forEach and private State types
+            for pattern, replacement in patterns:
+                content = re.sub(pattern, replacement, content)
             
             if content != original_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -66,27 +41,29 @@ def fix_remaining_issues():
 def fix_specific_files():
     """Fix specific known issues"""
     
+    immutable, override = rules.select(['final_cleanup'], ['fix_specific_files'])
+    
     # Fix settings state immutability
-    settings_state_path = '/workspace/ElythraMusic/lib/core/blocs/settings_cubit/cubit/settings_state.dart'
+    settings_state_path = os.path.join(ROOT, immutable.paths[0])
     if os.path.exists(settings_state_path):
         with open(settings_state_path, 'r') as f:
             content = f.read()
         
         # Remove @immutable annotation or make fields final
-        content = content.replace('@immutable', '// @immutable - Removed due to mutable fields')
+        content = content.replace(immutable.pattern, immutable.replacement)
         
         with open(settings_state_path, 'w') as f:
             f.write(content)
         print("Fixed settings state immutability issue")
     
     # Fix enhanced lyrics widget override issue
-    lyrics_widget_path = '/workspace/ElythraMusic/lib/features/lyrics/enhanced_lyrics_widget.dart'
+    lyrics_widget_path = os.path.join(ROOT, override.paths[0])
     if os.path.exists(lyrics_widget_path):
         with open(lyrics_widget_path, 'r') as f:
             content = f.read()
         
         # Remove incorrect @override
-        content = re.sub(r'@override\s+void\s+dispose\(\)\s*{', 'void dispose() {', content)
+        content = re.sub(override.pattern, override.replacement, content)
         
         with open(lyrics_widget_path, 'w') as f:
             f.write(content)
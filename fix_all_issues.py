@@ -7,15 +7,21 @@ import os
 import re
 import glob
 
+from codemod import rules
+from codemod.project import find_root
+
+ROOT = find_root(fallback=os.path.dirname(os.path.abspath(__file__)))
+
 def fix_cardtheme_errors():
     """Fix CardTheme compilation errors"""
-    file_path = '/workspace/ElythraMusic/lib/features/player/theme_data/default.dart'
+    file_path = os.path.join(ROOT, rules.paths('fix_all_issues', 'fix_cardtheme_errors')[0])
     if os.path.exists(file_path):
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
         # Replace CardTheme with CardThemeData
-        content = content.replace('CardTheme(', 'CardThemeData(')
+        for old, new in rules.pairs('fix_all_issues', 'fix_cardtheme_errors'):
+            content = content.replace(old, new)
         
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(content)
@@ -23,46 +29,45 @@ def fix_cardtheme_errors():
 
 def fix_unused_imports():
     """Remove ALL unused imports"""
-    files_to_fix = [
-        ('lib/features/player/screens/widgets/song_tile.dart', 'package:audio_service/audio_service.dart'),
-        ('lib/features/player/screens/screen/library_views/more_opts_sheet.dart', 'package:elythra_music/core/model/media_playlist_model.dart'),
-        ('lib/features/lyrics/services/enhanced_lyrics_service.dart', 'package:http/http.dart'),
-    ]
+    files_to_fix = rules.UNUSED_IMPORTS['fix_all_issues']
     
+    # One read and one write per file, however many of its imports go
+    imports_by_file = {}
     for file_path, import_to_remove in files_to_fix:
-        full_path = os.path.join('/workspace/ElythraMusic', file_path)
+        imports_by_file.setdefault(file_path, []).append(import_to_remove)
+    
+    for file_path, imports_to_remove in imports_by_file.items():
+        full_path = os.path.join(ROOT, file_path)
         if os.path.exists(full_path):
             with open(full_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # Remove the specific import line
-            import_pattern = f"import '{import_to_remove}';\n"
-            if import_pattern in content:
-                content = content.replace(import_pattern, '')
-                print(f"Removed unused import {import_to_remove} from {file_path}")
+            original_content = content
             
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            for import_to_remove in imports_to_remove:
+                # Remove the specific import line
+                import_pattern = f"import '{import_to_remove}';\n"
+                if import_pattern in content:
+                    content = content.replace(import_pattern, '')
+                    print(f"Removed unused import {import_to_remove} from {file_path}")
+            
+            if content != original_content:
+                with open(full_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
 
 def fix_deprecated_share():
     """Fix ALL deprecated Share usage"""
-    files_to_fix = [
-        'lib/features/player/screens/screen/home_views/youtube_views/playlist.dart',
-        'lib/features/player/screens/screen/library_views/more_opts_sheet.dart',
-        'lib/features/player/screens/widgets/more_bottom_sheet.dart',
-    ]
+    files_to_fix = rules.paths('fix_all_issues', 'fix_deprecated_share')
     
     for file_path in files_to_fix:
-        full_path = os.path.join('/workspace/ElythraMusic', file_path)
+        full_path = os.path.join(ROOT, file_path)
         if os.path.exists(full_path):
             with open(full_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
             # Replace deprecated Share usage
-            content = content.replace('Share.share(', 'SharePlus.share(')
-            content = content.replace('Share.shareXFiles(', 'SharePlus.shareXFiles(')
-            content = content.replace("'Share'", "'SharePlus'")
-            content = content.replace('"Share"', '"SharePlus"')
+            for old, new in rules.pairs('fix_all_issues', 'fix_deprecated_share'):
+                content = content.replace(old, new)
             
             with open(full_path, 'w', encoding='utf-8') as f:
                 f.write(content)
@@ -70,7 +75,8 @@ def fix_deprecated_share():
 
 def fix_deprecated_apis():
     """Fix other deprecated API usage"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    replacements = rules.pairs('fix_all_issues', 'fix_deprecated_apis')
     
     for file_path in dart_files:
         try:
@@ -80,11 +86,8 @@ def fix_deprecated_apis():
             original_content = content
             
             # Fix deprecated APIs
-            content = content.replace('onPopInvoked:', 'onPopInvokedWithResult:')
-            content = content.replace('ButtonBar(', 'OverflowBar(')
-            content = content.replace('tolerance:', 'toleranceFor:')
-            content = content.replace('.value', '.toARGB32')  # For Color.value
-            content = content.replace('surfaceVariant', 'surfaceContainerHighest')
+            for old, new in replacements:
+                content = content.replace(old, new)
             
             if content != original_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -95,19 +98,11 @@ def fix_deprecated_apis():
 
 def fix_file_naming():
     """Fix file naming conventions"""
-    files_to_rename = [
-        ('lib/core/services/bloomeeUpdaterTools.dart', 'lib/core/services/bloomee_updater_tools.dart'),
-        ('lib/core/services/db/GlobalDB.dart', 'lib/core/services/db/global_db.dart'),
-        ('lib/core/services/db/GlobalDB.g.dart', 'lib/core/services/db/global_db.g.dart'),
-        ('lib/core/utils/load_Image.dart', 'lib/core/utils/load_image.dart'),
-        ('lib/features/player/screens/widgets/createPlaylist_bottomsheet.dart', 'lib/features/player/screens/widgets/create_playlist_bottomsheet.dart'),
-        ('lib/features/player/screens/widgets/playPause_widget.dart', 'lib/features/player/screens/widgets/play_pause_widget.dart'),
-        ('lib/features/player/screens/widgets/tabList_widget.dart', 'lib/features/player/screens/widgets/tab_list_widget.dart'),
-    ]
+    files_to_rename = rules.FILE_RENAMES
     
     for old_path, new_path in files_to_rename:
-        old_full = os.path.join('/workspace/ElythraMusic', old_path)
-        new_full = os.path.join('/workspace/ElythraMusic', new_path)
+        old_full = os.path.join(ROOT, old_path)
+        new_full = os.path.join(ROOT, new_path)
         
         if os.path.exists(old_full):
             os.makedirs(os.path.dirname(new_full), exist_ok=True)
@@ -116,21 +111,9 @@ def fix_file_naming():
 
 def fix_variable_naming():
     """Fix variable naming conventions"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
-    
-    naming_fixes = {
-        'last_YTM_search': 'lastYtmSearch',
-        'last_YTV_search': 'lastYtvSearch', 
-        'last_JIS_search': 'lastJisSearch',
-        'MediaItem2MediaItemDB': 'mediaItemToMediaItemDB',
-        'MediaItemDB2MediaItem': 'mediaItemDBToMediaItem',
-        'old_idx': 'oldIdx',
-        'new_idx': 'newIdx',
-        'launch_Url': 'launchUrl',
-        'ElythraDBCubit': 'elythraDBCubit',
-        'ANDROID_CONTEXT': 'androidContext',
-        'IOS_CONTEXT': 'iosContext',
-    }
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    
+    naming_fixes = rules.pairs('fix_all_issues', 'fix_variable_naming')
     
     for file_path in dart_files:
         try:
@@ -139,8 +122,8 @@ def fix_variable_naming():
             
             original_content = content
             
-            for old_name, new_name in naming_fixes.items():
-                content = re.sub(rf'\b{re.escape(old_name)}\b', new_name, content)
+            for pattern, new_name in naming_fixes:
+                content = re.sub(pattern, new_name, content)
             
             if content != original_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -151,7 +134,8 @@ def fix_variable_naming():
 
 def fix_constant_naming():
     """Fix constant naming conventions"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_constant_naming')
     
     for file_path in dart_files:
         try:
@@ -161,15 +145,6 @@ def fix_constant_naming():
             original_content = content
             
             # Fix constant naming - convert UPPER_CASE to lowerCamelCase for non-constants
-            patterns = [
-                (r'const String eng_JIS', 'const String engJis'),
-                (r'const String eng_YTM', 'const String engYtm'),
-                (r'const String eng_YTV', 'const String engYtv'),
-                (r'const String ImportMediaFromPlatforms', 'const String importMediaFromPlatforms'),
-                (r'const String ChartScreen', 'const String chartScreen'),
-                (r'class Default_Theme', 'class DefaultTheme'),
-            ]
-            
             for pattern, replacement in patterns:
                 content = re.sub(pattern, replacement, content)
             
@@ -182,7 +157,8 @@ def fix_constant_naming():
 
 def fix_super_parameters():
     """Add super parameters where suggested"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_super_parameters')
     
     for file_path in dart_files:
         try:
@@ -192,11 +168,6 @@ def fix_super_parameters():
             original_content = content
             
             # Simple super parameter fixes for common patterns
-            patterns = [
-                (r'({[^}]*key[^}]*})\s*:\s*super\(\)', r'({super.key}) : super()'),
-                (r'this\.key\s*,', 'super.key,'),
-            ]
-            
             for pattern, replacement in patterns:
                 content = re.sub(pattern, replacement, content)
             
@@ -209,7 +180,8 @@ def fix_super_parameters():
 
 def fix_empty_catches():
     """Fix empty catch blocks"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_empty_catches')
     
     for file_path in dart_files:
         try:
@@ -219,7 +191,8 @@ def fix_empty_catches():
             original_content = content
             
             # Add comments to empty catch blocks
-            content = re.sub(r'catch\s*\([^)]*\)\s*{\s*}', r'catch (e) {\n    // Ignore error\n  }', content)
+            for pattern, replacement in patterns:
+                content = re.sub(pattern, replacement, content)
             
             if content != original_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -230,7 +203,8 @@ def fix_empty_catches():
 
 def fix_const_constructors():
     """Add const constructors where safe"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_const_constructors')
     
     for file_path in dart_files:
         try:
@@ -240,11 +214,6 @@ def fix_const_constructors():
             original_content = content
             
             # Safe const constructor patterns
-            patterns = [
-                (r'return ([A-Z][a-zA-Z]*)\(\[\]\)', r'return const \1([])'),
-                (r'emit\(([A-Z][a-zA-Z]*)\(\[\]\)', r'emit(const \1([]))'),
-            ]
-            
             for pattern, replacement in patterns:
                 content = re.sub(pattern, replacement, content)
             
@@ -257,7 +226,8 @@ def fix_const_constructors():
 
 def fix_override_annotations():
     """Add missing @override annotations"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_override_annotations')
     
     for file_path in dart_files:
         try:
@@ -267,11 +237,6 @@ def fix_override_annotations():
             original_content = content
             
             # Add @override for common overridden members
-            patterns = [
-                (r'(\s+)(final\s+[A-Za-z]+\s+resultType)', r'\1@override\n\1\2'),
-                (r'(\s+)(bool\s+showLyrics)', r'\1@override\n\1\2'),
-            ]
-            
             for pattern, replacement in patterns:
                 content = re.sub(pattern, replacement, content)
             
@@ -284,7 +249,8 @@ def fix_override_annotations():
 
 def fix_unreachable_code():
     """Fix unreachable code warnings"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_unreachable_code')
     
     for file_path in dart_files:
         try:
@@ -294,8 +260,8 @@ def fix_unreachable_code():
             original_content = content
             
             # Remove unreachable default cases
-            content = re.sub(r'default:\s*break;\s*}', '}', content)
-            content = re.sub(r'default:\s*// unreachable\s*}', '}', content)
+            for pattern, replacement in patterns:
+                content = re.sub(pattern, replacement, content)
             
             if content != original_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -306,7 +272,8 @@ def fix_unreachable_code():
 
 def fix_unused_variables():
     """Fix unused variables"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_unused_variables')
     
     for file_path in dart_files:
         try:
@@ -316,11 +283,6 @@ def fix_unused_variables():
             original_content = content
             
             # Comment out unused variables
-            patterns = [
-                (r'final\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([^;]+);(\s*//.*unused.*)', r'// final \1 = \2; // Unused variable'),
-                (r'var\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([^;]+);(\s*//.*unused.*)', r'// var \1 = \2; // Unused variable'),
-            ]
-            
             for pattern, replacement in patterns:
                 content = re.sub(pattern, replacement, content)
             
@@ -333,7 +295,8 @@ def fix_unused_variables():
 
 def fix_string_interpolation():
     """Fix unnecessary braces in string interpolation"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_string_interpolation')
     
     for file_path in dart_files:
         try:
@@ -343,7 +306,8 @@ def fix_string_interpolation():
             original_content = content
             
             # Fix unnecessary braces in string interpolation
-            content = re.sub(r'\$\{([a-zA-Z_][a-zA-Z0-9_]*)\}', r'$\1', content)
+            for pattern, replacement in patterns:
+                content = re.sub(pattern, replacement, content)
             
             if content != original_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -354,7 +318,8 @@ def fix_string_interpolation():
 
 def fix_null_aware_operators():
     """Fix unnecessary null-aware operators"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_null_aware_operators')
     
     for file_path in dart_files:
         try:
@@ -364,11 +329,6 @@ def fix_null_aware_operators():
             original_content = content
             
             # Fix common unnecessary null-aware operators
-            patterns = [
-                (r'([a-zA-Z_][a-zA-Z0-9_]*)\?\.\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\?\?', r'\1.\2 ??'),
-                (r'([a-zA-Z_][a-zA-Z0-9_]*)\s*\?\?\s*([a-zA-Z_][a-zA-Z0-9_]*)', r'\1 ?? \2'),
-            ]
-            
             for pattern, replacement in patterns:
                 content = re.sub(pattern, replacement, content)
             
@@ -381,7 +341,8 @@ def fix_null_aware_operators():
 
 def fix_type_annotations():
     """Add explicit type annotations"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_type_annotations')
     
     for file_path in dart_files:
         try:
@@ -391,11 +352,6 @@ def fix_type_annotations():
             original_content = content
             
             # Add type annotations for common patterns
-            patterns = [
-                (r'var\s+([a-zA-Z_][a-zA-Z0-9_]*);', r'dynamic \1;'),
-                (r'final\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*<String>\[\];', r'final List<String> \1 = <String>[];'),
-            ]
-            
             for pattern, replacement in patterns:
                 content = re.sub(pattern, replacement, content)
             
@@ -408,7 +364,8 @@ def fix_type_annotations():
 
 def fix_build_context_usage():
     """Fix BuildContext usage across async gaps"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_all_issues', 'fix_build_context_usage')
     
     for file_path in dart_files:
         try:
@@ -418,11 +375,6 @@ def fix_build_context_usage():
             original_content = content
             
             # Add mounted checks before BuildContext usage
-            patterns = [
-                (r'(await\s+[^;]+;\s*)(Navigator\.[^(]+\(context)', r'\1if (mounted) \2'),
-                (r'(await\s+[^;]+;\s*)(ScaffoldMessenger\.[^(]+\(context)', r'\1if (mounted) \2'),
-            ]
-            
             for pattern, replacement in patterns:
                 content = re.sub(pattern, replacement, content)
             
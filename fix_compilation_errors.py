@@ -7,27 +7,25 @@ import os
 import re
 import glob
 
+from codemod import rules
+from codemod.project import find_root
+
+ROOT = find_root(fallback=os.path.dirname(os.path.abspath(__file__)))
+
 def fix_import_conflicts():
     """Fix import conflicts between audio_service and custom MediaItem"""
     
     # Files that need audio_service alias
-    files_to_fix = [
-        'lib/core/blocs/mini_player/mini_player_bloc.dart',
-        'lib/features/player/screens/widgets/song_tile.dart',
-        'lib/features/player/screens/screen/explore_screen.dart',
-        'lib/features/player/screens/screen/library_views/more_opts_sheet.dart',
-    ]
+    files_to_fix = rules.paths('fix_compilation_errors', 'fix_import_conflicts')
     
-    for file_path in files_to_fix:
+    for file_path in [os.path.join(ROOT, path) for path in files_to_fix]:
         if os.path.exists(file_path):
             with open(file_path, 'r') as f:
                 content = f.read()
             
             # Add alias to audio_service import
-            content = content.replace(
-                "import 'package:audio_service/audio_service.dart';",
-                "import 'package:audio_service/audio_service.dart' as audio_service;"
-            )
+            for old, new in rules.pairs('fix_compilation_errors', 'fix_import_conflicts'):
+                content = content.replace(old, new)
             
             with open(file_path, 'w') as f:
                 f.write(content)
@@ -36,28 +34,20 @@ def fix_import_conflicts():
 def fix_mediaplaylist_conflicts():
     """Fix MediaPlaylist import conflicts"""
     
-    files_to_fix = [
-        'lib/features/player/screens/screen/explore_screen.dart',
-        'lib/features/player/screens/screen/library_views/more_opts_sheet.dart',
-    ]
+    files_to_fix = rules.paths('fix_compilation_errors', 'fix_mediaplaylist_conflicts')
+    (old_import, new_import), (pattern, replacement) = rules.pairs(
+        'fix_compilation_errors', 'fix_mediaplaylist_conflicts')
     
-    for file_path in files_to_fix:
+    for file_path in [os.path.join(ROOT, path) for path in files_to_fix]:
         if os.path.exists(file_path):
             with open(file_path, 'r') as f:
                 content = f.read()
             
             # Add alias to MediaPlaylistModel import
-            content = content.replace(
-                "import 'package:elythra_music/core/model/MediaPlaylistModel.dart';",
-                "import 'package:elythra_music/core/model/MediaPlaylistModel.dart' as core_playlist;"
-            )
+            content = content.replace(old_import, new_import)
             
             # Update MediaPlaylist usage
-            content = re.sub(
-                r'\bMediaPlaylist\(',
-                'core_playlist.MediaPlaylist(',
-                content
-            )
+            content = re.sub(pattern, replacement, content)
             
             with open(file_path, 'w') as f:
                 f.write(content)
@@ -67,7 +57,8 @@ def fix_method_signatures():
     """Fix method signature issues"""
     
     # Fix loadPlaylist calls to updateQueue
-    dart_files = glob.glob('lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_compilation_errors', 'fix_method_signatures')
     
     for file_path in dart_files:
         with open(file_path, 'r') as f:
@@ -75,25 +66,10 @@ def fix_method_signatures():
         
         original_content = content
         
-        # Fix loadPlaylist calls with extra parameters
-        content = re.sub(
-            r'\.loadPlaylist\(\s*MediaPlaylist\([^)]+\),\s*doPlay:\s*true,?\s*\)',
-            '.updateQueue(mediaitems, doPlay: true, idx: 0)',
-            content
-        )
-        
-        content = re.sub(
-            r'\.loadPlaylist\(\s*MediaPlaylist\([^)]+\),\s*idx:\s*(\w+),\s*doPlay:\s*true\)',
-            r'.updateQueue(mediaitems, idx: \1, doPlay: true)',
-            content
-        )
-        
-        # Remove doPlay parameter from updateQueue calls where it doesn't belong
-        content = re.sub(
-            r'\.updateQueue\([^)]+\),\s*doPlay:\s*true\)',
-            '.updateQueue(mediaitems, doPlay: true, idx: 0)',
-            content
-        )
+        # Fix loadPlaylist calls with extra parameters, and remove doPlay
+        # from updateQueue calls where it doesn't belong
+        for pattern, replacement in patterns:
+            content = re.sub(pattern, replacement, content)
         
         if content != original_content:
             with open(file_path, 'w') as f:
@@ -103,7 +79,8 @@ def fix_method_signatures():
 def fix_type_conversions():
     """Fix type conversion issues"""
     
-    dart_files = glob.glob('lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('fix_compilation_errors', 'fix_type_conversions')
     
     for file_path in dart_files:
         with open(file_path, 'r') as f:
@@ -111,19 +88,9 @@ def fix_type_conversions():
         
         original_content = content
         
-        # Fix MediaItemModel to MediaItem conversions
-        content = re.sub(
-            r'\.addQueueItem\((\w+)\)',
-            r'.addQueueItem(MediaItem.fromMediaItemModel(\1))',
-            content
-        )
-        
-        # Fix Stream.value access
-        content = re.sub(
-            r'\.queueTitle\.value',
-            '.queueTitle',
-            content
-        )
+        # Fix MediaItemModel to MediaItem conversions and Stream.value access
+        for pattern, replacement in patterns:
+            content = re.sub(pattern, replacement, content)
         
         if content != original_content:
             with open(file_path, 'w') as f:
@@ -6,16 +6,17 @@ Script to fix SourceEngine enum references
 import os
 import glob
 
+from codemod import rules
+from codemod.project import find_root
+
+ROOT = find_root(fallback=os.path.dirname(os.path.abspath(__file__)))
+
 def fix_enum_references():
     """Fix all SourceEngine enum references"""
     
-    replacements = [
-        ('SourceEngine.eng_JIS', 'SourceEngine.engJis'),
-        ('SourceEngine.eng_YTM', 'SourceEngine.engYtm'),
-        ('SourceEngine.eng_YTV', 'SourceEngine.engYtv'),
-    ]
+    replacements = rules.pairs('fix_enum_references', 'fix_enum_references')
     
-    for dart_file in glob.glob('lib/**/*.dart', recursive=True):
+    for dart_file in glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True):
         try:
             with open(dart_file, 'r', encoding='utf-8') as f:
                 content = f.read()
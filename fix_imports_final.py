@@ -7,21 +7,17 @@ import os
 import re
 import glob
 
+from codemod import rules
+from codemod.project import find_root
+
+ROOT = find_root(fallback=os.path.dirname(os.path.abspath(__file__)))
+
 def fix_all_imports():
     """Fix all import paths for renamed files"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
     
-    # Map of old imports to new imports
-    import_fixes = {
-        'load_Image.dart': 'load_image.dart',
-        'GlobalDB.dart': 'global_db.dart', 
-        'GlobalDB.g.dart': 'global_db.g.dart',
-        'bloomeeUpdaterTools.dart': 'bloomee_updater_tools.dart',
-        'createPlaylist_bottomsheet.dart': 'create_playlist_bottomsheet.dart',
-        'playPause_widget.dart': 'play_pause_widget.dart',
-        'tabList_widget.dart': 'tab_list_widget.dart',
-        'bloomeePlayer.dart': 'bloomee_player.dart',
-    }
+    # Old import paths to new ones, then class name references
+    import_fixes = rules.pairs('fix_imports_final', 'fix_all_imports')
     
     for file_path in dart_files:
         try:
@@ -30,13 +26,9 @@ def fix_all_imports():
             
             original_content = content
             
-            # Fix all import paths
-            for old_import, new_import in import_fixes.items():
-                content = content.replace(old_import, new_import)
-            
-            # Fix class name references
-            content = content.replace('Default_Theme', 'DefaultTheme')
-            content = content.replace('LoadImage', 'LoadImage')  # Keep class name
+            # Fix all import paths and class name references
+            for old, new in import_fixes:
+                content = content.replace(old, new)
             
             if content != original_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
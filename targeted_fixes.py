@@ -7,57 +7,49 @@ import os
 import re
 import glob
 
+from codemod import rules
+from codemod.project import find_root
+
+ROOT = find_root(fallback=os.path.dirname(os.path.abspath(__file__)))
+
 def fix_unused_imports():
     """Remove specific unused imports"""
-    files_to_fix = [
-        ('lib/core/utils/pallete_generator.dart', 'package:cached_network_image/cached_network_image.dart'),
-        ('lib/features/auth/services/enhanced_auth_service.dart', 'package:crypto/crypto.dart'),
-        ('lib/features/auth/webview_auth_service.dart', 'package:flutter/foundation.dart'),
-        ('lib/features/lyrics/services/enhanced_lyrics_service.dart', 'package:http/http.dart'),
-        ('lib/features/lyrics/services/enhanced_lyrics_service.dart', 'package:elythra_music/features/lyrics/repository/lyrics.dart'),
-        ('lib/features/music_intelligence/recommendation_engine.dart', 'dart:math'),
-        ('lib/features/performance/performance_optimizer.dart', 'dart:isolate'),
-        ('lib/features/player/screens/screen/home_views/youtube_views/playlist.dart', 'package:elythra_music/core/model/MediaPlaylistModel.dart'),
-        ('lib/features/player/screens/screen/library_views/more_opts_sheet.dart', 'package:elythra_music/core/model/MediaPlaylistModel.dart'),
-        ('lib/features/player/screens/screen/library_views/playlist_screen.dart', 'package:elythra_music/core/model/MediaPlaylistModel.dart'),
-        ('lib/features/player/screens/screen/library_views/playlist_screen.dart', 'package:flutter/foundation.dart'),
-        ('lib/features/player/screens/screen/offline_screen.dart', 'package:elythra_music/core/model/MediaPlaylistModel.dart'),
-        ('lib/features/player/screens/screen/player_screen.dart', 'dart:ui'),
-        ('lib/features/player/screens/screen/player_screen.dart', 'package:elythra_music/core/services/bloomeePlayer.dart'),
-        ('lib/features/player/screens/widgets/createPlaylist_bottomsheet.dart', 'package:flutter/cupertino.dart'),
-        ('lib/features/player/screens/widgets/song_tile.dart', 'package:audio_service/audio_service.dart'),
-        ('lib/features/player/services/enhanced_audio_service.dart', 'package:audio_service/audio_service.dart'),
-        ('lib/features/player/services/enhanced_audio_service.dart', 'package:elythra_music/core/repository/Saavn/saavn_api.dart'),
-        ('lib/features/player/services/enhanced_audio_service.dart', 'package:elythra_music/core/repository/Youtube/ytm/ytmusic.dart'),
-        ('lib/features/settings/enhanced_settings_screen.dart', 'package:flutter_bloc/flutter_bloc.dart'),
-        ('lib/features/social/social_features_service.dart', 'package:url_launcher/url_launcher.dart'),
-        ('lib/main.dart', 'package:elythra_music/features/harmony_integration/enhanced_stream_service.dart'),
-    ]
+    files_to_fix = rules.UNUSED_IMPORTS['targeted_fixes']
     
+    # One read and one write per file, however many of its imports go
+    imports_by_file = {}
     for file_path, import_to_remove in files_to_fix:
-        full_path = os.path.join('/workspace/ElythraMusic', file_path)
+        imports_by_file.setdefault(file_path, []).append(import_to_remove)
+    
+    for file_path, imports_to_remove in imports_by_file.items():
+        full_path = os.path.join(ROOT, file_path)
         if os.path.exists(full_path):
             with open(full_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # Remove the specific import line
-            import_pattern = f"import '{import_to_remove}';\n"
-            if import_pattern in content:
-                content = content.replace(import_pattern, '')
-                print(f"Removed unused import {import_to_remove} from {file_path}")
+            original_content = content
             
-            # Also try with double quotes
-            import_pattern = f'import "{import_to_remove}";\n'
-            if import_pattern in content:
-                content = content.replace(import_pattern, '')
-                print(f"Removed unused import {import_to_remove} from {file_path}")
+            for import_to_remove in imports_to_remove:
+                # Remove the specific import line
+                import_pattern = f"import '{import_to_remove}';\n"
+                if import_pattern in content:
+                    content = content.replace(import_pattern, '')
+                    print(f"Removed unused import {import_to_remove} from {file_path}")
+                
+                # Also try with double quotes
+                import_pattern = f'import "{import_to_remove}";\n'
+                if import_pattern in content:
+                    content = content.replace(import_pattern, '')
+                    print(f"Removed unused import {import_to_remove} from {file_path}")
             
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            if content != original_content:
+                with open(full_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
 
 def fix_deprecated_withopacity():
     """Fix deprecated withOpacity usage - only in safe contexts"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    patterns = rules.pairs('targeted_fixes', 'fix_deprecated_withopacity')
     
     for file_path in dart_files:
         try:
@@ -68,7 +60,8 @@ def fix_deprecated_withopacity():
             
             # Only replace simple withOpacity patterns that are safe
             # Pattern: .withOpacity(number) -> .withValues(alpha: number)
-            content = re.sub(r'\.withOpacity\(([0-9.]+)\)', r'.withValues(alpha: \1)', content)
+            for pattern, replacement in patterns:
+                content = re.sub(pattern, replacement, content)
             
             if content != original_content:
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -79,7 +72,8 @@ def fix_deprecated_withopacity():
 
 def fix_print_statements():
     """Comment out print statements in production code"""
-    dart_files = glob.glob('/workspace/ElythraMusic/lib/**/*.dart', recursive=True)
+    dart_files = glob.glob(os.path.join(ROOT, 'lib/**/*.dart'), recursive=True)
+    rule, = rules.select(['targeted_fixes'], ['fix_print_statements'])
     
     for file_path in dart_files:
         try:
@@ -89,9 +83,9 @@ def fix_print_statements():
             modified = False
             for i, line in enumerate(lines):
                 # Look for print statements that are not in comments
-                if 'print(' in line and not line.strip().startswith('//'):
+                if rule.pattern in line and not line.strip().startswith(rule.comment):
                     # Comment out the print statement
-                    lines[i] = line.replace('print(', '// print(')
+                    lines[i] = line.replace(rule.pattern, rule.replacement)
                     modified = True
             
             if modified:
@@ -103,14 +97,10 @@ def fix_print_statements():
 
 def fix_deprecated_share():
     """Fix deprecated Share usage"""
-    files_to_fix = [
-        'lib/features/player/screens/screen/home_views/youtube_views/playlist.dart',
-        'lib/features/player/screens/screen/library_views/more_opts_sheet.dart',
-        'lib/features/player/screens/widgets/more_bottom_sheet.dart',
-    ]
+    files_to_fix = rules.paths('targeted_fixes', 'fix_deprecated_share')
     
     for file_path in files_to_fix:
-        full_path = os.path.join('/workspace/ElythraMusic', file_path)
+        full_path = os.path.join(ROOT, file_path)
         if os.path.exists(full_path):
             with open(full_path, 'r', encoding='utf-8') as f:
                 content = f.read()
@@ -118,8 +108,8 @@ def fix_deprecated_share():
             original_content = content
             
             # Replace deprecated Share usage
-            content = content.replace('Share.share(', 'SharePlus.share(')
-            content = content.replace('Share.shareXFiles(', 'SharePlus.shareXFiles(')
+            for old, new in rules.pairs('targeted_fixes', 'fix_deprecated_share'):
+                content = content.replace(old, new)
             
             if content != original_content:
                 with open(full_path, 'w', encoding='utf-8') as f:
@@ -128,15 +118,16 @@ def fix_deprecated_share():
 
 def fix_deprecated_button_bar():
     """Fix deprecated ButtonBar usage"""
-    file_path = 'lib/features/player/screens/screen/library_views/playlist_screen.dart'
-    full_path = os.path.join('/workspace/ElythraMusic', file_path)
+    file_path = rules.paths('targeted_fixes', 'fix_deprecated_button_bar')[0]
+    full_path = os.path.join(ROOT, file_path)
     
     if os.path.exists(full_path):
         with open(full_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
         # Replace ButtonBar with OverflowBar
-        content = content.replace('ButtonBar(', 'OverflowBar(')
+        for old, new in rules.pairs('targeted_fixes', 'fix_deprecated_button_bar'):
+            content = content.replace(old, new)
         
         with open(full_path, 'w', encoding='utf-8') as f:
             f.write(content)
@@ -0,0 +1,58 @@
+"""
+Per-rule time budgets and the static backtracking audit
+"""
+
+import os
+import sys
+import time
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import budget, engine, patterns  # noqa: E402
+from codemod.rules import Rule  # noqa: E402
+
+# exponential on a run of a's that ends in something else
+CATASTROPHIC = Rule('f', 'slow', r'(a+)+$', 'x', '')
+QUICK = Rule('f', 'quick', r'\.length\s*==\s*0', '.isEmpty', '')
+TEXT = 'a' * 40 + 'b\nitems.length == 0\n'
+
+
+@unittest.skipUnless(budget.enforceable(), 'budgets need SIGALRM on the main thread')
+class BudgetTest(unittest.TestCase):
+
+    def test_call_raises_once_the_budget_is_spent(self):
+        started = time.perf_counter()
+        with self.assertRaises(budget.RuleTimeout):
+            budget.call(0.05, CATASTROPHIC.apply, TEXT)
+        self.assertLess(time.perf_counter() - started, 2)
+
+    def test_call_returns_within_budget(self):
+        self.assertEqual(budget.call(1, QUICK.apply, TEXT)[1], 1)
+
+    def test_transform_skips_the_rule_and_reports_it(self):
+        timeouts = []
+        text, hits = engine.transform(TEXT, [CATASTROPHIC, QUICK], 'lib/a.dart', budget=0.05,
+                                      timeouts=timeouts)
+        self.assertEqual(timeouts, [CATASTROPHIC.key])
+        self.assertEqual(text, TEXT.replace('.length == 0', '.isEmpty'))
+        self.assertEqual(hits, {QUICK.key: 1})
+
+
+class AuditTest(unittest.TestCase):
+
+    def test_nested_quantifier(self):
+        risks = patterns.backtracking_risks(r'(a+)+$')
+        self.assertTrue(any('nested quantifier' in risk for risk in risks))
+
+    def test_overlapping_quantifiers(self):
+        risks = patterns.backtracking_risks(r'(\w+)\s*\w*;')
+        self.assertTrue(any('overlapping quantifiers' in risk for risk in risks), risks)
+
+    def test_safe_pattern(self):
+        self.assertEqual(patterns.backtracking_risks(r'\.length\s*==\s*0'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
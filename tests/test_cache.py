@@ -0,0 +1,101 @@
+"""
+The shared transform cache, on its own and behind engine.run
+"""
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import cache, engine, rules  # noqa: E402
+
+BLOB = 'a' * 40
+OTHER = 'b' * 40
+SOURCE = 'void f(List items) {\n  if (items.length == 0) return;\n}\n'
+
+
+class TransformCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='codemod-cache-')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.cache = cache.TransformCache(self.tmp)
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.get(BLOB, 'rules'))
+        self.cache.put(BLOB, 'rules', b'changed')
+        self.cache.put(OTHER, 'rules', cache.NO_CHANGE)
+        self.assertEqual(self.cache.get(BLOB, 'rules'), b'changed')
+        self.assertIs(self.cache.get(OTHER, 'rules'), cache.NO_CHANGE)
+        self.assertIsNone(self.cache.get(BLOB, 'other rules'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+    def test_entries_follow_the_umask(self):
+        old = os.umask(0o022)
+        try:
+            self.cache.put(BLOB, 'rules', b'changed')
+        finally:
+            os.umask(old)
+        mode = stat.S_IMODE(os.stat(self.cache._path(BLOB, 'rules')).st_mode)
+        self.assertEqual(mode, 0o644)
+
+    def test_prune_drops_old_entries_once_a_day(self):
+        self.cache.put(BLOB, 'rules', b'old')
+        self.cache.put(OTHER, 'rules', b'new')
+        old = self.cache._path(BLOB, 'rules')
+        long_ago = time.time() - cache.MAX_AGE - 60
+        os.utime(old, (long_ago, long_ago))
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get(BLOB, 'rules'))
+        self.assertEqual(self.cache.get(OTHER, 'rules'), b'new')
+        os.utime(self.cache._path(OTHER, 'rules'), (long_ago, long_ago))
+        self.assertEqual(self.cache.prune(), 0)
+        self.assertEqual(self.cache.prune(now=time.time() + cache.PRUNE_EVERY + 60), 1)
+
+
+class EngineCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='codemod-cache-')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.cache = cache.TransformCache(os.path.join(self.tmp, 'cache'))
+
+    def _package(self, name):
+        root = os.path.join(self.tmp, name)
+        os.makedirs(os.path.join(root, 'lib'))
+        with open(os.path.join(root, 'pubspec.yaml'), 'w', encoding='utf-8') as f:
+            f.write(f'name: {name}\n')
+        with open(os.path.join(root, 'lib', 'a.dart'), 'w', encoding='utf-8') as f:
+            f.write(SOURCE)
+        return root
+
+    def test_second_checkout_is_served_from_the_cache(self):
+        selected = rules.select(['final_cleanup'])
+        first = engine.run([self._package('one')], selected, cache=self.cache, index=False)
+        second = engine.run([self._package('two')], selected, cache=self.cache, index=False)
+        self.assertEqual((first['changed'], first['cached'], first['misses']), (1, 0, 1))
+        self.assertEqual((second['changed'], second['cached'], second['misses']), (1, 1, 0))
+        with open(os.path.join(self.tmp, 'two', 'lib', 'a.dart'), encoding='utf-8') as f:
+            self.assertIn('items.isEmpty', f.read())
+
+    def test_misses_are_counted_where_the_cache_is_asked(self):
+        selected = rules.select(['final_cleanup'])
+        root = self._package('one')
+        with open(os.path.join(root, 'lib', 'b.dart'), 'w', encoding='utf-8') as f:
+            f.write('int x = 1;\n')
+        with open(os.path.join(root, 'lib', 'c.dart'), 'w', encoding='utf-8') as f:
+            f.write(SOURCE)
+        summary = engine.run([root], selected, cache=self.cache, jobs=2, write=False)
+        # c.dart is a duplicate of a.dart: only a.dart and b.dart are looked up
+        self.assertEqual((summary['files'], summary['duplicates']), (3, 1))
+        self.assertEqual((summary['cached'], summary['misses']), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Checkpoint logs, and resuming an interrupted apply from one
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import checkpoint, engine  # noqa: E402
+from codemod.rules import LiteralRule  # noqa: E402
+
+# not idempotent, so a file done twice shows
+GROW = LiteralRule('f', 'grow', 'Text(', 'Text(Text(', '')
+SOURCE = 'final a = Text(1);\n'
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='codemod-checkpoint-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'lib'))
+        with open(os.path.join(self.root, 'pubspec.yaml'), 'w', encoding='utf-8') as f:
+            f.write('name: sample\n')
+        for name in ('a', 'b'):
+            self._write(f'lib/{name}.dart', SOURCE)
+        self.signature = checkpoint.signature([GROW])
+
+    def _write(self, relpath, text):
+        with open(os.path.join(self.root, relpath), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _read(self, relpath):
+        with open(os.path.join(self.root, relpath), encoding='utf-8') as f:
+            return f.read()
+
+    def _interrupted(self):
+        """A run that wrote lib/a.dart and was killed before lib/b.dart"""
+        journal = checkpoint.Checkpoint(self.root, self.signature)
+        output, _hits = engine.transform(SOURCE, [GROW], 'lib/a.dart')
+        journal.changed('lib/a.dart', output.encode('utf-8'))
+        self._write('lib/a.dart', output)
+        journal.close()
+
+    def test_resume_skips_finished_files(self):
+        self._interrupted()
+        summary = engine.run([self.root], [GROW], checkpoints=True, resume=True, index=False)
+        self.assertEqual((summary['resumed'], summary['changed']), (1, 1))
+        self.assertEqual(self._read('lib/a.dart'), 'final a = Text(Text(1);\n')
+        self.assertEqual(self._read('lib/b.dart'), 'final a = Text(Text(1);\n')
+
+    def test_file_edited_since_is_redone(self):
+        self._interrupted()
+        self._write('lib/a.dart', SOURCE)
+        summary = engine.run([self.root], [GROW], checkpoints=True, resume=True, index=False)
+        self.assertEqual((summary['resumed'], summary['changed']), (0, 2))
+
+    def test_finished_run_resumes_to_nothing(self):
+        engine.run([self.root], [GROW], checkpoints=True, index=False)
+        summary = engine.run([self.root], [GROW], checkpoints=True, resume=True, index=False)
+        self.assertEqual((summary['resumed'], summary['changed']), (2, 0))
+
+    def test_other_rules_cannot_resume(self):
+        self._interrupted()
+        other = LiteralRule('f', 'other', 'Text(', 'Label(', '')
+        with self.assertRaises(checkpoint.CheckpointError):
+            engine.run([self.root], [other], checkpoints=True, resume=True, index=False)
+
+    def test_missing_log_cannot_resume(self):
+        with self.assertRaises(checkpoint.CheckpointError):
+            checkpoint.Checkpoint(self.root, self.signature, resume=True)
+
+    def test_torn_last_line_is_ignored(self):
+        journal = checkpoint.Checkpoint(self.root, self.signature)
+        journal.unchanged('lib/b.dart')
+        journal.close()
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('C\tlib/a.dart')
+        resumed = checkpoint.Checkpoint(self.root, self.signature, resume=True)
+        self.addCleanup(resumed.close)
+        self.assertTrue(resumed.completed('lib/b.dart'))
+        self.assertFalse(resumed.completed('lib/a.dart'))
+
+
+if __name__ == '__main__':
+    unittest.main()
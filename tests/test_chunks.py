@@ -0,0 +1,84 @@
+"""
+Cutting large files at top-level declarations and running rules on the pieces
+"""
+
+import os
+import sys
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import chunks, engine, rules  # noqa: E402
+from codemod.rules import Rule  # noqa: E402
+
+DECLARATION = '''class Item{n} {{
+  bool get empty => items.length == 0;
+  String get label => "${{name}}";
+}}
+'''
+TEXT = ''.join(DECLARATION.format(n=n) for n in range(40))
+
+
+def _serial(stage, parts, relpath):
+    """map_pieces without a pool"""
+    results = []
+    for part in parts:
+        timeouts, costs = [], {}
+        text, hits = engine.transform(part, stage, relpath, timeouts=timeouts, costs=costs)
+        results.append((text, hits, timeouts, costs))
+    return results
+
+
+class CutTest(unittest.TestCase):
+
+    def test_boundaries_keep_declarations_whole(self):
+        text = 'class A {\n  f() {\n}\n}\nclass B {\n}\nvoid main() {}\n'
+        self.assertEqual(chunks.boundaries(text), [text.index('class B'),
+                                                   text.index('void main')])
+
+    def test_no_cut_after_the_last_line(self):
+        self.assertEqual(chunks.boundaries('class A {\n}\n'), [])
+
+    def test_pieces_join_back(self):
+        parts = chunks.cut(TEXT, 4)
+        self.assertEqual(len(parts), 4)
+        self.assertEqual(''.join(parts), TEXT)
+        self.assertTrue(all(part.startswith('class Item') for part in parts))
+
+    def test_one_piece(self):
+        self.assertEqual(chunks.cut(TEXT, 1), [TEXT])
+
+
+class SplittableTest(unittest.TestCase):
+
+    def test_rule_within_a_line(self):
+        self.assertTrue(Rule('f', 'is_empty', r'\.length\s*==\s*0', '.isEmpty', '').splittable)
+
+    def test_rule_that_can_cross_a_cut(self):
+        self.assertFalse(Rule('f', 'gap', r'}\s+class', '}\nclass', '').splittable)
+        self.assertFalse(Rule('f', 'lead', r'\n\n', '\n', '').splittable)
+
+
+class TransformTest(unittest.TestCase):
+
+    def test_pieces_give_the_same_text_as_the_whole(self):
+        selected = rules.select(['final_cleanup']) + [
+            Rule('f', 'gap', r'}\nclass', '}\n\nclass', '')]
+        self.assertTrue(any(rule.splittable for rule in selected))
+        self.assertTrue(any(not rule.splittable for rule in selected))
+        whole = engine.transform(TEXT, selected, 'lib/a.dart')
+        split = chunks.transform(TEXT, selected, 'lib/a.dart', map_pieces=_serial, pieces=4)
+        self.assertEqual(split, whole)
+        self.assertIn('items.isEmpty', split[0])
+
+    def test_stages_follow_the_rule_order(self):
+        first = Rule('f', 'a', 'a', 'b', '')
+        crossing = Rule('f', 'gap', r'}\nclass', '}\n\nclass', '')
+        last = Rule('f', 'c', 'c', 'd', '')
+        self.assertEqual(chunks.stages([first, crossing, last], 'lib/a.dart'),
+                         [(True, [first]), (False, [crossing]), (True, [last])])
+
+
+if __name__ == '__main__':
+    unittest.main()
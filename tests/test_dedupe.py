@@ -0,0 +1,76 @@
+"""
+Files with the same content and rules are transformed once per run
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import engine  # noqa: E402
+from codemod.rules import LiteralRule  # noqa: E402
+
+SOURCE = 'final a = Text(1);\n'
+TEXT = LiteralRule('f', 'text', 'Text(', 'Label(', '')
+SCOPED = LiteralRule('f', 'scoped', 'final ', 'const ', '', paths=['lib/c.dart'])
+
+
+class DedupeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='codemod-dedupe-')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.roots = [self._package('one'), self._package('two')]
+
+    def _package(self, name):
+        root = os.path.join(self.tmp, name)
+        os.makedirs(os.path.join(root, 'lib'))
+        with open(os.path.join(root, 'pubspec.yaml'), 'w', encoding='utf-8') as f:
+            f.write(f'name: {name}\n')
+        for relpath, text in (('lib/a.dart', SOURCE), ('lib/b.dart', SOURCE),
+                              ('lib/c.dart', SOURCE), ('lib/d.dart', 'void main() {}\n')):
+            with open(os.path.join(root, relpath), 'w', encoding='utf-8') as f:
+                f.write(text)
+        return root
+
+    def _read(self, root, relpath):
+        with open(os.path.join(root, relpath), encoding='utf-8') as f:
+            return f.read()
+
+    def _run(self, **options):
+        return engine.run(self.roots, [TEXT, SCOPED], index=False, **options)
+
+    def test_copies_share_one_transform(self):
+        summary = self._run()
+        # a and b in both packages are one group, c (scoped rule) another, d a third
+        self.assertEqual(summary['duplicates'], 5)
+        self.assertEqual(summary['files'], 8)
+        self.assertEqual(summary['changed'], 6)
+        for root in self.roots:
+            self.assertEqual(self._read(root, 'lib/a.dart'), 'final a = Label(1);\n')
+            self.assertEqual(self._read(root, 'lib/b.dart'), 'final a = Label(1);\n')
+            self.assertEqual(self._read(root, 'lib/c.dart'), 'const a = Label(1);\n')
+
+    def test_same_output_without_dedupe(self):
+        self._run()
+        deduped = {(root, name): self._read(root, f'lib/{name}.dart')
+                   for root in self.roots for name in 'abcd'}
+        shutil.rmtree(self.tmp)
+        self.roots = [self._package('one'), self._package('two')]
+        summary = self._run(dedupe=False)
+        self.assertEqual(summary['duplicates'], 0)
+        self.assertEqual(deduped, {(root, name): self._read(root, f'lib/{name}.dart')
+                                   for root in self.roots for name in 'abcd'})
+
+    def test_copies_are_reported_on_their_own(self):
+        summary = self._run(write=False)
+        self.assertEqual(summary['changed'], 6)
+        self.assertEqual((summary['hits'][TEXT.key], summary['hit_files'][TEXT.key]), (6, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
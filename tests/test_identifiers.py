@@ -0,0 +1,96 @@
+"""
+The identifier index and the code-only renames run through it
+"""
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import identifiers  # noqa: E402
+from codemod.identifiers import IdentifierIndex, Rename  # noqa: E402
+from codemod.rules import LiteralRule, Rule  # noqa: E402
+
+SOURCE = '''// oldName is documented here
+final oldName = Engine.eng_JIS;
+final label = "oldName ${oldName}";
+final oldNameLonger = MyEngine.eng_JIS + eng_JIS;
+'''
+
+
+def _quiet(_line):
+    pass
+
+
+class IdentifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='codemod-identifiers-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'lib'))
+        with open(os.path.join(self.root, 'pubspec.yaml'), 'w', encoding='utf-8') as f:
+            f.write('name: sample\n')
+        self._write('lib/a.dart', SOURCE)
+        self._write('lib/b.dart', SOURCE)
+
+    def _write(self, relpath, text):
+        with open(os.path.join(self.root, relpath), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _read(self, relpath):
+        with open(os.path.join(self.root, relpath), encoding='utf-8') as f:
+            return f.read()
+
+    def test_scan_skips_strings_and_comments(self):
+        found = identifiers.scan(SOURCE)
+        self.assertEqual([SOURCE[start:start + 7] for start in found['oldName']],
+                         ['oldName', 'oldName'])
+        self.assertEqual(len(found['eng_JIS']), 3)
+
+    def test_rename_touches_only_code(self):
+        summary = identifiers.run(self.root, [Rename('oldName', 'newName')], log=_quiet)
+        self.assertEqual((summary['changed'], summary['renamed']), (2, 4))
+        self.assertEqual(self._read('lib/a.dart'), SOURCE.replace(
+            'final oldName =', 'final newName =').replace('${oldName}', '${newName}'))
+
+    def test_qualified_rename(self):
+        identifiers.run(self.root, [Rename('eng_JIS', 'engJis', 'Engine.')], log=_quiet)
+        text = self._read('lib/a.dart')
+        self.assertIn('Engine.engJis;', text)
+        self.assertIn('MyEngine.eng_JIS + eng_JIS;', text)
+
+    def test_renames_from_rules(self):
+        word = Rule('f', 'word', r'\bOldState\b', 'NewState', '')
+        qualified = LiteralRule('f', 'jis', 'Engine.eng_JIS', 'Engine.engJis', '')
+        other = LiteralRule('f', 'call', 'Share.share(', 'SharePlus.share(', '')
+        renames = identifiers.from_rules([word, qualified, other])
+        self.assertEqual([rename.key for rename in renames], [word.key, qualified.key])
+        self.assertEqual((renames[1].old, renames[1].qualifier), ('eng_JIS', 'Engine.'))
+
+    def test_index_follows_edits(self):
+        index = IdentifierIndex(self.root)
+        index.refresh(['lib/a.dart', 'lib/b.dart'])
+        index.save()
+        self.assertEqual(index.lexed, 1)
+        self.assertEqual(sorted(index.where['oldName']), ['lib/a.dart', 'lib/b.dart'])
+        self._write('lib/b.dart', 'final other = 1;\n')
+        os.utime(os.path.join(self.root, 'lib/b.dart'), (1, 1))
+        index = IdentifierIndex(self.root)
+        self.assertEqual(index.refresh(['lib/a.dart', 'lib/b.dart']), 1)
+        self.assertEqual(index.where['oldName'], ['lib/a.dart'])
+
+    def test_regex_rename_of_each_identifier(self):
+        pattern = r'_([A-Z]\w*State)\b'
+        rename = Rename(pattern, r'\1', regex=re.compile(pattern))
+        self._write('lib/a.dart', 'class _HomeState {}\nfinal s = "_HomeState";\n')
+        identifiers.run(self.root, [rename], log=_quiet)
+        self.assertEqual(self._read('lib/a.dart'), 'class HomeState {}\nfinal s = "_HomeState";\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
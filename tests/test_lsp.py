@@ -0,0 +1,104 @@
+"""
+The language server, driven over stdio by the scripted lsp.Client
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import engine, lsp, rules  # noqa: E402
+
+SOURCE = 'void f(List items) {\n  if (items.length == 0) return;\n  print(items.length > 0);\n}\n'
+
+
+def _edit(text, edits):
+    """`text` with the LSP text edits of one document applied"""
+    doc = lsp.Document('', text, 0, '', '')
+    spans = sorted(((doc.offset(e['range']['start']), doc.offset(e['range']['end']), e['newText'])
+                    for e in edits), reverse=True)
+    for start, end, new_text in spans:
+        text = text[:start] + new_text + text[end:]
+    return text
+
+
+class ServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='codemod-lsp-')
+        with open(os.path.join(self.tmp, 'pubspec.yaml'), 'w', encoding='utf-8') as f:
+            f.write('name: sample\n')
+        os.makedirs(os.path.join(self.tmp, 'lib'))
+        self.path = os.path.join(self.tmp, 'lib', 'a.dart')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(SOURCE)
+        self.uri = lsp.path_to_uri(self.path)
+        self.client = lsp.Client([sys.executable, '-m', 'codemod', 'lsp',
+                                  '--script', 'final_cleanup'])
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def tearDown(self):
+        if self.client.process.poll() is None:
+            self.client.process.kill()
+            self.client.process.wait()
+        for stream in (self.client.process.stdin, self.client.process.stdout):
+            if not stream.closed:
+                stream.close()
+
+    def _open(self):
+        result, _elapsed = self.client.request('initialize', {'processId': None,
+                                                              'rootUri': None,
+                                                              'capabilities': {}})
+        self.client.notify('initialized', {})
+        self.client.notify('textDocument/didOpen', {'textDocument': {
+            'uri': self.uri, 'languageId': 'dart', 'version': 1, 'text': SOURCE}})
+        published = self.client.wait_for('textDocument/publishDiagnostics', self.uri)
+        return result, published['params']['diagnostics']
+
+    def test_session(self):
+        capabilities, diagnostics = self._open()
+        self.assertIn('codeActionProvider', capabilities['capabilities'])
+        self.assertEqual(sorted(d['code'] for d in diagnostics),
+                         ['prefer_is_empty', 'prefer_is_not_empty'])
+
+        empty = next(d for d in diagnostics if d['code'] == 'prefer_is_empty')
+        actions, _elapsed = self.client.request('textDocument/codeAction', {
+            'textDocument': {'uri': self.uri}, 'range': empty['range'],
+            'context': {'diagnostics': [empty]}})
+        quickfix = next(a for a in actions if a['kind'] == lsp.QUICKFIX)
+        self.assertTrue(quickfix['isPreferred'])
+        change, = quickfix['edit']['documentChanges']
+        self.assertIn('if (items.isEmpty) return;', _edit(SOURCE, change['edits']))
+
+        fix_all = next(a for a in actions if a['kind'] == lsp.FIX_ALL)
+        change, = fix_all['edit']['documentChanges']
+        expected, _hits = engine.transform(SOURCE, rules.select(['final_cleanup']), 'lib/a.dart')
+        self.assertEqual(_edit(SOURCE, change['edits']), expected)
+
+        self.assertEqual(self.client.close(), 0)
+
+    def test_code_action_without_range_offers_fix_all_only(self):
+        self._open()
+        actions, _elapsed = self.client.request('textDocument/codeAction', {
+            'textDocument': {'uri': self.uri}, 'context': {'diagnostics': []}})
+        self.assertEqual([a['kind'] for a in actions], [lsp.FIX_ALL])
+        self.assertEqual(self.client.close(), 0)
+
+    def test_unknown_request_is_answered_and_server_keeps_running(self):
+        self._open()
+        with self.assertRaises(RuntimeError):
+            self.client.request('workspace/unknown', {})
+        self.client.notify('textDocument/didChange', {'textDocument': {'uri': self.uri},
+                                                      'contentChanges': [{}]})
+        self.client.notify('textDocument/didClose', {'textDocument': {'uri': self.uri}})
+        cleared = self.client.wait_for('textDocument/publishDiagnostics', self.uri)
+        self.assertEqual(cleared['params']['diagnostics'], [])
+        self.assertEqual(self.client.close(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
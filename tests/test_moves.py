@@ -0,0 +1,177 @@
+"""
+File moves that rewrite the directives naming the moved files
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import files, moves, state  # noqa: E402
+
+FILES = {
+    'lib/main.dart': "import 'core/utils/load_Image.dart';\n"
+                     "import 'package:sample/core/utils/load_Image.dart' as img;\n"
+                     "// import 'core/utils/load_Image.dart';\n"
+                     "void main() {}\n",
+    'lib/core/utils/load_Image.dart': "import '../theme.dart';\nvoid load() {}\n",
+    'lib/core/theme.dart': "void theme() {}\n",
+    'test/load_test.dart': "import 'package:sample/core/utils/load_Image.dart';\n",
+}
+MOVE = ('lib/core/utils/load_Image.dart', 'lib/core/utils/load_image.dart')
+
+
+def _quiet(_line):
+    pass
+
+
+class MoveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='codemod-moves-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        with open(os.path.join(self.root, 'pubspec.yaml'), 'w', encoding='utf-8') as f:
+            f.write('name: sample\n')
+        for relpath, text in FILES.items():
+            self._write(relpath, text)
+
+    def _write(self, relpath, text):
+        path = os.path.join(self.root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _read(self, relpath):
+        with open(os.path.join(self.root, relpath), encoding='utf-8') as f:
+            return f.read()
+
+    def test_scan_finds_directive_uris(self):
+        text = FILES['lib/main.dart']
+        self.assertEqual([(keyword, uri) for keyword, uri, _start, _end in moves.scan(text)],
+                         [('import', 'core/utils/load_Image.dart'),
+                          ('import', 'package:sample/core/utils/load_Image.dart')])
+
+    def test_resolve_and_spell(self):
+        self.assertEqual(moves.resolve('sample', 'lib/core/utils/a.dart', '../theme.dart'),
+                         'lib/core/theme.dart')
+        self.assertEqual(moves.resolve('sample', 'test/a.dart', 'package:sample/x.dart'),
+                         'lib/x.dart')
+        self.assertIsNone(moves.resolve('sample', 'lib/a.dart', 'package:other/x.dart'))
+        self.assertEqual(moves.spell('sample', 'lib/a/b.dart', 'lib/c.dart', '../c.dart'),
+                         '../c.dart')
+        self.assertEqual(moves.spell('sample', 'test/a.dart', 'lib/c.dart', 'package:sample/'),
+                         'package:sample/c.dart')
+
+    def test_case_only_move(self):
+        summary = moves.run(self.root, [MOVE], log=_quiet)
+        self.assertEqual((summary['moved'], summary['edited'], summary['directives']), (1, 2, 3))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, 'lib/core/utils'))),
+                         ['load_image.dart'])
+        self.assertEqual(self._read('lib/main.dart'), FILES['lib/main.dart'].replace(
+            "import 'core/utils/load_Image", "import 'core/utils/load_image", 1).replace(
+            'sample/core/utils/load_Image', 'sample/core/utils/load_image'))
+        self.assertEqual(self._read('test/load_test.dart'),
+                         "import 'package:sample/core/utils/load_image.dart';\n")
+        self.assertFalse(os.path.exists(os.path.join(self.root, state.STATE_DIR, 'moves')))
+
+    def test_moved_file_keeps_its_relative_imports_working(self):
+        moves.run(self.root, [(MOVE[0], 'lib/load_image.dart')], log=_quiet)
+        self.assertEqual(self._read('lib/load_image.dart'),
+                         "import 'core/theme.dart';\nvoid load() {}\n")
+        self.assertIn("import 'load_image.dart';", self._read('lib/main.dart'))
+
+    def test_repeated_run_changes_nothing(self):
+        moves.run(self.root, [MOVE], log=_quiet)
+        summary = moves.run(self.root, [MOVE], log=_quiet)
+        self.assertEqual((summary['moved'], summary['edited']), (0, 0))
+
+    def test_legacy_move_gets_its_importers_fixed(self):
+        os.rename(os.path.join(self.root, MOVE[0]), os.path.join(self.root, MOVE[1]))
+        summary = moves.run(self.root, [MOVE], log=_quiet)
+        self.assertEqual((summary['moved'], summary['edited']), (0, 2))
+        self.assertNotIn('load_Image', self._read('lib/main.dart').split('//')[0])
+
+    def test_dry_run_writes_nothing(self):
+        summary = moves.run(self.root, [MOVE], write=False, log=_quiet)
+        self.assertEqual(summary['moved'], 1)
+        self.assertEqual(self._read(MOVE[0]), FILES[MOVE[0]])
+
+    def test_clashes(self):
+        self._write('lib/core/theme2.dart', '')
+        with self.assertRaises(moves.MoveError):
+            moves.check_moves(self.root, [('lib/core/theme.dart', 'lib/core/theme2.dart')])
+        with self.assertRaises(moves.MoveError):
+            moves.check_moves(self.root, [('lib/a.dart', 'lib/c.dart'),
+                                          ('lib/b.dart', 'lib/c.dart')])
+
+    def test_interrupted_transaction_is_finished(self):
+        mapping = moves.check_moves(self.root, [MOVE])
+        index = moves.DirectiveIndex(self.root, use_state=False)
+        paths = moves.discover(self.root)
+        index.refresh(paths)
+        steps = moves.plan(self.root, mapping, index, 'sample', paths)
+        with mock.patch.object(moves, 'roll_forward'):
+            moves.commit(self.root, steps)
+        self.assertEqual(self._read('lib/main.dart'), FILES['lib/main.dart'])
+        summary = moves.run(self.root, [MOVE], log=_quiet)
+        self.assertEqual(summary['recovered'], 3)
+        self.assertEqual((summary['moved'], summary['edited']), (0, 0))
+        self.assertTrue(files.exists(self.root, MOVE[1]))
+        self.assertNotIn('load_Image', self._read('test/load_test.dart'))
+
+
+def _case_insensitive_exists(path):
+    """os.path.exists as a case-insensitive disk answers it"""
+    directory, name = os.path.split(path)
+    try:
+        return name.lower() in {entry.lower() for entry in os.listdir(directory or '.')}
+    except OSError:
+        return False
+
+
+class CaseInsensitiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='codemod-moves-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'lib'))
+        self.path = os.path.join(self.root, 'lib', 'load_image.dart')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('void load() {}\n')
+
+    def test_exists_wants_the_exact_spelling(self):
+        with mock.patch('os.path.exists', _case_insensitive_exists):
+            self.assertTrue(files.exists(self.root, 'lib/load_image.dart'))
+            self.assertFalse(files.exists(self.root, 'lib/load_Image.dart'))
+            self.assertFalse(files.exists(self.root, 'LIB/load_image.dart'))
+
+    def test_case_only_move_goes_through_a_temporary_name(self):
+        old = os.path.join(self.root, 'lib', 'load_Image.dart')
+        os.rename(self.path, old)
+        renames = []
+        real = os.rename
+
+        def rename(source, target):
+            renames.append(os.path.basename(target))
+            real(source, target)
+
+        with mock.patch.object(files, 'same_file', return_value=True), \
+                mock.patch('os.rename', rename):
+            files.move(old, self.path)
+        self.assertEqual(renames, ['load_image.dart' + files.MOVE_SUFFIX, 'load_image.dart'])
+        self.assertEqual(os.listdir(os.path.join(self.root, 'lib')), ['load_image.dart'])
+
+    def test_cut_off_move_is_finished(self):
+        os.rename(self.path, self.path + files.MOVE_SUFFIX)
+        self.assertTrue(files.finish_move(self.path))
+        self.assertEqual(os.listdir(os.path.join(self.root, 'lib')), ['load_image.dart'])
+        self.assertFalse(files.finish_move(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
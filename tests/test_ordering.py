@@ -0,0 +1,94 @@
+"""
+Which rules adaptive ordering may swap, and that swapping them is safe
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import ordering  # noqa: E402
+from codemod.rules import LineRule, LiteralRule, Rule  # noqa: E402
+
+INTERPOLATION = Rule('f', 'interp', r'\$\{([a-zA-Z_][a-zA-Z0-9_]*)\}', r'$\1', '')
+GETTER = Rule('f', 'getter', r'(\w+)\.toARGB32s(?=\s*[,\)\]\s;])', r'\1.values', '')
+IS_EMPTY = Rule('f', 'is_empty', r'\.length\s*==\s*0', '.isEmpty', '')
+SHARE = LiteralRule('f', 'share', 'Share.share(', 'SharePlus.share(', '')
+QUOTED = LiteralRule('f', 'quoted', '"Share"', '"SharePlus"', '')
+CARD = LiteralRule('f', 'card', 'CardTheme(', 'CardThemeData(', '')
+CARD_BACK = LiteralRule('f', 'card_back', 'CardThemeData(', 'CardTheme(', '')
+IMPORT = LiteralRule('f', 'import', "import 'x.dart';\n", '', '')
+PRINT = LineRule('f', 'print', 'print(', '// print(', '')
+SEMICOLONS = LiteralRule('f', 'semicolons', ';;', ';', '')
+SAMPLES = [
+    'final s = "${color}.toARGB32s, ${x}";;\n',
+    'if (items.length == 0) Share.share(text); "Share" CardTheme(\n',
+    "import 'x.dart';\nprint(a.length==0);\n",
+]
+
+
+def _apply(rules, text):
+    for rule in rules:
+        text, _count = rule.apply(text)
+    return text
+
+
+class InteractsTest(unittest.TestCase):
+
+    def test_character_class_dependency_interacts(self):
+        self.assertTrue(ordering.interacts(INTERPOLATION, GETTER))
+
+    def test_unrelated_literals_commute(self):
+        self.assertFalse(ordering.interacts(SHARE, QUOTED))
+
+    def test_overlapping_literals_interact(self):
+        self.assertTrue(ordering.interacts(CARD, CARD_BACK))
+
+    def test_deleting_rule_interacts(self):
+        self.assertTrue(ordering.interacts(IMPORT, SHARE))
+
+    def test_line_rule_interacts(self):
+        self.assertTrue(ordering.interacts(PRINT, QUOTED))
+
+    def test_disjoint_alphabets_commute(self):
+        self.assertFalse(ordering.interacts(IS_EMPTY, SEMICOLONS))
+
+    def test_independent_pairs_give_the_same_text_in_either_order(self):
+        rules = [INTERPOLATION, GETTER, IS_EMPTY, SHARE, QUOTED, CARD, CARD_BACK, IMPORT, PRINT,
+                 SEMICOLONS]
+        for a, b in itertools.combinations(rules, 2):
+            if ordering.interacts(a, b):
+                continue
+            for text in SAMPLES:
+                self.assertEqual(_apply([a, b], text), _apply([b, a], text), (a, b, text))
+
+
+class OrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = ordering.RuleStats(REPO, use_state=False)
+
+    def _measure(self, rule, tried, ran):
+        rule.script = 'test'
+        self.stats.rules[rule.key] = {'totals': [tried, ran, 0, 0, 1000, 0.001], 'idle': 0}
+
+    def test_selective_independent_rule_goes_first(self):
+        first = LiteralRule('f', 'many', ';;', ';', '')
+        second = Rule('f', 'few', r'\.length\s*==\s*0', '.isEmpty', '')
+        self._measure(first, 10, 10)
+        self._measure(second, 10, 1)
+        self.assertEqual(ordering.order([first, second], [self.stats]), [second, first])
+
+    def test_pinned_rule_keeps_its_place(self):
+        first = LiteralRule('f', 'many', ';;', ';', '', pinned=True)
+        second = Rule('f', 'few', r'\.length\s*==\s*0', '.isEmpty', '')
+        self._measure(first, 10, 10)
+        self._measure(second, 10, 1)
+        self.assertEqual(ordering.order([first, second], [self.stats]), [first, second])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Patches written by apply --emit-patch, and the diffs they are made of
+"""
+
+import difflib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import engine, patch, rules  # noqa: E402
+
+OLD = [f'line {n}\n' for n in range(30)]
+SOURCE = 'void f(List items) {\n  if (items.length == 0) return;\n}\n'
+FILES = {
+    'lib/a.dart': SOURCE,
+    'lib/c.dart': SOURCE.rstrip('\n'),
+    'lib/core/utils/load_Image.dart': SOURCE,
+    'lib/core/services/bloomeeUpdaterTools.dart': 'int x = 1;\n',
+}
+RENAMES = [rule for rule in rules.select_renames(['fix_all_issues'])
+           if rule.pattern in FILES]
+
+
+def _unified(old, new):
+    """The hunks difflib writes for the same change"""
+    lines = difflib.unified_diff(old.splitlines(keepends=True), new.splitlines(keepends=True))
+    return ''.join(line for line in lines if not line.startswith(('---', '+++')))
+
+
+class HunksTest(unittest.TestCase):
+
+    def _check(self, new):
+        old = ''.join(OLD)
+        new = ''.join(new)
+        self.assertEqual(patch.hunks(old.encode(), new.encode()).decode(), _unified(old, new))
+
+    def test_same_as_difflib(self):
+        self._check(OLD[:2] + ['changed\n'] + OLD[3:])
+        self._check(OLD[:5] + OLD[6:20] + ['added\n'] + OLD[20:])
+        self._check(['first\n'] + OLD + ['last\n'])
+        self._check(OLD[:10] + OLD[11:12] + OLD[13:])
+
+    def test_equal_texts(self):
+        self.assertEqual(patch.hunks(b'a\n', b'a\n'), b'')
+
+    def test_no_newline_at_end_of_file(self):
+        self.assertIn(b'\\ No newline at end of file', patch.hunks(b'a\nb', b'a\nc'))
+
+
+@unittest.skipIf(shutil.which('git') is None, 'checking patches needs git')
+class EmitPatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='codemod-patch-')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def _package(self, name):
+        root = os.path.join(self.tmp, name)
+        for relpath, text in FILES.items():
+            os.makedirs(os.path.dirname(os.path.join(root, relpath)), exist_ok=True)
+            with open(os.path.join(root, relpath), 'w', encoding='utf-8') as f:
+                f.write(text)
+        with open(os.path.join(root, 'pubspec.yaml'), 'w', encoding='utf-8') as f:
+            f.write('name: sample\n')
+        return root
+
+    def _tree(self, root):
+        tree = {}
+        for directory, _dirs, names in os.walk(os.path.join(root, 'lib')):
+            for name in names:
+                path = os.path.join(directory, name)
+                with open(path, encoding='utf-8') as f:
+                    tree[os.path.relpath(path, root)] = f.read()
+        return tree
+
+    def _emit(self, root, **options):
+        writer = patch.PatchWriter(os.path.join(self.tmp, 'out.patch'))
+        summary = engine.run([root], rules.select(['final_cleanup']), RENAMES, write=False,
+                             index=False, patch=writer, **options)
+        writer.close()
+        return summary, writer
+
+    def _same_as_apply(self, **options):
+        applied = self._package('applied')
+        engine.run([applied], rules.select(['final_cleanup']), RENAMES, index=False)
+        patched = self._package('patched')
+        _summary, writer = self._emit(patched, **options)
+        self.assertEqual((writer.files, writer.renames), (3, 2))
+        self.assertEqual(self._tree(patched), self._tree(self._package('untouched')))
+        subprocess.run(['git', 'apply', writer.path], cwd=patched, check=True)
+        self.assertEqual(self._tree(patched), self._tree(applied))
+
+    def test_patch_does_what_apply_does(self):
+        self._same_as_apply()
+
+    def test_patch_from_the_pool(self):
+        self._same_as_apply(jobs=2)
+
+    def test_aborted_patch_leaves_nothing(self):
+        writer = patch.PatchWriter(os.path.join(self.tmp, 'out.patch'))
+        writer.file('lib/a.dart', patch.hunks(b'a\n', b'b\n'))
+        writer.abort()
+        self.assertEqual(os.listdir(self.tmp), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Replaying the rules over a commit range in reused worktrees
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import replay  # noqa: E402
+
+GIT_ENV = {'GIT_AUTHOR_NAME': 'test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+           'GIT_COMMITTER_NAME': 'test', 'GIT_COMMITTER_EMAIL': 'test@example.com'}
+
+
+@unittest.skipIf(shutil.which('git') is None, 'replay needs git')
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='codemod-replay-')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.top = os.path.join(self.tmp, 'repo')
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+        self.root = os.path.join(self.top, 'app')
+        os.makedirs(os.path.join(self.root, 'lib'))
+        self._git('init', '-q')
+        self._commit('pubspec.yaml', 'name: app\n', 'Add the package')
+        self._commit('lib/a.dart', 'void f(List items) => items.length == 0;\n', 'Add a')
+        self._commit('lib/b.dart', 'void g(List items) => items.length == 0;\n', 'Add b')
+        self._commit('lib/b.dart', 'void g(List items) => items.isEmpty;\n', 'Fix b')
+
+    def _git(self, *args):
+        env = dict(os.environ, **GIT_ENV)
+        return subprocess.run(['git', *args], cwd=self.top, env=env, check=True,
+                              capture_output=True, text=True).stdout
+
+    def _commit(self, relpath, text, subject):
+        with open(os.path.join(self.root, relpath), 'w', encoding='utf-8') as f:
+            f.write(text)
+        self._git('add', '-A')
+        self._git('commit', '-q', '-m', subject)
+
+    def _replay(self, jobs=1, keep=True):
+        return replay.run(self.root, 'HEAD~3..HEAD', ['final_cleanup'], jobs=jobs,
+                          cache_dir=self.cache_dir, keep=keep)
+
+    def test_rows_follow_the_range(self):
+        rows = self._replay()
+        self.assertEqual([row['subject'] for row in rows], ['Add a', 'Add b', 'Fix b'])
+        self.assertEqual([row['changed'] for row in rows], [1, 2, 1])
+        self.assertEqual([row['edits'] for row in rows], [1, 2, 1])
+        # a.dart is the same blob at every commit
+        self.assertEqual([row['cached'] for row in rows], [0, 1, 1])
+
+    def test_parallel_replay_gives_the_same_rows(self):
+        serial = self._replay()
+        parallel = self._replay(jobs=2)
+        fields = ('commit', 'files', 'changed', 'edits', 'moves')
+        self.assertEqual([[row[k] for k in fields] for row in parallel],
+                         [[row[k] for k in fields] for row in serial])
+
+    def test_worktrees_live_outside_the_checkout(self):
+        self._replay(jobs=2)
+        base = replay.worktree_base(self.top, self.cache_dir)
+        self.assertEqual(sorted(os.listdir(base)), ['wt0', 'wt1'])
+        self.assertTrue(base.startswith(self.cache_dir + os.sep))
+        self.assertEqual(self._git('status', '--porcelain'), '')
+        self.assertEqual(replay.remove_worktrees(self.top, self.cache_dir), 2)
+        self.assertFalse(os.path.exists(base))
+
+    def test_worktrees_are_removed_with_keep_off(self):
+        self._replay(keep=False)
+        self.assertFalse(os.path.exists(replay.worktree_base(self.top, self.cache_dir)))
+        self.assertEqual(len(self._git('worktree', 'list').splitlines()), 1)
+
+    def test_stale_worktree_directory_is_replaced(self):
+        stale = os.path.join(replay.worktree_base(self.top, self.cache_dir), 'wt0')
+        os.makedirs(stale)
+        with open(os.path.join(stale, 'left-over'), 'w', encoding='utf-8') as f:
+            f.write('x')
+        self.assertEqual(len(self._replay()), 3)
+        self.assertFalse(os.path.exists(os.path.join(stale, 'left-over')))
+
+    def test_unknown_revision(self):
+        with self.assertRaises(replay.ReplayError):
+            replay.run(self.root, 'no-such-branch', cache_dir=self.cache_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+The shared rule table, and `apply` against the fix scripts that read it
+
+The scripts take their patterns from codemod.rules but keep their own
+walks, scopes and order, so the table is checked by running them. The
+package's lib/ is copied with fix_file_naming's moves undone (files back
+at their old names, directives naming them too), so the chain has files
+to move part way through. Both the legacy chain and the engine then run
+over their own copy, and the two trees must come out byte for byte the
+same.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import moves, rules  # noqa: E402
+
+# targeted_fixes removes this import from the file under its old name only,
+# which the scripts have moved away by then
+KEPT_IMPORT = "import 'package:flutter/cupertino.dart';\n"
+MOVED = 'lib/features/player/screens/widgets/createPlaylist_bottomsheet.dart'
+
+
+def _tree(root):
+    out = {}
+    for current, _dirs, names in os.walk(os.path.join(root, 'lib')):
+        for name in names:
+            path = os.path.join(current, name)
+            with open(path, 'rb') as f:
+                out[os.path.relpath(path, root)] = f.read()
+    return out
+
+
+class RuleTableTest(unittest.TestCase):
+
+    def test_keys_are_unique(self):
+        keys = [rule.key for rule in rules.select() + rules.select_renames()]
+        self.assertEqual(len(keys), len(set(keys)))
+
+    def test_every_script_is_there(self):
+        for script in rules.RULESETS:
+            self.assertTrue(os.path.exists(os.path.join(REPO, f'{script}.py')), script)
+
+    def test_pairs_and_paths_follow_the_table(self):
+        selected = rules.select(['fix_compilation_errors'], ['fix_mediaplaylist_conflicts'])
+        self.assertEqual(rules.pairs('fix_compilation_errors', 'fix_mediaplaylist_conflicts'),
+                         [(rule.pattern, rule.replacement) for rule in selected])
+        self.assertEqual(rules.paths('fix_compilation_errors', 'fix_import_conflicts'),
+                         ['lib/core/blocs/mini_player/mini_player_bloc.dart',
+                          'lib/features/player/screens/widgets/song_tile.dart',
+                          *rules.ALIAS_FILES])
+        self.assertEqual(rules.paths('fix_all_issues', 'fix_variable_naming'), [])
+
+
+class LegacyEquivalenceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp(prefix='codemod-equivalence-')
+        base = os.path.join(cls.tmp, 'base')
+        os.makedirs(base)
+        shutil.copy(os.path.join(REPO, 'pubspec.yaml'), base)
+        shutil.copytree(os.path.join(REPO, 'lib'), os.path.join(base, 'lib'))
+        undo = [(rule.replacement, rule.pattern) for rule in rules.RENAMES['fix_all_issues']]
+        moves.run(base, undo, log=lambda message: None)
+        shutil.rmtree(os.path.join(base, '.dart_tool'), ignore_errors=True)
+        path = os.path.join(base, MOVED)
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        if KEPT_IMPORT not in text:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(KEPT_IMPORT + text)
+        cls.base = base
+        cls.legacy = cls._copy('legacy')
+        env = dict(os.environ, PYTHONPATH=REPO)
+        for script in rules.RULESETS:
+            subprocess.run([sys.executable, os.path.join(REPO, f'{script}.py')], cwd=cls.legacy,
+                           env=env, check=True, stdout=subprocess.DEVNULL)
+        cls.expected = _tree(cls.legacy)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    @classmethod
+    def _copy(cls, name):
+        target = os.path.join(cls.tmp, name)
+        shutil.copytree(cls.base, target)
+        return target
+
+    def _apply(self, name, *options):
+        root = self._copy(name)
+        subprocess.run([sys.executable, '-m', 'codemod', 'apply', root, '--no-cache', *options],
+                       cwd=REPO, check=True, stdout=subprocess.DEVNULL)
+        return _tree(root)
+
+    def assertSameTree(self, actual):
+        self.assertEqual(sorted(actual), sorted(self.expected))
+        different = [path for path in self.expected if actual[path] != self.expected[path]]
+        self.assertEqual(different, [])
+
+    def test_legacy_chain_keeps_import_of_moved_file(self):
+        moved = MOVED.replace('createPlaylist_', 'create_playlist_')
+        self.assertIn(KEPT_IMPORT.encode('utf-8'), self.expected[moved])
+
+    def test_apply_in_script_order(self):
+        self.assertSameTree(self._apply('engine', '--no-adapt'))
+
+    def test_apply_adaptive(self):
+        self.assertSameTree(self._apply('adaptive'))
+
+    def test_apply_parallel(self):
+        self.assertSameTree(self._apply('parallel', '--no-adapt', '-j', '2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+The persistent trigram index: what it narrows to, and when it re-reads files
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from codemod import engine, manifest  # noqa: E402
+from codemod.rules import LiteralRule, Rule  # noqa: E402
+from codemod.trigrams import TrigramIndex, trigrams  # noqa: E402
+
+FILES = {
+    'lib/a.dart': 'final x = items.length == 0;\n',
+    'lib/b.dart': 'Share.share(text);\n',
+    'lib/c.dart': 'void main() {}\n',
+}
+IS_EMPTY = Rule('f', 'is_empty', r'\.length\s*==\s*0', '.isEmpty', '')
+SHARE = LiteralRule('f', 'share', 'Share.share(', 'SharePlus.share(', '')
+# no literal of three characters: may match anywhere
+BRACES = Rule('f', 'braces', r'\(\)\s*{\s*}', '();', '')
+
+
+class TrigramIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='codemod-trigrams-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'lib'))
+        for relpath, text in FILES.items():
+            self._write(relpath, text)
+
+    def _write(self, relpath, text):
+        with open(os.path.join(self.root, relpath), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _index(self):
+        index = TrigramIndex(self.root)
+        index.refresh(sorted(FILES))
+        index.save()
+        return index
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams('abcd'), {'abc', 'bcd'})
+        self.assertEqual(trigrams('ab'), set())
+
+    def test_narrow(self):
+        index = self._index()
+        self.assertEqual(index.reindexed, 3)
+        self.assertEqual(index.narrow([IS_EMPTY, SHARE]),
+                         {'lib/a.dart': [IS_EMPTY], 'lib/b.dart': [SHARE]})
+
+    def test_rules_are_narrowed_one_by_one(self):
+        index = self._index()
+        self.assertEqual(index.narrow([BRACES, SHARE]),
+                         {'lib/a.dart': [BRACES], 'lib/b.dart': [BRACES, SHARE],
+                          'lib/c.dart': [BRACES]})
+
+    def test_ruled_out_rule_runs_once_the_text_changes(self):
+        to_share = LiteralRule('f', 'to_share', 'void main() {}', 'Share.share(', '')
+        shared = FILES['lib/b.dart']
+        self.assertEqual(engine.transform(shared, [SHARE], 'lib/b.dart', allowed=frozenset()),
+                         (shared, {}))
+        text = FILES['lib/c.dart']
+        allowed = frozenset([to_share.key])
+        self.assertEqual(engine.transform(text, [to_share, SHARE], 'lib/c.dart',
+                                          allowed=allowed)[0], 'SharePlus.share(\n')
+
+    def test_unchanged_files_are_not_read_again(self):
+        for relpath in FILES:
+            os.utime(os.path.join(self.root, relpath), (1, 1))
+        self._index()
+        index = TrigramIndex(self.root)
+        self.assertEqual(index.refresh(sorted(FILES)), 0)
+        self.assertFalse(index.dirty)
+
+    def test_edit_with_same_stat_right_after_indexing_is_seen(self):
+        self._index()
+        path = os.path.join(self.root, 'lib/c.dart')
+        before = os.stat(path)
+        self._write('lib/c.dart', 'Share.share();\n')
+        os.utime(path, ns=(before.st_atime_ns, before.st_mtime_ns))
+        self.assertEqual(os.stat(path).st_size, before.st_size)
+        index = TrigramIndex(self.root)
+        index.refresh(sorted(FILES))
+        self.assertEqual(sorted(index.narrow([SHARE])), ['lib/b.dart', 'lib/c.dart'])
+
+    def test_removed_file_drops_out(self):
+        self._index()
+        index = TrigramIndex(self.root)
+        index.refresh(['lib/a.dart', 'lib/c.dart'])
+        self.assertEqual(index.narrow([SHARE]), {})
+
+    def test_saved_table_keeps_its_save_time(self):
+        table = manifest.FileTable()
+        table.put('lib/a.dart', 1, 2, 'ab' * 20)
+        loaded = manifest.FileTable.loads(table.dumps())
+        self.assertEqual(loaded.saved_ns, table.saved_ns)
+        self.assertEqual(loaded.get('lib/a.dart').blob, 'ab' * 20)
+
+
+if __name__ == '__main__':
+    unittest.main()